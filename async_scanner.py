@@ -0,0 +1,350 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+import aiohttp
+from dune_executions import (COMPLETED_STATES, FAILED_STATES, DEFAULT_EXECUTION_TIMEOUT, FIRST_POLL_INTERVAL,
+                             MAX_POLL_INTERVAL, POLL_BACKOFF)
+from main import MemeScanner, CMC_INFO_BATCH_SIZE, DUNE_QUERY_ID
+from metrics import METRICS, endpoint_name
+from transport import (CMC_BASE_URL, DUNE_BASE_URL, UPSTREAMS, RETRY_STATUSES, IDEMPOTENT_METHODS, DEFAULT_TIMEOUT,
+                       get_session, backoff_delay, retry_after_delay)
+
+DEFAULT_ASYNC_CONCURRENCY = {'cmc': 4, 'dune': 8}  # In-flight requests per upstream
+
+class AsyncRateLimitedSession:
+    """aiohttp counterpart of transport.RateLimitedSession
+
+    Every request takes a token from the same bucket as the key's pooled
+    requests session, so sync and async callers share the plan's rate limit,
+    and 429/5xx answers are retried with the same jittered, Retry-After-aware
+    backoff (5xx and dropped connections only for idempotent methods).
+    """
+
+    def __init__(self, upstream, api_key, base_url=None):
+        config = UPSTREAMS[upstream]
+        pooled = get_session(upstream, api_key)
+        self.name = upstream
+        self.base_url = (base_url or pooled.base_url).rstrip('/')
+        self.limiter = pooled.limiter
+        self.max_retries = pooled.max_retries
+        self.backoff_base = pooled.backoff_base
+        self.backoff_cap = pooled.backoff_cap
+        self.headers = {**config['headers'], config['auth_header']: api_key}
+        self.session = None
+
+    def _session(self):
+        # Created lazily so the session binds to the running event loop
+        if self.session is None or self.session.closed:
+            connect, read = DEFAULT_TIMEOUT
+            self.session = aiohttp.ClientSession(headers=self.headers,
+                                                 timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def request_json(self, method, path, **kwargs):
+        """Decoded JSON body of `method path`, raising for an error status once retries are used up"""
+        endpoint = endpoint_name(path)
+        if method in IDEMPOTENT_METHODS:
+            retry_statuses, retry_errors = RETRY_STATUSES, (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+        else:
+            # The POST may have reached Dune already, only resend it if the connection never opened
+            retry_statuses, retry_errors = {429}, (aiohttp.ClientConnectorError,)
+
+        for attempt in range(self.max_retries + 1):
+            waited = self.limiter.reserve()
+            if waited:
+                await asyncio.sleep(waited)
+            METRICS.inc('throttle_sleep_seconds_total', waited, upstream=self.name)
+            started = time.perf_counter()
+            try:
+                async with self._session().request(method, self.base_url + path, **kwargs) as response:
+                    METRICS.observe('http_request_seconds', time.perf_counter() - started,
+                                    upstream=self.name, endpoint=endpoint)
+                    METRICS.inc('http_requests_total', upstream=self.name, endpoint=endpoint, status=response.status)
+                    if response.status == 429:
+                        self.limiter.penalize()
+                    if response.status not in retry_statuses or attempt == self.max_retries:
+                        if response.status >= 400:
+                            print(f"Response content: {await response.text()}")
+                            response.raise_for_status()
+                        self.limiter.reward()
+                        return await response.json()
+                    delay = retry_after_delay(response.headers, self.backoff_cap)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                METRICS.inc('http_requests_total', upstream=self.name, endpoint=endpoint, status=type(e).__name__)
+                if attempt == self.max_retries or not isinstance(e, retry_errors):
+                    raise
+                delay = None
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+
+            METRICS.inc('http_retries_total', upstream=self.name, endpoint=endpoint)
+            METRICS.inc('retry_sleep_seconds_total', delay, upstream=self.name)
+            await asyncio.sleep(delay)
+
+class AsyncDuneClient:
+    def __init__(self, api_key, base_url=DUNE_BASE_URL, session=None, execution_timeout=DEFAULT_EXECUTION_TIMEOUT):
+        self.api_key = api_key
+        self.session = session or AsyncRateLimitedSession('dune', api_key, base_url)
+        self.execution_timeout = execution_timeout
+        self.global_deadline = None
+        self.stats = {'submitted': 0}
+
+    def reset_deadline(self, global_timeout=None):
+        """Start a new deadline for all executions (e.g. per scan); None removes it"""
+        self.global_deadline = time.monotonic() + global_timeout if global_timeout else None
+
+    def deadline_passed(self):
+        return self.global_deadline is not None and time.monotonic() >= self.global_deadline
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.session.close()
+
+    async def execute_query(self, query_id, token_address):
+        # Anything started after the deadline would be cancelled right away and still be billed
+        if self.deadline_passed():
+            raise TimeoutError("Dune deadline passed, not starting a new execution")
+        parameters = {
+            "query_parameters": {
+                "token_address": token_address
+            }
+        }
+        return await self.session.request_json('POST', f"/query/{query_id}/execute", json=parameters)
+
+    async def get_execution_status(self, execution_id):
+        return await self.session.request_json('GET', f"/execution/{execution_id}/status")
+
+    async def get_execution_result(self, execution_id):
+        return await self.session.request_json('GET', f"/execution/{execution_id}/results")
+
+    async def get_latest_result(self, query_id, token_address):
+        """Latest stored results for the query and parameters, without starting an execution"""
+        return await self.session.request_json('GET', f"/query/{query_id}/results",
+                                               params={"params.token_address": token_address})
+
+    async def cancel_execution(self, execution_id):
+        return await self.session.request_json('POST', f"/execution/{execution_id}/cancel")
+
+    async def execute_query_and_wait(self, query_id, token_address, timeout=None):
+        """Run the query and poll with the same backoff as ExecutionManager, cancelling it on timeout"""
+        execution = await self.execute_query(query_id, token_address)
+        execution_id = execution['execution_id']
+        self.stats['submitted'] += 1
+        METRICS.inc('dune_executions_submitted_total')
+        deadline = time.monotonic() + (timeout or self.execution_timeout)
+        if self.global_deadline is not None:
+            deadline = min(deadline, self.global_deadline)
+        interval = FIRST_POLL_INTERVAL
+
+        try:
+            while True:
+                await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("Query execution timed out")
+                METRICS.inc('dune_status_polls_total')
+                state = (await self.get_execution_status(execution_id)).get('state', 'UNKNOWN')
+                if state in COMPLETED_STATES:
+                    return await self.get_execution_result(execution_id)
+                if state in FAILED_STATES:
+                    raise Exception(FAILED_STATES[state])
+                interval = min(MAX_POLL_INTERVAL, interval * POLL_BACKOFF)
+        except (TimeoutError, asyncio.CancelledError):
+            # Nobody is waiting for this execution any more, stop it burning credits
+            try:
+                await asyncio.shield(self.cancel_execution(execution_id))
+            except Exception as e:
+                print(f"⚠️ Could not cancel Dune execution {execution_id}: {str(e)}")
+            raise
+
+def _sync_only(name):
+    def method(self, *args, **kwargs):
+        raise NotImplementedError(f"AsyncMemeScanner.{name}() needs the sync Dune client, await scan_memecoins()")
+    method.__name__ = name
+    return method
+
+class AsyncMemeScanner(MemeScanner):
+    """asyncio counterpart of MemeScanner with the same filtering and result shape
+
+    Dune scores go through the same score cache, stored-result reuse, top-K
+    and credit budget (`max_dune_scores`) and deadline as the sync scanner.
+    The sync scan entry points are not available, use `scan_memecoins`.
+    """
+
+    def __init__(self, cmc_api_key, dune_api_key, token_index=None, concurrency=None,
+                 cmc_base_url=CMC_BASE_URL, dune_base_url=DUNE_BASE_URL, snapshot_store=None, dune_timeout=None,
+                 score_cache=None, use_latest_results=True, dune_deadline=None, dune_top_k=None, last_scan=None):
+        super().__init__(cmc_api_key, dune_api_key, token_index=token_index,
+                         concurrency={**DEFAULT_ASYNC_CONCURRENCY, **(concurrency or {})},
+                         score_cache=score_cache, use_latest_results=use_latest_results, dune_batch_query_id=None,
+                         dune_deadline=dune_deadline, snapshot_store=snapshot_store, dune_top_k=dune_top_k,
+                         last_scan=last_scan)
+        self.cmc_client = AsyncRateLimitedSession('cmc', cmc_api_key, cmc_base_url)
+        self.dune_client = AsyncDuneClient(dune_api_key, base_url=dune_base_url,
+                                           execution_timeout=dune_timeout or DEFAULT_EXECUTION_TIMEOUT)
+        self.cmc_semaphore = None
+        self.dune_semaphore = None
+
+    iter_scan = _sync_only('iter_scan')
+    scan_profiles = _sync_only('scan_profiles')
+    enrich_candidates = _sync_only('enrich_candidates')
+    iter_enriched = _sync_only('iter_enriched')
+    analyze_many_with_dune = _sync_only('analyze_many_with_dune')
+    rescore_with_dune = _sync_only('rescore_with_dune')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.cmc_client.close()
+        await self.dune_client.close()
+
+    async def _get_cmc_json(self, path, params):
+        async with self.cmc_semaphore:
+            return await self.cmc_client.request_json('GET', path, params=params)
+
+    async def get_token_metadata(self, coin_id, symbol):
+        """Fetch detailed metadata for a token"""
+        return (await self.get_tokens_metadata([coin_id])).get(coin_id)
+
+    async def get_tokens_metadata(self, coin_ids, batch_size=CMC_INFO_BATCH_SIZE):
+        """Fetch metadata for many tokens with concurrent multi-id info requests"""
+        self._ensure_semaphores()
+        chunks = [coin_ids[start:start + batch_size] for start in range(0, len(coin_ids), batch_size)]
+        pages = await asyncio.gather(*(self._get_info_chunk(chunk) for chunk in chunks))
+
+        results = {}
+        for chunk, data in zip(chunks, pages):
+            self.token_index.record_coins(data.values())
+            for coin_id in chunk:
+                results[coin_id] = self._parse_metadata(data.get(str(coin_id)))
+        return results
+
+    async def _get_info_chunk(self, chunk):
+        params = {
+            'id': ','.join(str(coin_id) for coin_id in chunk),
+            'skip_invalid': 'true'
+        }
+        try:
+            self.request_counts['cmc_info'] += 1
+            return (await self._get_cmc_json('/v2/cryptocurrency/info', params)).get('data') or {}
+        except Exception as e:
+            print(f"⚠️ Metadata batch failed: {str(e)}")
+            self.request_counts['cmc_info_failed'] += 1
+            return {}
+
+    async def analyze_with_dune(self, token_address):
+        """Get Dune analysis for a token, reusing cached or stored results while they are fresh"""
+        planned = self._planned_score(token_address)
+        if planned:
+            return planned
+
+        self._ensure_semaphores()
+        try:
+            async with self.dune_semaphore:
+                results, source, computed_at = None, 'fresh', None
+                if self.score_cache and self.use_latest_results:
+                    results, computed_at = await self._get_fresh_latest_result(token_address)
+                    source = 'stored' if results else 'fresh'
+                if results is None:
+                    if self._deadline_passed(1):
+                        return self._skipped_score('deadline')
+                    self._count_fresh(1)
+                    results = await self.dune_client.execute_query_and_wait(DUNE_QUERY_ID, token_address)
+
+            if 'result' in results and 'rows' in results['result'] and results['result']['rows']:
+                return self._store_score(token_address, results['result']['rows'][0], source, computed_at)
+            return self._empty_score()
+        except Exception as e:
+            print(f"⚠️ Dune analysis failed for {token_address}: {str(e)}")
+
+        return {
+            'dune_score': 'N/A',
+            'dune_interpretation': 'N/A',
+            'dune_source': 'failed'
+        }
+
+    async def _get_fresh_latest_result(self, token_address):
+        """Dune's stored results for this token if they are within the cache TTL"""
+        try:
+            results = await self.dune_client.get_latest_result(DUNE_QUERY_ID, token_address)
+            ended_at = datetime.fromisoformat(results['execution_ended_at'].replace('Z', '+00:00')).timestamp()
+        except Exception as e:
+            return None, None
+        if self.score_cache.is_fresh(ended_at):
+            return results, ended_at
+        return None, None
+
+    def _ensure_semaphores(self):
+        # Semaphores must be created inside the loop that awaits them
+        if self.cmc_semaphore is None:
+            self.cmc_semaphore = asyncio.Semaphore(self.concurrency['cmc'])
+            self.dune_semaphore = asyncio.Semaphore(self.concurrency['dune'])
+
+    async def scan_memecoins(self, volume_threshold=50000, min_price_increase=20, max_price_increase=300):
+        """Scan for trending memecoins and analyze with Dune"""
+        print(f"\n🔍 Scanning for Solana memecoins...")
+        self._ensure_semaphores()
+
+        # Listings pages depend on each other for the early stop, so the sync paged fetch
+        # (with the id-map refresh) runs off the loop on the same rate-limited session
+        data = await asyncio.get_running_loop().run_in_executor(
+            None, self.fetch_listings, volume_threshold, min_price_increase, max_price_increase
+        )
+        if data is None:
+            return []
+
+        candidates = self.prioritize(self.select_candidates(data, volume_threshold, min_price_increase, max_price_increase))
+        del data
+        self.dune_client.reset_deadline(self.dune_deadline)
+        self._start_dune_budget()
+        metadata_by_id = await self.get_tokens_metadata([coin['id'] for coin in candidates])
+        solana_coins = self._solana_coins(candidates, metadata_by_id)
+        # Top-K and credit budget go to the best pre-scored tokens, decided before anything is submitted
+        self._plan_dune_scores(solana_coins)
+
+        async def enrich(coin, metadata):
+            coin_data = self._build_coin_data(coin, metadata, await self.analyze_with_dune(metadata['token_address']))
+            self._print_found(coin_data)
+            return coin_data
+
+        # gather keeps priority order regardless of which Dune execution finishes first
+        results = await asyncio.gather(*(enrich(coin, metadata) for coin, metadata in solana_coins))
+        self._print_dune_budget()
+        self._print_cache_stats()
+        params = {
+            'volume_threshold': volume_threshold,
+            'min_price_increase': min_price_increase,
+            'max_price_increase': max_price_increase
+        }
+        self.record_snapshot(candidates, results, params)
+        self.save_last_scan(results, params)
+        return results
+
+async def main():
+    cmc_api_key = os.getenv('CMC_TOKEN')
+    dune_api_key = os.getenv('DUNE_TOKEN')
+
+    if not cmc_api_key or not dune_api_key:
+        print("❌ Error: Please set both CMC_TOKEN and DUNE_TOKEN environment variables")
+        return
+
+    async with AsyncMemeScanner(cmc_api_key, dune_api_key) as scanner:
+        trending = await scanner.scan_memecoins()
+        scanner.format_results(trending)
+        print("\n✨ Scan completed successfully!")
+
+if __name__ == '__main__':
+    asyncio.run(main())
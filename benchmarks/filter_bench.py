@@ -0,0 +1,93 @@
+"""Micro-benchmark: per-row listings filter loop vs the vectorized ListingsFrame
+
+Run from the repository root: python benchmarks/filter_bench.py
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listings_frame import ListingsFrame, rank_order
+
+VOLUME_THRESHOLD = 50000
+MIN_PRICE_INCREASE = 20
+MAX_PRICE_INCREASE = 300
+
+def synthetic_listings(count, seed=42):
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [{
+        'id': index,
+        'symbol': f'TKN{index}',
+        'name': f'Token {index}',
+        'date_added': (now - timedelta(seconds=rnd.randint(0, 90 * 86400))).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'quote': {'USD': {
+            'price': rnd.random(),
+            'volume_24h': rnd.lognormvariate(10, 3),
+            'volume_change_24h': rnd.uniform(-90, 500),
+            'percent_change_24h': rnd.uniform(-90, 500),
+            'market_cap': rnd.lognormvariate(14, 3)
+        }}
+    } for index in range(count)]
+
+def loop_filter(data):
+    """The original per-row filter from MemeScanner.scan_memecoins"""
+    current_time = datetime.now(timezone.utc)
+    candidates = []
+    for coin in data:
+        quote = coin['quote']['USD']
+        price_change = quote['percent_change_24h']
+        if (quote['volume_24h'] > VOLUME_THRESHOLD and
+            MIN_PRICE_INCREASE <= price_change <= MAX_PRICE_INCREASE and
+            datetime.fromisoformat(coin['date_added'].replace('Z', '+00:00')) > current_time - timedelta(days=30)):
+            candidates.append(coin)
+    return candidates
+
+def loop_sort(coins):
+    return sorted(coins, key=lambda x: (
+        float(x['dune_score']) if isinstance(x['dune_score'], (int, float)) else -1,
+        x['price_change_24h']
+    ), reverse=True)
+
+def best_of(func, repeat=5, setup=None):
+    """Fastest of `repeat` timed calls; `setup()` runs untimed before each and its result is passed in"""
+    timings = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def build_and_select(data):
+    return ListingsFrame(data).select(VOLUME_THRESHOLD, MIN_PRICE_INCREASE, MAX_PRICE_INCREASE)
+
+def main():
+    # Every repeat gets a fresh frame, so the parsed-date cache filled by one select() can't flatter the next
+    print(f"{'rows':>8}  {'loop':>10}  {'build+mask':>11}  {'speedup':>8}  {'frame build':>12}  {'mask (cold)':>12}")
+    for count in (5000, 100000):
+        data = synthetic_listings(count)
+        loop_time, expected = best_of(lambda: loop_filter(data))
+        total_time, selected = best_of(lambda: build_and_select(data))
+        build_time, frame = best_of(lambda: ListingsFrame(data))
+        select_time, _ = best_of(lambda frame: frame.select(VOLUME_THRESHOLD, MIN_PRICE_INCREASE, MAX_PRICE_INCREASE),
+                                 setup=lambda: ListingsFrame(data))
+        assert [coin['id'] for coin in selected] == [coin['id'] for coin in expected]
+        print(f"{count:>8}  {loop_time * 1000:>8.1f}ms  {total_time * 1000:>9.1f}ms  {loop_time / total_time:>7.1f}x  "
+              f"{build_time * 1000:>10.1f}ms  {select_time * 1000:>10.2f}ms")
+
+    print(f"\n{'results':>8}  {'sorted()':>10}  {'lexsort':>10}")
+    for count in (5000, 100000):
+        rnd = random.Random(count)
+        coins = [{'dune_score': rnd.choice([rnd.randint(0, 100), 'N/A']), 'price_change_24h': rnd.uniform(20, 300)}
+                 for _ in range(count)]
+        sort_time, expected = best_of(lambda: loop_sort(coins))
+        rank_time, order = best_of(lambda: rank_order(coins))
+        assert [coins[index] for index in order] == expected
+        print(f"{count:>8}  {sort_time * 1000:>8.1f}ms  {rank_time * 1000:>8.1f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Memory benchmark: merged per-coin dicts vs slotted TokenRecords
+
+Builds enriched results for every token of a synthetic listings payload
+(parsed from JSON like a real response, so no strings are shared by
+accident) and measures the retained memory of each representation, plus
+the size of the listings payload that scans no longer keep alive.
+
+Run from the repository root: python benchmarks/records_bench.py
+"""
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_bench import synthetic_listings
+from token_record import TokenRecord
+
+SIGNALS = ['Strong buy signal', 'Moderate interest', 'Low activity', 'High risk']
+
+def synthetic_enrichment(listings, seed=7):
+    """Metadata and Dune results shaped like MemeScanner's, parsed from JSON"""
+    rnd = random.Random(seed)
+    payload = json.dumps([{
+        'metadata': {
+            'website': f"https://token{coin['id']}.example",
+            'twitter': f"https://twitter.com/token{coin['id']}",
+            'telegram': '',
+            'explorer': f"https://solscan.io/token/Addr{coin['id']}",
+            'description': f"Token {coin['id']} is a community memecoin on Solana with a very long description"[:100] + '...',
+            'platform': 'Solana',
+            'token_address': f"Addr{coin['id']:040d}"
+        },
+        'dune': {
+            'dune_score': rnd.randint(0, 100),
+            'dune_interpretation': rnd.choice(SIGNALS),
+            'dune_source': 'fresh'
+        }
+    } for coin in listings])
+    return json.loads(payload)
+
+def as_dict(coin, metadata, dune_results):
+    """The per-coin dict MemeScanner built before TokenRecord"""
+    quote = coin['quote']['USD']
+    return {
+        'id': coin['id'],
+        'symbol': coin['symbol'],
+        'name': coin['name'],
+        'price_change_24h': quote['percent_change_24h'],
+        'volume_24h': quote['volume_24h'],
+        'volume_change_24h': quote.get('volume_change_24h', 0),
+        'market_cap': quote.get('market_cap', 0),
+        'price': quote['price'],
+        'date_added': coin['date_added'],
+        **metadata,
+        **dune_results
+    }
+
+def retained(build):
+    """Bytes still allocated after build() returns, with its result kept alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, result
+
+def main():
+    print(f"{'tokens':>8}  {'listings payload':>17}  {'dict results':>13}  {'TokenRecords':>13}  {'saved':>6}  "
+          f"{'dicts + payload':>16}  {'records only':>13}  {'saved':>6}")
+    for count in (5000, 100000):
+        raw = json.dumps(synthetic_listings(count))
+        enrichment = synthetic_enrichment(json.loads(raw))
+        payload_size, listings = retained(lambda: json.loads(raw))
+        dict_size, dicts = retained(lambda: [
+            as_dict(coin, extra['metadata'], extra['dune']) for coin, extra in zip(listings, enrichment)
+        ])
+        record_size, records = retained(lambda: [
+            TokenRecord.from_listing(coin, extra['metadata'], extra['dune']) for coin, extra in zip(listings, enrichment)
+        ])
+        assert all(record.as_dict().items() >= coin.items() for record, coin in zip(records, dicts))
+        before = payload_size + dict_size
+        print(f"{count:>8}  {payload_size / 1e6:>15.1f}MB  {dict_size / 1e6:>11.1f}MB  {record_size / 1e6:>11.1f}MB  "
+              f"{1 - record_size / dict_size:>6.0%}  {before / 1e6:>14.1f}MB  {record_size / 1e6:>11.1f}MB  "
+              f"{1 - record_size / before:>6.0%}")
+        del listings, dicts, records
+
+if __name__ == '__main__':
+    main()
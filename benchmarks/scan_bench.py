@@ -0,0 +1,165 @@
+"""End-to-end scan benchmark against the local stub CMC and Dune server
+
+Starts benchmarks/stub_server.py in a separate process, runs a full
+scan_memecoins against it and reports wall time, request counts, p50/p99
+latency per endpoint and peak memory. Every run is saved to
+benchmarks/results/ and compared with the previous run of the same
+configuration.
+
+Run from the repository root: python benchmarks/scan_bench.py --listings 5000 --pipelined
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import add_config_arguments, config_from_args, endpoint_name, serve
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def start_stub(config):
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(config, port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+def run_scan(base_url, args):
+    # transport reads the base URLs and plans at import time
+    os.environ['CMC_BASE_URL'] = f"{base_url}/cmc"
+    os.environ['DUNE_BASE_URL'] = f"{base_url}/dune"
+    os.environ['CMC_PLAN'] = args.cmc_plan
+    os.environ['DUNE_PLAN'] = args.dune_plan
+    os.environ['MEMESCANNER_HOME'] = tempfile.mkdtemp(prefix='memescanner-bench-')
+
+    import cmc
+    import main
+
+    latencies = {}
+    def record_latency(response, *args, **kwargs):
+        endpoint = endpoint_name(urlparse(response.url).path)
+        latencies.setdefault(endpoint, []).append(response.elapsed.total_seconds())
+
+    if args.scanner == 'cmc':
+        scanner = cmc.MemeScanner('bench-cmc-key')
+        sessions = [scanner.session]
+        scan = lambda: scanner.scan_memecoins()
+    else:
+        scanner = main.MemeScanner(
+            'bench-cmc-key', 'bench-dune-key',
+            dune_batch_query_id=args.dune_batch_query,
+            dune_timeout=args.dune_timeout
+        )
+        sessions = [scanner.cmc_session, scanner.dune_client.session]
+        scan = lambda: scanner.scan_memecoins(pipelined=args.pipelined)
+    for session in sessions:
+        session.hooks['response'].append(record_latency)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    results = scan()
+    wall_time = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if args.scanner != 'cmc':
+        scanner.dune_client.executions.close()
+
+    return {
+        'wall_time': wall_time,
+        'results': len(results),
+        'peak_memory_mb': peak / 1e6,
+        'client': {
+            key: sum(session.stats[key] for session in sessions)
+            for key in ('requests', 'retries', 'rate_limited', 'throttle_seconds')
+        },
+        'latency': {
+            endpoint: {
+                'count': len(values),
+                'p50_ms': float(np.percentile(values, 50)) * 1000,
+                'p99_ms': float(np.percentile(values, 99)) * 1000
+            }
+            for endpoint, values in sorted(latencies.items())
+        }
+    }
+
+def previous_run(config):
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, 'scan-*.json')), reverse=True):
+        with open(path) as f:
+            run = json.load(f)
+        if run['config'] == config:
+            return path, run
+    return None, None
+
+def print_report(run, previous):
+    metrics = run['metrics']
+    def delta(value, key):
+        if not previous:
+            return ''
+        before = previous['metrics'][key]
+        return f"  ({(value - before) / before:+.1%} vs previous)" if before else ''
+
+    print(f"\n⏱️  Wall time: {metrics['wall_time']:.2f}s{delta(metrics['wall_time'], 'wall_time')}")
+    print(f"🧠 Peak traced memory: {metrics['peak_memory_mb']:.1f} MB{delta(metrics['peak_memory_mb'], 'peak_memory_mb')}")
+    print(f"🎯 Results: {metrics['results']}")
+    client = metrics['client']
+    print(f"📞 Client requests: {client['requests']} ({client['retries']} retries, "
+          f"{client['rate_limited']} rate limited, {client['throttle_seconds']:.1f}s throttled)")
+
+    print(f"\n{'endpoint':<42} {'requests':>8} {'p50':>9} {'p99':>9}   server outcomes")
+    for endpoint, server_counts in sorted(run['server'].items()):
+        latency = metrics['latency'].get(endpoint, {'count': 0, 'p50_ms': 0.0, 'p99_ms': 0.0})
+        outcomes = ', '.join(f"{outcome}: {count}" for outcome, count in sorted(server_counts.items()))
+        print(f"{endpoint:<42} {latency['count']:>8} {latency['p50_ms']:>7.1f}ms {latency['p99_ms']:>7.1f}ms   {outcomes}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a full scan against stand-in CMC and Dune APIs")
+    add_config_arguments(parser)
+    parser.add_argument('--scanner', choices=['combined', 'cmc'], default='combined', help="main.py scanner or the CMC-only cmc.py scanner")
+    parser.add_argument('--pipelined', action='store_true', help="run the combined scanner in pipelined mode")
+    parser.add_argument('--dune-batch-query', default=None, help="score tokens with the multi-token query path")
+    parser.add_argument('--dune-timeout', type=int, default=60, help="seconds before a Dune execution is cancelled")
+    parser.add_argument('--cmc-plan', default='enterprise', help="client-side CMC plan (sets the request rate)")
+    parser.add_argument('--dune-plan', default='premium', help="client-side Dune plan (sets the request rate)")
+    parser.add_argument('--label', default='', help="free-form note saved with the run")
+    args = parser.parse_args()
+
+    config = {
+        **config_from_args(args),
+        'scanner': args.scanner,
+        'pipelined': args.pipelined,
+        'dune_batch_query': args.dune_batch_query,
+        'cmc_plan': args.cmc_plan,
+        'dune_plan': args.dune_plan
+    }
+    stub, base_url = start_stub(config_from_args(args))
+    try:
+        metrics = run_scan(base_url, args)
+        server = requests.get(f"{base_url}/_stats").json()
+    finally:
+        stub.terminate()
+
+    run = {'timestamp': datetime.now().isoformat(), 'label': args.label, 'config': config,
+           'metrics': metrics, 'server': server}
+    previous_path, previous = previous_run(config)
+    print_report(run, previous)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"scan-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"\n💾 Saved to {path}" + (f" (compared with {os.path.basename(previous_path)})" if previous_path else ''))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""Local stand-in for the CoinMarketCap and Dune APIs used by the benchmarks
+
+Serves synthetic listings, info, quotes and id-map payloads plus a Dune execution
+lifecycle (execute -> status -> results, cancel) with configurable latency,
+per-API rate limits, random failures and Dune execution durations.
+
+Run standalone: python benchmarks/stub_server.py --port 8765 --listings 5000
+then point the scanner at it with CMC_BASE_URL=http://127.0.0.1:8765/cmc
+and DUNE_BASE_URL=http://127.0.0.1:8765/dune.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_CONFIG = {
+    'listings': 5000,  # Rows in the synthetic listings payload
+    'solana_share': 0.3,  # Fraction of tokens on Solana
+    'latency_ms': 50,  # Added to every response
+    'jitter_ms': 20,
+    'cmc_rate_limit': 0,  # Requests per minute before 429s, 0 = unlimited
+    'dune_rate_limit': 0,
+    'failure_rate': 0.0,  # Share of requests answered with a 503
+    'dune_duration': 2.0,  # Mean seconds a Dune execution runs
+    'seed': 42
+}
+
+class StubState:
+    """Synthetic data, rate limiters, executions and per-endpoint counters"""
+
+    def __init__(self, config):
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.random = random.Random(self.config['seed'])
+        self.lock = threading.Lock()
+        self.listings = self._synthetic_listings()
+        self.by_id = {coin['id']: coin for coin in self.listings}
+        self.executions = {}
+        self.counts = {}
+        self.buckets = {
+            api: {'tokens': float(limit / 6 or 1), 'updated_at': time.monotonic(), 'rate': limit / 60.0}
+            for api, limit in (('cmc', self.config['cmc_rate_limit']), ('dune', self.config['dune_rate_limit']))
+        }
+
+    def _synthetic_listings(self):
+        rnd = self.random
+        now = datetime.now(timezone.utc)
+        listings = []
+        for index in range(1, self.config['listings'] + 1):
+            solana = rnd.random() < self.config['solana_share']
+            listings.append({
+                'id': index,
+                'symbol': f'TKN{index}',
+                'name': f'Token {index}',
+                'date_added': (now - timedelta(seconds=rnd.randint(0, 90 * 86400))).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'platform': {'name': 'Solana' if solana else 'Ethereum', 'token_address': f'Addr{index}'},
+                'quote': {'USD': {
+                    'price': rnd.random(),
+                    'volume_24h': rnd.lognormvariate(11, 2),
+                    'volume_change_24h': rnd.uniform(-90, 500),
+                    'percent_change_24h': rnd.uniform(-90, 500),
+                    'market_cap': rnd.lognormvariate(15, 2)
+                }}
+            })
+        listings.sort(key=lambda coin: coin['quote']['USD']['percent_change_24h'], reverse=True)
+        return listings
+
+    def count(self, endpoint, outcome):
+        with self.lock:
+            counts = self.counts.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def throttle(self, api):
+        """Seconds until the next request is allowed, or 0 if it may go through now"""
+        bucket = self.buckets[api]
+        if not bucket['rate']:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            bucket['tokens'] = min(bucket['rate'] * 10, bucket['tokens'] + (now - bucket['updated_at']) * bucket['rate'])
+            bucket['updated_at'] = now
+            if bucket['tokens'] >= 1:
+                bucket['tokens'] -= 1
+                return 0
+            return (1 - bucket['tokens']) / bucket['rate']
+
+    def start_execution(self, token_addresses):
+        duration = self.config['dune_duration'] * self.random.uniform(0.5, 1.5)
+        with self.lock:
+            execution_id = f'01STUB{len(self.executions):08d}'
+            self.executions[execution_id] = {
+                'token_addresses': token_addresses,
+                'ends_at': time.monotonic() + duration,
+                'cancelled': False
+            }
+        return execution_id
+
+    def execution_state(self, execution):
+        if execution['cancelled']:
+            return 'QUERY_STATE_CANCELLED'
+        if time.monotonic() < execution['ends_at']:
+            return 'QUERY_STATE_EXECUTING'
+        return 'QUERY_STATE_COMPLETED'
+
+    def score_rows(self, token_addresses):
+        return [{
+            'token_address': address,
+            'memecoin_score': sum(map(ord, address)) % 100,
+            'score_interpretation': 'Synthetic score'
+        } for address in token_addresses]
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _send(self, body, status=200, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method):
+        state = self.server.state
+        config = state.config
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+        if url.path == '/_stats':
+            return self._send(state.counts)
+
+        api = url.path.split('/')[1]
+        endpoint = endpoint_name(url.path)
+        time.sleep(max(0.0, config['latency_ms'] + state.random.uniform(-1, 1) * config['jitter_ms']) / 1000)
+
+        retry_after = state.throttle(api) if api in state.buckets else 0
+        if retry_after:
+            state.count(endpoint, '429')
+            return self._send({'error': 'rate limited'}, 429, [('Retry-After', f'{retry_after:.2f}')])
+        if state.random.random() < config['failure_rate']:
+            state.count(endpoint, '503')
+            return self._send({'error': 'unavailable'}, 503)
+
+        handler = ROUTES.get((method, endpoint))
+        if handler is None:
+            state.count(endpoint, '404')
+            return self._send({'error': f'unknown endpoint {endpoint}'}, 404)
+        state.count(endpoint, 'ok')
+        status, response = handler(state, url.path, params, body)
+        self._send(response, status)
+
+def endpoint_name(path):
+    """Collapse ids in a path so every execution or query maps to one endpoint"""
+    parts = path.split('/')
+    for index, part in enumerate(parts):
+        if index and parts[index - 1] in ('execution', 'query'):
+            parts[index] = '{id}'
+    return '/'.join(parts)
+
+def cmc_listings(state, path, params, body):
+    volume_min = float(params.get('volume_24h_min', '-inf'))
+    change_min = float(params.get('percent_change_24h_min', '-inf'))
+    change_max = float(params.get('percent_change_24h_max', 'inf'))
+    rows = [
+        coin for coin in state.listings
+        if coin['quote']['USD']['volume_24h'] >= volume_min and
+        change_min <= coin['quote']['USD']['percent_change_24h'] <= change_max
+    ]
+    start = int(params.get('start', 1))
+    limit = int(params.get('limit', 100))
+    return 200, {'status': {'credit_count': 1 + limit // 200}, 'data': rows[start - 1:start - 1 + limit]}
+
+def cmc_info(state, path, params, body):
+    data = {}
+    for coin_id in params.get('id', '').split(','):
+        coin = state.by_id.get(int(coin_id)) if coin_id.isdigit() else None
+        if coin:
+            data[coin_id] = {
+                'id': coin['id'],
+                'symbol': coin['symbol'],
+                'platform': coin['platform'],
+                'description': f"{coin['name']} is a synthetic benchmark token.",
+                'urls': {'website': ['https://example.com'], 'twitter': [''], 'chat': [''], 'explorer': ['']}
+            }
+    return 200, {'status': {'credit_count': 1}, 'data': data}
+
+def cmc_quotes(state, path, params, body):
+    # Every request nudges the quoted tokens a little, like a live market
+    data = {}
+    for coin_id in params.get('id', '').split(','):
+        coin = state.by_id.get(int(coin_id)) if coin_id.isdigit() else None
+        if coin:
+            quote = coin['quote']['USD']
+            quote['price'] *= state.random.uniform(0.97, 1.03)
+            quote['percent_change_24h'] += state.random.uniform(-5, 5)
+            quote['volume_24h'] *= state.random.uniform(0.9, 1.1)
+            data[coin_id] = {'id': coin['id'], 'symbol': coin['symbol'], 'quote': {'USD': quote}}
+    return 200, {'status': {'credit_count': 1 + len(data) // 100}, 'data': data}
+
+def cmc_map(state, path, params, body):
+    ordered = sorted(state.listings, key=lambda coin: coin['id'])
+    start = int(params.get('start', 1))
+    limit = int(params.get('limit', 5000))
+    rows = [
+        {'id': coin['id'], 'symbol': coin['symbol'], 'platform': coin['platform']}
+        for coin in ordered[start - 1:start - 1 + limit]
+    ]
+    return 200, {'status': {'credit_count': 1}, 'data': rows}
+
+def dune_execute(state, path, params, body):
+    query_parameters = body.get('query_parameters', {})
+    if 'token_addresses' in query_parameters:
+        token_addresses = query_parameters['token_addresses'].split(',')
+    else:
+        token_addresses = [query_parameters.get('token_address')]
+    return 200, {'execution_id': state.start_execution(token_addresses), 'state': 'QUERY_STATE_PENDING'}
+
+def dune_status(state, path, params, body):
+    execution = state.executions.get(path.split('/')[-2])
+    if execution is None:
+        return 404, {'error': 'execution not found'}
+    return 200, {'execution_id': path.split('/')[-2], 'state': state.execution_state(execution)}
+
+def dune_results(state, path, params, body):
+    execution = state.executions.get(path.split('/')[-2])
+    if execution is None:
+        return 404, {'error': 'execution not found'}
+    rows = state.score_rows(execution['token_addresses'])
+    offset = int(params.get('offset', 0))
+    limit = int(params.get('limit', len(rows) or 1))
+    next_offset = offset + limit if offset + limit < len(rows) else None
+    return 200, {
+        'execution_id': path.split('/')[-2],
+        'state': state.execution_state(execution),
+        'result': {'rows': rows[offset:offset + limit]},
+        'next_offset': next_offset
+    }
+
+def dune_cancel(state, path, params, body):
+    execution = state.executions.get(path.split('/')[-2])
+    if execution is not None:
+        execution['cancelled'] = True
+    return 200, {'success': True}
+
+def dune_latest(state, path, params, body):
+    # Stored results are always a day old, so the scanner never treats them as fresh
+    ended_at = (datetime.now(timezone.utc) - timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return 200, {
+        'execution_ended_at': ended_at,
+        'result': {'rows': state.score_rows([params.get('params.token_address', '')])}
+    }
+
+ROUTES = {
+    ('GET', '/cmc/v1/cryptocurrency/listings/latest'): cmc_listings,
+    ('GET', '/cmc/v2/cryptocurrency/info'): cmc_info,
+    ('GET', '/cmc/v1/cryptocurrency/map'): cmc_map,
+    ('GET', '/cmc/v2/cryptocurrency/quotes/latest'): cmc_quotes,
+    ('POST', '/dune/query/{id}/execute'): dune_execute,
+    ('GET', '/dune/execution/{id}/status'): dune_status,
+    ('GET', '/dune/execution/{id}/results'): dune_results,
+    ('POST', '/dune/execution/{id}/cancel'): dune_cancel,
+    ('GET', '/dune/query/{id}/results'): dune_latest
+}
+
+def make_server(config=None, host='127.0.0.1', port=0):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(config or {})
+    return server
+
+def serve(config, port_queue=None, host='127.0.0.1', port=0):
+    """Run a stub server until the process is terminated, reporting its port on `port_queue`"""
+    server = make_server(config, host, port)
+    if port_queue is not None:
+        port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+def add_config_arguments(parser):
+    parser.add_argument('--listings', type=int, default=DEFAULT_CONFIG['listings'], help="rows in the synthetic listings")
+    parser.add_argument('--solana-share', type=float, default=DEFAULT_CONFIG['solana_share'], help="fraction of tokens on Solana")
+    parser.add_argument('--latency-ms', type=float, default=DEFAULT_CONFIG['latency_ms'], help="latency added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=DEFAULT_CONFIG['jitter_ms'], help="random +/- latency jitter")
+    parser.add_argument('--cmc-rate-limit', type=int, default=DEFAULT_CONFIG['cmc_rate_limit'], help="CMC requests per minute before 429s (0 = unlimited)")
+    parser.add_argument('--dune-rate-limit', type=int, default=DEFAULT_CONFIG['dune_rate_limit'], help="Dune requests per minute before 429s (0 = unlimited)")
+    parser.add_argument('--failure-rate', type=float, default=DEFAULT_CONFIG['failure_rate'], help="share of requests answered with a 503")
+    parser.add_argument('--dune-duration', type=float, default=DEFAULT_CONFIG['dune_duration'], help="mean seconds a Dune execution runs")
+    parser.add_argument('--seed', type=int, default=DEFAULT_CONFIG['seed'], help="random seed for the synthetic data")
+
+def config_from_args(args):
+    return {key: getattr(args, key) for key in DEFAULT_CONFIG}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve stand-in CMC and Dune APIs for benchmarking")
+    parser.add_argument('--port', type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    print(f"🧪 Stub APIs on http://127.0.0.1:{args.port}/cmc and http://127.0.0.1:{args.port}/dune")
+    serve(config_from_args(args), port=args.port)
@@ -0,0 +1,203 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from metrics import METRICS
+from token_index import DATA_DIR
+
+DEFAULT_LEDGER_PATH = os.path.join(DATA_DIR, 'credits.sqlite3')
+# Dune does not report the cost of an execution in the API response, so each one is charged at this estimate
+DUNE_CREDITS_PER_EXECUTION = float(os.getenv('DUNE_CREDITS_PER_EXECUTION', '10'))
+DEFAULT_MIN_INTERVAL = 60
+DEFAULT_MAX_INTERVAL = 60 * 60
+DEFAULT_PAGE_SIZE = 200  # CMC bills listings per 200 rows
+COST_SMOOTHING = 0.3  # Weight of the latest scan in the per-scan cost estimate
+
+# CMC puts `status` first in every response body, so the credit count is found without parsing the payload
+CREDIT_COUNT_PATTERN = re.compile(rb'"credit_count"\s*:\s*(\d+)')
+WINDOWS = {'hourly': timedelta(hours=1), 'daily': timedelta(days=1)}
+
+class CreditLedger:
+    """Persistent log of credits spent per upstream
+
+    CMC calls are charged with the `status.credit_count` CMC reports in each
+    response; every Dune execution is charged DUNE_CREDITS_PER_EXECUTION.
+    Attach it to the scanner's sessions and it records every call.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH, dune_credits_per_execution=DUNE_CREDITS_PER_EXECUTION):
+        self.path = path
+        self.dune_credits_per_execution = dune_credits_per_execution
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS credits (
+                timestamp REAL,
+                upstream TEXT,
+                endpoint TEXT,
+                credits REAL
+            );
+            CREATE INDEX IF NOT EXISTS credits_upstream_time ON credits (upstream, timestamp);
+        """)
+        self.lock = threading.Lock()
+        self.totals = {'cmc': 0.0, 'dune': 0.0}  # Spent by this process
+        self.attached = set()
+
+    def attach(self, upstream, session):
+        """Charge every successful call made through `session`"""
+        if id(session) in self.attached:
+            return
+        self.attached.add(id(session))
+
+        def on_response(response, *args, **kwargs):
+            if response.status_code < 400:
+                credits = self._credits_for(upstream, response)
+                if credits:
+                    self.charge(upstream, credits, response.request.path_url.split('?')[0])
+        session.hooks['response'].append(on_response)
+
+    def _credits_for(self, upstream, response):
+        if upstream == 'dune':
+            is_execution = response.request.method == 'POST' and response.request.path_url.endswith('/execute')
+            return self.dune_credits_per_execution if is_execution else 0
+        match = CREDIT_COUNT_PATTERN.search(response.content[:2048])
+        return int(match.group(1)) if match else 1
+
+    def charge(self, upstream, credits, endpoint=''):
+        with self.lock:
+            self.conn.execute("INSERT INTO credits VALUES (?, ?, ?, ?)", (time.time(), upstream, endpoint, credits))
+            self.conn.commit()
+            self.totals[upstream] = self.totals.get(upstream, 0.0) + credits
+        METRICS.inc('credits_spent_total', credits, upstream=upstream)
+
+    def spent(self, upstream, since):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(credits), 0) FROM credits WHERE upstream = ? AND timestamp >= ?",
+                (upstream, since)
+            ).fetchone()
+        return row[0]
+
+class CreditBudget:
+    """Plans scan cadence, listings depth and Dune scoring to stay within credit budgets
+
+    Budgets are per upstream and per calendar window (UTC hour / UTC day).
+    The plan keeps scanning fully every `min_interval` while the remaining
+    budget allows it, then stretches the interval up to `max_interval`, and
+    only past that trims listings pages and fresh Dune scores per scan.
+    """
+
+    def __init__(self, ledger, budgets, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 page_size=DEFAULT_PAGE_SIZE):
+        self.ledger = ledger
+        self.page_size = page_size  # Listings depth is trimmed in whole pages
+        self.budgets = budgets  # {'cmc': {'daily': 10000, 'hourly': 500}, 'dune': {'daily': 2500}}
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.scan_cost = {'cmc': None, 'dune': None}  # Smoothed credits per full scan
+        self.dune_cost_per_score = ledger.dune_credits_per_execution
+        self.history = []  # (plan, actual) per scan
+
+    def window_state(self, upstream, now=None):
+        """(credits left, seconds left) for the tightest budget window of `upstream`, or None without a budget"""
+        now = now or datetime.now(timezone.utc)
+        tightest = None
+        for window, limit in self.budgets.get(upstream, {}).items():
+            if window == 'hourly':
+                start = now.replace(minute=0, second=0, microsecond=0)
+            else:
+                start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            seconds_left = (start + WINDOWS[window] - now).total_seconds()
+            credits_left = max(0.0, limit - self.ledger.spent(upstream, start.timestamp()))
+            # Tightest = lowest sustainable spend rate
+            if tightest is None or credits_left / seconds_left < tightest[0] / tightest[1]:
+                tightest = (credits_left, seconds_left)
+        return tightest
+
+    def plan(self, listings_max_rows, now=None):
+        """Settings for the next scan: interval, listings rows, fresh Dune scores and projected spend"""
+        plan = {'interval': self.min_interval, 'listings_max_rows': listings_max_rows, 'max_dune_scores': None,
+                'skip': False, 'projected': {}}
+        states = {upstream: self.window_state(upstream, now) for upstream in ('cmc', 'dune')}
+
+        for upstream, state in states.items():
+            cost = self.scan_cost[upstream]
+            if state is None or not cost:
+                continue
+            credits_left, seconds_left = state
+            if upstream == 'cmc' and credits_left < 1:
+                # Nothing left to fetch listings with, wait for the window to reset
+                plan['skip'] = True
+                plan['interval'] = max(plan['interval'], min(self.max_interval, seconds_left))
+                continue
+            # Interval that spreads the remaining credits evenly over the rest of the window
+            interval = seconds_left * cost / max(credits_left, 1e-9)
+            plan['interval'] = max(plan['interval'], min(self.max_interval, interval))
+
+        for upstream, state in states.items():
+            cost = self.scan_cost[upstream]
+            if upstream == 'dune' and state is not None and cost is None:
+                # No estimate yet, don't let the first scan spend more than is left
+                plan['max_dune_scores'] = int(state[0] / self.dune_cost_per_score)
+            if state is None or not cost or plan['skip']:
+                continue
+            credits_left, seconds_left = state
+            allowed = credits_left * plan['interval'] / seconds_left
+            if allowed < cost:
+                # Even the longest interval is too frequent for a full scan, make each scan cheaper
+                if upstream == 'cmc':
+                    pages = max(1, int(allowed / cost * listings_max_rows / self.page_size))
+                    plan['listings_max_rows'] = min(listings_max_rows, pages * self.page_size)
+                else:
+                    plan['max_dune_scores'] = int(allowed / self.dune_cost_per_score)
+            per_scan = min(cost, allowed)
+            plan['projected'][upstream] = {
+                'per_scan': per_scan,
+                'window': min(credits_left, per_scan * seconds_left / plan['interval']),
+                'credits_left': credits_left
+            }
+        plan['capped'] = (plan['listings_max_rows'] < listings_max_rows, plan['max_dune_scores'] is not None)
+        return plan
+
+    def record_scan(self, plan, actual, fresh_scores=0):
+        """Fold one scan's actual spend ({'cmc': credits, 'dune': credits}) into the per-scan cost estimates"""
+        capped = dict(zip(('cmc', 'dune'), plan.get('capped', (False, False))))
+        for upstream, credits in actual.items():
+            previous = self.scan_cost.get(upstream)
+            if capped.get(upstream) and previous:
+                continue  # A scan the plan cut short says nothing about the cost of a full one
+            self.scan_cost[upstream] = credits if previous is None else (
+                COST_SMOOTHING * credits + (1 - COST_SMOOTHING) * previous
+            )
+        if fresh_scores and actual.get('dune'):
+            self.dune_cost_per_score = actual['dune'] / fresh_scores
+        self.history.append((plan, actual))
+
+    def report(self, plan, actual):
+        """One line per budgeted upstream: projected vs actual spend for the last scan and the window"""
+        lines = []
+        for upstream in ('cmc', 'dune'):
+            state = self.window_state(upstream)
+            if state is None:
+                continue
+            credits_left, seconds_left = state
+            projected = plan['projected'].get(upstream)
+            projected_text = (
+                f"projected {projected['per_scan']:.0f}/scan, {projected['window']:.0f} to window end"
+                if projected else "no estimate yet"
+            )
+            lines.append(
+                f"💳 {upstream.upper()} credits: {actual.get(upstream, 0):.0f} spent this scan ({projected_text}), "
+                f"{credits_left:.0f} left with {seconds_left / 3600:.1f}h to go"
+            )
+        limits = []
+        if plan['capped'][0]:
+            limits.append(f"listings capped at {plan['listings_max_rows']} rows")
+        if plan['capped'][1]:
+            limits.append(f"at most {plan['max_dune_scores']} fresh Dune scores")
+        if limits:
+            lines.append(f"💳 Full scans would overspend the budget: {', '.join(limits)}")
+        return lines
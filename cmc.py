@@ -1,31 +1,72 @@
-import requests
 from tabulate import tabulate
 from datetime import datetime, timedelta, timezone
 from termcolor import colored
+from metrics import timed
+from token_index import TokenIndex
+from transport import get_session
+from warm_start import LastScan, BackgroundRefresh, format_age
 import time
 import os
 
 api_key = "INSERT_YOUR_API"
 
+CMC_INFO_BATCH_SIZE = 100  # /v2/cryptocurrency/info accepts comma-separated id lists
+LISTINGS_PAGE_SIZE = 500  # Rows per listings page, CMC bills per 200 rows returned either way
+LISTINGS_MAX_ROWS = 5000
+TABLE_HEADERS = ['Symbol', 'Name', 'Price 24h', 'Vol 24h%', 'Volume', 'MCap', 'Price', 'Listed', 'Address', 'Twitter', 'Telegram']
+
 class MemeScanner:
-    def __init__(self, api_key):
+    def __init__(self, api_key, token_index=None):
         self.api_key = api_key
         self.headers = {
             'X-CMC_PRO_API_KEY': api_key,
         }
+        self.session = get_session('cmc', api_key)
+        self.request_counts = {'cmc_listings': 0, 'cmc_info': 0}
+        self.listings_stats = {'pages': 0, 'bytes': 0}
+        self.token_index = token_index if token_index is not None else TokenIndex()
         print("✅ Scanner initialized with API key")
     
     def get_token_metadata(self, coin_id, symbol):
         """Fetch detailed metadata for a token"""
         print(f"📡 Fetching metadata for {symbol}...", end='', flush=True)
-        url = f'https://pro-api.coinmarketcap.com/v2/cryptocurrency/info'
-        params = {'id': coin_id}
+        metadata = self.get_tokens_metadata([coin_id]).get(coin_id)
+        print(f" ✅" if metadata else f" ❌")
+        return metadata
+
+    @timed('metadata')
+    def get_tokens_metadata(self, coin_ids, batch_size=CMC_INFO_BATCH_SIZE):
+        """Fetch metadata for many tokens with chunked multi-id info requests"""
+        url = '/v2/cryptocurrency/info'
+        results = {}
         
+        for start in range(0, len(coin_ids), batch_size):
+            chunk = coin_ids[start:start + batch_size]
+            params = {
+                'id': ','.join(str(coin_id) for coin_id in chunk),
+                'skip_invalid': 'true'
+            }
+            
+            try:
+                self.request_counts['cmc_info'] += 1
+                response = self.session.get(url, params=params)
+                data = response.json().get('data') or {}
+            except Exception as e:
+                print(f"⚠️ Metadata batch failed: {str(e)}")
+                data = {}
+            
+            # Remember every platform answer, including the non-Solana ones
+            self.token_index.record_coins(data.values())
+            for coin_id in chunk:
+                results[coin_id] = self._parse_metadata(data.get(str(coin_id)))
+        
+        return results
+
+    def _parse_metadata(self, data):
+        """Extract the fields we display from an info payload, or None for non-Solana tokens"""
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            if str(coin_id) not in response.json().get('data', {}):
+            if not data:
                 raise Exception("Token metadata not found")
-            data = response.json()['data'][str(coin_id)]
             
             # Check if token is on Solana
             platform = data.get('platform', {})
@@ -33,8 +74,7 @@ class MemeScanner:
             
             if not is_solana:
                 raise Exception("Not a Solana token")
-                
-            print(f" ✅")
+            
             return {
                 'website': data.get('urls', {}).get('website', [''])[0],
                 'twitter': data.get('urls', {}).get('twitter', [''])[0],
@@ -45,9 +85,9 @@ class MemeScanner:
                 'token_address': platform.get('token_address', 'N/A')
             }
         except Exception as e:
-            print(f" ❌")
             return None
 
+    @timed('scan')
     def scan_memecoins(self, volume_threshold=50000, min_price_increase=20, max_price_increase=300):
         """Scan for trending memecoins with enhanced data"""
         print(f"\n🔍 Scanning for Solana memecoins with:")
@@ -55,32 +95,25 @@ class MemeScanner:
         print(f"   - 24h growth range: {min_price_increase}% to {max_price_increase}%")
         
         print("\n📊 Fetching latest market data from CMC...", end='', flush=True)
-        url = 'https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest'
-        params = {
-            'limit': 5000,
-            'convert': 'USD',
-            'sort': 'percent_change_24h',
-            'sort_dir': 'desc',
-            'cryptocurrency_type': 'tokens'
-        }
-        
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            data = response.json()['data']
-            print(" ✅")
-            print(f"📈 Processing {len(data)} tokens...")
+            self.token_index.refresh(self.session)
         except Exception as e:
-            print(f" ❌\nError fetching data: {str(e)}")
+            print(f" ⚠️ Token index refresh failed: {str(e)}")
+        
+        data = self.fetch_listings(volume_threshold, min_price_increase, max_price_increase)
+        if data is None:
             return []
+        print(" ✅")
+        print(f"📈 Processing {len(data)} tokens ({self.listings_stats['pages']} page(s), "
+              f"{self.listings_stats['bytes'] / 1024:,.1f} KB downloaded)...")
         
         trending_coins = []
-        matches_found = 0
+        candidates = []
         current_time = datetime.now(timezone.utc)
         
         for index, coin in enumerate(data):
             quote = coin['quote']['USD']
             price_change = quote['percent_change_24h']
-            volume_change = quote.get('volume_change_24h', 0)
             
             # Convert date_added to UTC for comparison
             coin_date = datetime.fromisoformat(coin['date_added'].replace('Z', '+00:00'))
@@ -89,37 +122,147 @@ class MemeScanner:
                 min_price_increase <= price_change <= max_price_increase and
                 coin_date > current_time - timedelta(days=30)):
                 
-                matches_found += 1
-                print(f"\n🎯 Found potential memecoin #{matches_found}: {coin['symbol']}")
+                candidates.append(coin)
+                print(f"\n🎯 Found potential memecoin #{len(candidates)}: {coin['symbol']}")
                 print(f"   Price change: {price_change:.2f}%")
                 print(f"   Volume: ${quote['volume_24h']:,.2f}")
-                
-                # Get additional metadata and check if it's a Solana token
-                metadata = self.get_token_metadata(coin['id'], coin['symbol'])
-                if metadata:  # Only add if it's a Solana token
-                    time.sleep(0.2)  # Respect API rate limits
-                    
-                    trending_coins.append({
-                        'symbol': coin['symbol'],
-                        'name': coin['name'],
-                        'price_change_24h': price_change,
-                        'volume_24h': quote['volume_24h'],
-                        'volume_change_24h': volume_change,
-                        'market_cap': quote.get('market_cap', 0),
-                        'price': quote['price'],
-                        'date_added': coin['date_added'],
-                        **metadata
-                    })
             
             # Progress indicator every 1000 tokens
             if (index + 1) % 1000 == 0:
                 print(f"⏳ Processed {index + 1} tokens...")
         
+        # Drop ids the token index already knows are not on Solana
+        self.token_index.record_coins(data)
+        candidates = self.token_index.filter_candidates(candidates)
+        
+        # Get additional metadata in batches and keep only Solana tokens
+        print(f"\n📡 Fetching metadata for {len(candidates)} candidates...", end='', flush=True)
+        metadata_start = time.perf_counter()
+        metadata_by_id = self.get_tokens_metadata([coin['id'] for coin in candidates])
+        print(f" ✅ ({self.request_counts['cmc_info']} requests, {time.perf_counter() - metadata_start:.2f}s, "
+              f"{self.token_index.stats['avoided_calls']} skipped by token index)")
+        
+        for coin in candidates:
+            metadata = metadata_by_id.get(coin['id'])
+            if metadata:  # Only add if it's a Solana token
+                quote = coin['quote']['USD']
+                trending_coins.append({
+                    'symbol': coin['symbol'],
+                    'name': coin['name'],
+                    'price_change_24h': quote['percent_change_24h'],
+                    'volume_24h': quote['volume_24h'],
+                    'volume_change_24h': quote.get('volume_change_24h', 0),
+                    'market_cap': quote.get('market_cap', 0),
+                    'price': quote['price'],
+                    'date_added': coin['date_added'],
+                    **metadata
+                })
+        
         print(f"\n✨ Scan complete! Found {len(trending_coins)} trending Solana memecoins")
         return trending_coins
 
-    def format_results(self, coins):
-        """Format results in a clean table"""
+    @timed('listings')
+    def fetch_listings(self, volume_threshold, min_price_increase, max_price_increase, page_size=LISTINGS_PAGE_SIZE):
+        """Download listings with the thresholds applied server-side, stopping at the first short page"""
+        url = '/v1/cryptocurrency/listings/latest'
+        params = {
+            'limit': page_size,
+            'convert': 'USD',
+            'sort': 'percent_change_24h',
+            'sort_dir': 'desc',
+            'cryptocurrency_type': 'tokens',
+            'volume_24h_min': volume_threshold,
+            'percent_change_24h_min': min_price_increase,
+            'percent_change_24h_max': max_price_increase
+        }
+        
+        data = []
+        self.listings_stats = {'pages': 0, 'bytes': 0}
+        try:
+            for start in range(1, LISTINGS_MAX_ROWS + 1, page_size):
+                self.request_counts['cmc_listings'] += 1
+                response = self.session.get(url, params={**params, 'start': start})
+                page = response.json()['data']
+                self.listings_stats['pages'] += 1
+                self.listings_stats['bytes'] += len(response.content)
+                data.extend(page)
+                
+                # CMC applies percent_change_24h_min itself, so a short page is the only way to know we're done
+                if len(page) < page_size:
+                    break
+        except Exception as e:
+            print(f" ❌\nError fetching data: {str(e)}")
+            return None
+        return data
+
+    def format_changes(self, previous, coins):
+        """Print only the rows of `coins` that render differently from `previous`, plus the ones that left"""
+        coins.sort(key=lambda x: x['price_change_24h'], reverse=True)
+        before = {coin['token_address']: self._table_row(coin) for coin in previous}
+        changed_rows, unchanged = [], 0
+        for rank, coin in enumerate(coins, 1):
+            row = self._table_row(coin)
+            if coin['token_address'] not in before:
+                changed_rows.append([rank, '🟢 new'] + row)
+            elif row != before[coin['token_address']]:
+                changed_rows.append([rank, '🔄'] + row)
+            else:
+                unchanged += 1
+        current = {coin['token_address'] for coin in coins}
+        exited = [coin['symbol'] for coin in previous if coin['token_address'] not in current]
+        
+        print("\n" + "="*10)
+        print(colored("🔁 REFRESHED: CHANGES SINCE THE LAST SCAN", 'yellow', attrs=['bold']))
+        print("="*10)
+        print(f"{len(changed_rows)} changed or new, {unchanged} unchanged, {len(exited)} gone\n")
+        if changed_rows:
+            print(tabulate(changed_rows, headers=['Rank', ''] + TABLE_HEADERS, tablefmt='simple'))
+        if exited:
+            print(f"\n🔴 Gone: {', '.join(exited)}")
+
+    def _table_row(self, coin):
+        # Format price and volume changes
+        price_change = coin['price_change_24h']
+        volume_change = coin['volume_change_24h']
+        
+        price_str = f"+{price_change:.2f}%" if price_change > 0 else f"{price_change:.2f}%"
+        volume_str = f"+{volume_change:.2f}%" if volume_change > 0 else f"{volume_change:.2f}%"
+        
+        colored_price = colored(price_str, 'green' if price_change > 0 else 'red')
+        colored_volume = colored(volume_str, 'green' if volume_change > 0 else 'red')
+        
+        # Format numbers
+        def format_number(num):
+            if num >= 1e9:
+                return f"${num/1e9:.2f}B"
+            elif num >= 1e6:
+                return f"${num/1e6:.2f}M"
+            else:
+                return f"${num/1e3:.2f}K"
+        
+        # Format date
+        date = datetime.fromisoformat(coin['date_added'].replace('Z', '+00:00'))
+        days_ago = (datetime.now(timezone.utc) - date).days
+        
+        volume_formatted = format_number(coin['volume_24h'])
+        mcap_formatted = format_number(coin.get('market_cap', 0))
+        
+        return [
+            coin['symbol'],
+            coin['name'][:20] + ('...' if len(coin['name']) > 20 else ''),
+            colored_price,
+            colored_volume,
+            volume_formatted,
+            mcap_formatted,
+            f"${coin['price']:.8f}",
+            f"{days_ago}d ago",
+            coin['token_address'][:8] + '...',
+            coin['twitter'].replace('https://twitter.com/', '@'),
+            coin['telegram']
+        ]
+
+    def format_results(self, coins, stale_age=None):
+        """Format results in a clean table, marked as a previous scan `stale_age` seconds old if given"""
         if not coins:
             print("\n❌ No trending Solana memecoins found matching criteria")
             return
@@ -129,54 +272,15 @@ class MemeScanner:
         # Sort coins by price change first
         coins.sort(key=lambda x: x['price_change_24h'], reverse=True)
         
-        formatted_data = []
-        for coin in coins:
-            # Format price and volume changes
-            price_change = coin['price_change_24h']
-            volume_change = coin['volume_change_24h']
-            
-            price_str = f"+{price_change:.2f}%" if price_change > 0 else f"{price_change:.2f}%"
-            volume_str = f"+{volume_change:.2f}%" if volume_change > 0 else f"{volume_change:.2f}%"
-            
-            colored_price = colored(price_str, 'green' if price_change > 0 else 'red')
-            colored_volume = colored(volume_str, 'green' if volume_change > 0 else 'red')
-            
-            # Format numbers
-            def format_number(num):
-                if num >= 1e9:
-                    return f"${num/1e9:.2f}B"
-                elif num >= 1e6:
-                    return f"${num/1e6:.2f}M"
-                else:
-                    return f"${num/1e3:.2f}K"
-            
-            # Format date
-            date = datetime.fromisoformat(coin['date_added'].replace('Z', '+00:00'))
-            days_ago = (datetime.now(timezone.utc) - date).days
-            
-            volume_formatted = format_number(coin['volume_24h'])
-            mcap_formatted = format_number(coin.get('market_cap', 0))
-            
-            formatted_data.append([
-                coin['symbol'],
-                coin['name'][:20] + ('...' if len(coin['name']) > 20 else ''),
-                colored_price,
-                colored_volume,
-                volume_formatted,
-                mcap_formatted,
-                f"${coin['price']:.8f}",
-                f"{days_ago}d ago",
-                coin['token_address'][:8] + '...',
-                coin['twitter'].replace('https://twitter.com/', '@'),
-                coin['telegram']
-            ])
+        formatted_data = [self._table_row(coin) for coin in coins]
         
         # Print main table
-        headers = ['Symbol', 'Name', 'Price 24h', 'Vol 24h%', 'Volume', 'MCap', 'Price', 'Listed', 'Address', 'Twitter', 'Telegram']
         print("\n" + "="*10)
         print(colored("🚀 TRENDING SOLANA MEMECOINS 🚀", 'yellow', attrs=['bold']).center(10))
+        if stale_age is not None:
+            print(colored(f"🕒 From the last scan, {format_age(stale_age)} ago; refreshing in the background...", 'magenta'))
         print("="*10 + "\n")
-        print(tabulate(formatted_data, headers=headers, tablefmt='simple'))
+        print(tabulate(formatted_data, headers=TABLE_HEADERS, tablefmt='simple'))
         
         # Print detailed info for top 5 with enhanced formatting
         print("\n" + "="*10)
@@ -224,12 +328,21 @@ def main():
     
     try:
         scanner = MemeScanner(cmc_api_key)
-        trending = scanner.scan_memecoins(
-            volume_threshold=50000,
-            min_price_increase=20,
-            max_price_increase=300
-        )
-        scanner.format_results(trending)
+        params = {'volume_threshold': 50000, 'min_price_increase': 20, 'max_price_increase': 300}
+        last_scan = LastScan('cmc')
+        
+        # Show the last scan right away, then only what the fresh one changed
+        previous = last_scan.load(params)
+        if previous:
+            scanner.format_results(list(previous[0]), stale_age=previous[1])
+        trending = BackgroundRefresh(lambda: scanner.scan_memecoins(**params)).result()
+        if trending:
+            # An empty result is usually a failed download, keep the previous scan
+            last_scan.save(trending, params)
+        if previous:
+            scanner.format_changes(previous[0], trending)
+        else:
+            scanner.format_results(trending)
         print("\n✨ Scan completed successfully!")
     except Exception as e:
         print(f"\n❌ Error during execution: {str(e)}")
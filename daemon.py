@@ -0,0 +1,196 @@
+import time
+from datetime import datetime
+
+DEFAULT_INTERVAL = 300  # Seconds between scan cycles
+PRICE_CHANGE_DELTA = 10.0  # Percentage points of 24h price change that count as a material move
+VOLUME_CHANGE_RATIO = 0.5  # Relative 24h volume move that counts as material
+MAX_RETRY_BACKOFF = 8  # Most cycles a coin whose Dune score keeps failing waits between retries
+ERROR_BACKOFF = 15  # Seconds before retrying a cycle that raised, doubled per consecutive failure up to the interval
+
+class ScanDaemon:
+    """Re-runs the scan on an interval, enriching only coins that entered or changed
+
+    The previous cycle's enriched coins are kept in memory. Coins whose
+    listing inputs moved less than the thresholds keep their metadata and
+    Dune score and only get fresh price/volume fields. Coins left unscored
+    go back to Dune alone, without refetching metadata: budget skips on the
+    next cycle with Dune budget left, failed scores after a backoff that
+    doubles per consecutive failure.
+    """
+
+    def __init__(self, scanner, interval=DEFAULT_INTERVAL, pipelined=False, price_change_delta=PRICE_CHANGE_DELTA,
+                 volume_change_ratio=VOLUME_CHANGE_RATIO, on_cycle=None, budget=None, **scan_params):
+        self.scanner = scanner
+        self.interval = interval
+        self.budget = budget  # Optional CreditBudget that picks interval, listings depth and Dune scores per cycle
+        self.full_listings_rows = scanner.listings_max_rows
+        self.pipelined = pipelined
+        self.price_change_delta = price_change_delta
+        self.volume_change_ratio = volume_change_ratio
+        self.on_cycle = on_cycle or (lambda trending, events, calls: self.scanner.format_results(trending))
+        self.scan_params = {
+            'volume_threshold': 50000,
+            'min_price_increase': 20,
+            'max_price_increase': 300,
+            **scan_params
+        }
+        # CMC id -> {'coin': listing row at last enrichment, 'coin_data': enriched result,
+        #            'failures': consecutive failed Dune scores, 'retry_cycle': first cycle to retry a failed one}
+        self.state = {}
+        self.cycles = 0
+
+    def run(self, max_cycles=None):
+        failures = 0
+        while max_cycles is None or self.cycles < max_cycles:
+            started = time.monotonic()
+            try:
+                self.run_cycle()
+                failures = 0
+            except Exception as e:
+                # A network error or a locked database shouldn't end a long-running daemon
+                failures += 1
+                print(f"❌ Cycle {self.cycles} failed: {str(e)}")
+            if max_cycles is not None and self.cycles >= max_cycles:
+                break
+            interval = min(self.interval, ERROR_BACKOFF * 2 ** (failures - 1)) if failures else self.interval
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def run_cycle(self):
+        """One scan cycle; returns (trending coins, events, upstream call counts)"""
+        self.cycles += 1
+        print(f"\n🔁 Cycle {self.cycles} at {datetime.now().strftime('%H:%M:%S')}")
+        calls_before = self._call_counts()
+        plan = self._apply_plan() if self.budget else None
+        if plan and plan['skip']:
+            print(f"💳 CMC credit budget exhausted, next cycle in {self.interval / 60:.0f} min")
+            return None, [], self._call_deltas(calls_before)
+
+        data = self.scanner.fetch_listings(**self.scan_params)
+        if data is None:
+            # Keep the previous state so the next cycle can still diff against it
+            calls = self._call_deltas(calls_before)
+            self._record_spend(plan, calls)
+            return None, [], calls
+
+        candidates = self.scanner.select_candidates(data, **self.scan_params)
+        del data
+        entered = [coin for coin in candidates if coin['id'] not in self.state]
+        changed = [
+            coin for coin in candidates
+            if coin['id'] in self.state and self._changed_materially(self.state[coin['id']]['coin'], coin)
+        ]
+        enriched = {
+            coin_data['id']: coin_data
+            for coin_data in self.scanner.enrich_candidates(entered + changed, self.pipelined)
+        }
+        changed_ids = {coin['id'] for coin in changed}
+        # Unchanged coins an earlier cycle left unscored only go back to Dune, while this cycle has Dune budget left
+        unscored = [
+            self.state[coin['id']]['coin_data'].with_listing(coin) for coin in candidates
+            if coin['id'] in self.state and coin['id'] not in changed_ids
+            and self._needs_rescore(self.state[coin['id']])
+        ]
+        rescored = {}
+        if unscored and self.scanner.dune_budget['left'] != 0:
+            rescored = {coin_data.id: coin_data for coin_data in self.scanner.rescore_with_dune(unscored)}
+
+        events = []
+        new_state = {}
+        for coin in candidates:
+            if coin['id'] in enriched:
+                new_state[coin['id']] = self._entry(coin, enriched[coin['id']], self.state.get(coin['id']))
+                kind = 'changed' if coin['id'] in self.state else 'entered'
+                events.append({'event': kind, 'id': coin['id'], 'symbol': coin['symbol']})
+            elif coin['id'] in rescored:
+                # Still diffed against the listing it was enriched with, and not reported as a change
+                previous = self.state[coin['id']]
+                new_state[coin['id']] = self._entry(previous['coin'], rescored[coin['id']], previous)
+            elif coin['id'] in self.state:
+                # Unchanged coin: fresh listing fields over the previous metadata and Dune score
+                previous = self.state[coin['id']]
+                new_state[coin['id']] = {
+                    **previous,
+                    'coin_data': previous['coin_data'].with_listing(coin)
+                }
+
+        for coin_id, previous in self.state.items():
+            if coin_id not in new_state:
+                events.append({'event': 'exited', 'id': coin_id, 'symbol': previous['coin']['symbol']})
+
+        self.state = new_state
+        trending = [entry['coin_data'] for entry in new_state.values()]
+        self.scanner.record_snapshot(candidates, trending, self.scan_params)
+        calls = self._call_deltas(calls_before)
+
+        self._print_events(events)
+        print(f"📞 Upstream calls this cycle: CMC {calls['cmc']}, Dune {calls['dune']} "
+              f"({calls['dune_executions']} executions), enriched {len(enriched)}/{len(trending)} coins, "
+              f"re-scored {len(rescored)} on Dune")
+        self._record_spend(plan, calls)
+        self.on_cycle(trending, events, calls)
+        return trending, events, calls
+
+    def _needs_rescore(self, entry):
+        source = entry['coin_data'].dune_source
+        # Left unscored by an earlier cycle's credit budget or deadline, try again right away
+        if source == 'skipped':
+            return True
+        # A transient Dune error or timeout, try again once its backoff is over
+        return source == 'failed' and self.cycles >= entry['retry_cycle']
+
+    def _entry(self, coin, coin_data, previous):
+        failures = 0
+        if coin_data.dune_source == 'failed':
+            failures = (previous['failures'] if previous else 0) + 1
+        return {
+            'coin': coin,
+            'coin_data': coin_data,
+            'failures': failures,
+            'retry_cycle': self.cycles + min(MAX_RETRY_BACKOFF, 2 ** max(0, failures - 1))
+        }
+
+    def _changed_materially(self, before, after):
+        before_quote = before['quote']['USD']
+        after_quote = after['quote']['USD']
+        if abs(after_quote['percent_change_24h'] - before_quote['percent_change_24h']) >= self.price_change_delta:
+            return True
+        before_volume = before_quote['volume_24h'] or 0
+        if not before_volume:
+            return bool(after_quote['volume_24h'])
+        return abs(after_quote['volume_24h'] - before_volume) / before_volume >= self.volume_change_ratio
+
+    def _apply_plan(self):
+        plan = self.budget.plan(self.full_listings_rows)
+        self.interval = plan['interval']
+        self.scanner.listings_max_rows = plan['listings_max_rows']
+        self.scanner.max_dune_scores = plan['max_dune_scores']
+        return plan
+
+    def _record_spend(self, plan, calls):
+        if not plan:
+            return
+        actual = {'cmc': calls['cmc_credits'], 'dune': calls['dune_credits']}
+        self.budget.record_scan(plan, actual, self.scanner.dune_budget['fresh'])
+        for line in self.budget.report(plan, actual):
+            print(line)
+        print(f"💳 Next cycle in {self.interval / 60:.1f} min")
+
+    def _call_counts(self):
+        ledger = self.scanner.ledger
+        return {
+            'cmc': self.scanner.cmc_session.stats['requests'],
+            'dune': self.scanner.dune_client.session.stats['requests'],
+            'dune_executions': self.scanner.dune_client.executions.stats['submitted'],
+            'cmc_credits': ledger.totals['cmc'] if ledger else 0,
+            'dune_credits': ledger.totals['dune'] if ledger else 0
+        }
+
+    def _call_deltas(self, before):
+        return {key: value - before[key] for key, value in self._call_counts().items()}
+
+    def _print_events(self, events):
+        icons = {'entered': '🟢 Entered', 'exited': '🔴 Exited', 'changed': '🔄 Changed'}
+        for event in events:
+            print(f"{icons[event['event']]}: {event['symbol']}")
+        if not events:
+            print("💤 No changes since last cycle")
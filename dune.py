@@ -1,25 +1,39 @@
+import os
+import warnings
 import requests
-import time
-import json
+from dune_executions import ExecutionManager
+from transport import get_session
+
+RESULT_PAGE_SIZE = 1000  # Rows per results page when paging through an execution
 
 class DuneClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, session=None, execution_manager=None):
         self.api_key = api_key
-        self.base_url = "https://api.dune.com/api/v1"
-        self.headers = {
-            "X-Dune-API-Key": self.api_key,
-            "Content-Type": "application/json"
-        }
+        self.session = session or get_session('dune', api_key)
+        self.base_url = self.session.base_url
+        self.executions = execution_manager or ExecutionManager(self)
+
+    def deadline_passed(self):
+        """True once the executions' global deadline has passed or they were closed"""
+        return self.executions.deadline_passed()
 
     def execute_query(self, query_id, token_address):
+        return self._execute(query_id, {"token_address": token_address})
+
+    def execute_batch_query(self, query_id, token_addresses):
+        """Start one execution of a multi-token query taking a comma-separated `token_addresses` parameter"""
+        return self._execute(query_id, {"token_addresses": ",".join(token_addresses)})
+
+    def _execute(self, query_id, query_parameters):
+        # Anything started after the deadline would be cancelled right away and still be billed
+        if self.deadline_passed():
+            raise TimeoutError("Dune deadline passed or executions closed, not starting a new execution")
         url = f"{self.base_url}/query/{query_id}/execute"
         parameters = {
-            "query_parameters": {
-                "token_address": token_address
-            }
+            "query_parameters": query_parameters
         }
         try:
-            response = requests.post(url, headers=self.headers, json=parameters)
+            response = self.session.post(url, json=parameters)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -27,40 +41,64 @@ class DuneClient:
                 print(f"Response content: {e.response.text}")
             raise
 
-    def get_execution_status(self, execution_id):
+    def get_execution_status(self, execution_id, timeout=None):
         url = f"{self.base_url}/execution/{execution_id}/status"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, **_timeout(timeout))
         response.raise_for_status()
         return response.json()
 
-    def get_execution_result(self, execution_id):
+    def get_execution_result(self, execution_id, limit=None, offset=None):
         url = f"{self.base_url}/execution/{execution_id}/results"
-        response = requests.get(url, headers=self.headers)
+        params = {key: value for key, value in (("limit", limit), ("offset", offset)) if value is not None}
+        response = self.session.get(url, params=params or None)
         response.raise_for_status()
         return response.json()
 
-    def execute_query_and_wait(self, query_id, token_address, max_retries=50, sleep_time=5):
-        try:
-            execution = self.execute_query(query_id, token_address)
-            execution_id = execution['execution_id']
-
-            for _ in range(max_retries):
-                status = self.get_execution_status(execution_id)
-                state = status.get('state', 'UNKNOWN')
-                
-                if state == 'QUERY_STATE_COMPLETED':
-                    return self.get_execution_result(execution_id)
-                elif state == 'QUERY_STATE_FAILED':
-                    raise Exception("Query failed")
-                elif state == 'QUERY_STATE_CANCELLED':
-                    raise Exception("Query was cancelled")
-                
-                time.sleep(sleep_time)
-                
-            raise TimeoutError("Query execution timed out")
-            
-        except Exception as e:
-            raise
+    def get_execution_rows(self, execution_id, page_size=RESULT_PAGE_SIZE):
+        """All result rows of an execution, following `next_offset` page by page"""
+        rows = []
+        offset = 0
+        while offset is not None:
+            page = self.get_execution_result(execution_id, limit=page_size, offset=offset)
+            rows.extend(page.get('result', {}).get('rows', []))
+            offset = page.get('next_offset')
+        return rows
+
+    def get_latest_result(self, query_id, token_address):
+        """Latest stored results for the query and parameters, without starting an execution"""
+        url = f"{self.base_url}/query/{query_id}/results"
+        response = self.session.get(url, params={"params.token_address": token_address})
+        response.raise_for_status()
+        return response.json()
+
+    def cancel_execution(self, execution_id, timeout=None):
+        url = f"{self.base_url}/execution/{execution_id}/cancel"
+        response = self.session.post(url, **_timeout(timeout))
+        response.raise_for_status()
+        return response.json()
+
+    def wait_for_execution(self, execution_id, timeout=None):
+        """Wait on the shared execution manager, which polls with backoff and cancels on timeout"""
+        return self.executions.wait(self.executions.track(execution_id, timeout=timeout))
+
+    def execute_query_and_wait(self, query_id, token_address, timeout=None, max_retries=None, sleep_time=None):
+        if max_retries is not None or sleep_time is not None:
+            # Polling moved to the execution manager's backoff, `timeout` bounds the wait now
+            warnings.warn("execute_query_and_wait() ignores max_retries and sleep_time, pass timeout instead",
+                          DeprecationWarning, stacklevel=2)
+        execution = self.execute_query(query_id, token_address)
+        self.wait_for_execution(execution['execution_id'], timeout)
+        return self.get_execution_result(execution['execution_id'])
+
+    def execute_batch_and_wait(self, query_id, token_addresses, timeout=None):
+        """Score many tokens in one execution and return every result row"""
+        execution = self.execute_batch_query(query_id, token_addresses)
+        self.wait_for_execution(execution['execution_id'], timeout)
+        return self.get_execution_rows(execution['execution_id'])
+
+def _timeout(timeout):
+    # Leave the session's default in place unless the caller wants a tighter one
+    return {'timeout': timeout} if timeout else {}
 
 if __name__ == "__main__":
     API_KEY = os.getenv('DUNE_TOKEN')
@@ -83,3 +121,7 @@ if __name__ == "__main__":
             
     except Exception as e:
         print(f"Error: {str(e)}")
+    
+    for execution in client.executions.status():
+        print(f"Execution {execution['execution_id']}: {execution['state']} in {execution['latency']:.1f}s "
+              f"({execution['polls']} status checks)")
@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import deque
+from metrics import METRICS
+
+COMPLETED_STATES = {'QUERY_STATE_COMPLETED', 'QUERY_STATE_COMPLETED_PARTIAL'}
+FAILED_STATES = {'QUERY_STATE_FAILED': "Query failed", 'QUERY_STATE_CANCELLED': "Query was cancelled",
+                 'QUERY_STATE_EXPIRED': "Query expired"}
+
+DEFAULT_EXECUTION_TIMEOUT = 240  # Seconds before a single execution is cancelled
+FIRST_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 10.0
+POLL_BACKOFF = 1.5
+REQUEST_TIMEOUT = (5, 15)  # Seconds to connect and read for status and cancel calls, which block the poller
+
+class DuneExecution:
+    """One tracked execution with its state, poll count and latency"""
+
+    def __init__(self, execution_id, query_id, timeout):
+        now = time.monotonic()
+        self.execution_id = execution_id
+        self.query_id = query_id
+        self.state = 'QUERY_STATE_PENDING'
+        self.submitted_at = now
+        self.finished_at = None
+        self.deadline = now + timeout
+        self.interval = FIRST_POLL_INTERVAL
+        self.next_poll_at = now + FIRST_POLL_INTERVAL
+        self.polls = 0
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def latency(self):
+        return (self.finished_at or time.monotonic()) - self.submitted_at
+
+    def as_dict(self):
+        return {
+            'execution_id': self.execution_id,
+            'query_id': self.query_id,
+            'state': self.state,
+            'polls': self.polls,
+            'latency': round(self.latency, 3),
+            'error': str(self.error) if self.error else None
+        }
+
+class ExecutionManager:
+    """Tracks many in-flight Dune executions from a single polling thread
+
+    Each execution is polled on its own schedule, starting fast and backing
+    off towards MAX_POLL_INTERVAL, so short queries return quickly while long
+    ones cost few status calls. Executions that pass their own deadline or the
+    manager's global deadline, or that nobody is waiting for any more, are
+    cancelled on Dune so they stop burning credits.
+    """
+
+    def __init__(self, client, execution_timeout=DEFAULT_EXECUTION_TIMEOUT, global_timeout=None, history=1000):
+        self.client = client
+        self.execution_timeout = execution_timeout
+        self.global_deadline = None
+        self.closed = False  # Set by close(), nothing new is started until the next reset_deadline()
+        self.in_flight = {}
+        self.finished = deque(maxlen=history)
+        self.condition = threading.Condition()
+        self.poller = None
+        self.stats = {'submitted': 0, 'status_calls': 0, 'completed': 0, 'failed': 0, 'timed_out': 0, 'cancelled': 0}
+        if global_timeout:
+            self.reset_deadline(global_timeout)
+
+    def reset_deadline(self, global_timeout=None):
+        """Start a new global deadline (e.g. per scan); None removes it. Reopens a closed manager"""
+        with self.condition:
+            self.global_deadline = time.monotonic() + global_timeout if global_timeout else None
+            self.closed = False
+            self.condition.notify()
+
+    def deadline_passed(self):
+        """True once the global deadline has passed or the manager was closed; nothing new should be started then"""
+        with self.condition:
+            return self.closed or (self.global_deadline is not None and time.monotonic() >= self.global_deadline)
+
+    def submit(self, query_id, query_parameters, timeout=None):
+        """Start an execution on Dune and begin tracking it"""
+        if self.deadline_passed():
+            raise TimeoutError("Dune deadline passed or executions closed, not starting a new execution")
+        execution = self.client._execute(query_id, query_parameters)
+        return self.track(execution['execution_id'], query_id, timeout)
+
+    def track(self, execution_id, query_id=None, timeout=None):
+        execution = DuneExecution(execution_id, query_id, timeout or self.execution_timeout)
+        with self.condition:
+            closed = self.closed
+            self.in_flight[execution_id] = execution
+            self.stats['submitted'] += 1
+            METRICS.inc('dune_executions_submitted_total')
+            self._ensure_poller()
+            self.condition.notify()
+        if closed:
+            # Started while the manager was closing, nobody will wait for it
+            self.cancel(execution, "Execution abandoned")
+        return execution
+
+    def wait(self, execution):
+        """Block until the execution finishes; raises if it failed or timed out
+
+        The execution's deadline is enforced here as well, so a poller held
+        up by a slow status call can't keep waiters past it.
+        """
+        try:
+            while not execution.done.wait(max(0.0, self._deadline(execution) - time.monotonic())):
+                if time.monotonic() >= self._deadline(execution):
+                    self.cancel(execution, TimeoutError("Query execution timed out"), timed_out=True)
+        except BaseException:
+            # The waiter is going away (e.g. Ctrl+C), nobody needs this execution any more
+            self.cancel(execution, "Execution abandoned")
+            raise
+        if execution.error:
+            raise execution.error
+        return execution
+
+    def wait_all(self, executions, timeout=None):
+        """Wait for several executions, cancelling whatever is still running after `timeout`"""
+        deadline = time.monotonic() + timeout if timeout else None
+        for execution in executions:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not execution.done.wait(remaining):
+                self.cancel(execution, TimeoutError("Query execution timed out"), timed_out=True)
+        return executions
+
+    def cancel(self, execution, reason="Execution cancelled", timed_out=False):
+        with self.condition:
+            if execution.execution_id not in self.in_flight:
+                return
+            self._finish(execution, 'QUERY_STATE_CANCELLED',
+                         reason if isinstance(reason, Exception) else Exception(reason))
+            self.stats['cancelled'] += 1
+            if timed_out:
+                self.stats['timed_out'] += 1
+        try:
+            self.client.cancel_execution(execution.execution_id, timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️ Could not cancel Dune execution {execution.execution_id}: {str(e)}")
+
+    def close(self):
+        """Cancel everything still running and refuse new executions"""
+        with self.condition:
+            self.closed = True
+            pending = list(self.in_flight.values())
+        for execution in pending:
+            self.cancel(execution, "Execution abandoned")
+
+    def status(self):
+        """Snapshot of in-flight and recently finished executions"""
+        with self.condition:
+            return [execution.as_dict() for execution in list(self.in_flight.values()) + list(self.finished)]
+
+    def summary(self):
+        with self.condition:
+            latencies = sorted(execution.latency for execution in self.finished if not execution.error)
+            return {
+                **self.stats,
+                'in_flight': len(self.in_flight),
+                'avg_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+                'max_latency': latencies[-1] if latencies else 0.0
+            }
+
+    def _deadline(self, execution):
+        with self.condition:
+            if self.global_deadline is None:
+                return execution.deadline
+            return min(execution.deadline, self.global_deadline)
+
+    def _ensure_poller(self):
+        if self.poller is None or not self.poller.is_alive():
+            self.poller = threading.Thread(target=self._poll_loop, name='dune-poller', daemon=True)
+            self.poller.start()
+
+    def _finish(self, execution, state, error=None):
+        # Caller holds self.condition
+        execution.state = state
+        execution.error = error
+        execution.finished_at = time.monotonic()
+        METRICS.observe('dune_execution_seconds', execution.latency, state=state)
+        self.in_flight.pop(execution.execution_id, None)
+        self.finished.append(execution)
+        execution.done.set()
+
+    def _poll_loop(self):
+        while True:
+            with self.condition:
+                while not self.in_flight:
+                    self.condition.wait()
+                now = time.monotonic()
+                expired = [
+                    execution for execution in self.in_flight.values()
+                    if now >= execution.deadline or (self.global_deadline and now >= self.global_deadline)
+                ]
+                due = [
+                    execution for execution in self.in_flight.values()
+                    if execution not in expired and execution.next_poll_at <= now
+                ]
+                if not expired and not due:
+                    next_at = min(execution.next_poll_at for execution in self.in_flight.values())
+                    if self.global_deadline:
+                        next_at = min(next_at, self.global_deadline)
+                    self.condition.wait(max(0.0, next_at - now))
+                    continue
+
+            for execution in expired:
+                self.cancel(execution, TimeoutError("Query execution timed out"), timed_out=True)
+            for execution in due:
+                self._poll(execution)
+
+    def _poll(self, execution):
+        try:
+            with self.condition:
+                self.stats['status_calls'] += 1
+            METRICS.inc('dune_status_polls_total')
+            state = self.client.get_execution_status(execution.execution_id, timeout=REQUEST_TIMEOUT).get('state', 'UNKNOWN')
+        except Exception as e:
+            # Transient status errors just push the next poll out
+            state = execution.state
+
+        with self.condition:
+            if execution.execution_id not in self.in_flight:
+                return
+            execution.polls += 1
+            if state in COMPLETED_STATES:
+                self.stats['completed'] += 1
+                self._finish(execution, state)
+            elif state in FAILED_STATES:
+                self.stats['failed'] += 1
+                self._finish(execution, state, Exception(FAILED_STATES[state]))
+            else:
+                execution.state = state
+                execution.interval = min(MAX_POLL_INTERVAL, execution.interval * POLL_BACKOFF)
+                execution.next_poll_at = time.monotonic() + execution.interval
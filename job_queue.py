@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from metrics import METRICS
+from token_index import DATA_DIR
+
+DEFAULT_QUEUE_PATH = os.path.join(DATA_DIR, 'jobs.sqlite3')
+DEFAULT_LEASE = 5 * 60  # Seconds a worker owns a job before another worker may take it over
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 5  # Seconds before a failed job is offered again, doubled per attempt
+
+class JobQueue:
+    """Durable SQLite job queue with leases, shared by processes on one machine
+
+    A worker leases a job for `lease` seconds and renews the lease while it
+    works on the job. If the worker crashes or hangs, the lease runs out and
+    the job goes to the next worker that asks.
+    Failed jobs are retried with backoff until they have used `max_attempts`.
+    Finishing a job only counts while the worker still holds its lease, so a
+    job that was taken over is not recorded twice.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, lease=DEFAULT_LEASE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit, transactions are explicit so leasing can take the write lock up front
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scan_id TEXT,
+                position INTEGER,
+                payload TEXT,
+                state TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                available_at REAL,
+                worker TEXT,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_available ON jobs (state, available_at);
+            CREATE INDEX IF NOT EXISTS jobs_scan ON jobs (scan_id, position);
+        """)
+        self.lock = threading.Lock()
+
+    def put_many(self, scan_id, payloads):
+        """Queue one job per payload, remembering their order for the merged results"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT INTO jobs (scan_id, position, payload, available_at) VALUES (?, ?, ?, ?)",
+                [(scan_id, position, json.dumps(payload), now) for position, payload in enumerate(payloads)]
+            )
+            self.conn.execute("COMMIT")
+        METRICS.inc('queue_jobs_total', len(payloads))
+
+    def lease_next(self, scan_id, worker):
+        """Lease the oldest available job of `scan_id`, or None; returns {'job_id', 'payload', 'attempts'}"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    # Pending jobs past their backoff, and leased jobs whose lease ran out
+                    row = self.conn.execute(
+                        "SELECT job_id, payload, attempts, state FROM jobs "
+                        "WHERE scan_id = ? AND state IN ('pending', 'leased') AND available_at <= ? "
+                        "ORDER BY position LIMIT 1",
+                        (scan_id, now)
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    job_id, payload, attempts, state = row
+                    if attempts < self.max_attempts:
+                        break
+                    # Its last lease ran out, the worker died on it every time
+                    self.conn.execute("UPDATE jobs SET state = 'failed', error = 'lease expired' WHERE job_id = ?",
+                                      (job_id,))
+                self.conn.execute(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, available_at = ?, worker = ? "
+                    "WHERE job_id = ?",
+                    (now + self.lease, worker, job_id)
+                )
+            finally:
+                self.conn.execute("COMMIT")
+        if state == 'leased':
+            METRICS.inc('queue_lease_expired_total')
+        return {'job_id': job_id, 'payload': json.loads(payload), 'attempts': attempts + 1}
+
+    def renew(self, job_id, worker):
+        """Extend `worker`'s lease on a running job by another `lease` seconds; False if it was already lost"""
+        with self.lock:
+            renewed = self.conn.execute(
+                "UPDATE jobs SET available_at = ? WHERE job_id = ? AND worker = ? AND state = 'leased'",
+                (time.time() + self.lease, job_id, worker)
+            ).rowcount
+        return renewed == 1
+
+    def complete(self, job_id, worker, result, retry_payload=None, error=None):
+        """Store a job's result (a list); False if the lease was lost to another worker
+
+        With `retry_payload` the job is only partly done: the result so far is
+        kept and the job goes back to pending with just what is left, after
+        the usual backoff, so only the part that failed is retried. Results of
+        every part are concatenated.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT result, attempts FROM jobs WHERE job_id = ? AND worker = ? AND state = 'leased'",
+                    (job_id, worker)
+                ).fetchone()
+                if row is None:
+                    return False
+                result = (json.loads(row[0]) if row[0] else []) + result
+                if retry_payload is None:
+                    self.conn.execute("UPDATE jobs SET state = 'done', result = ? WHERE job_id = ?",
+                                      (json.dumps(result, default=str), job_id))
+                else:
+                    self.conn.execute(
+                        "UPDATE jobs SET state = 'pending', result = ?, payload = ?, error = ?, available_at = ? "
+                        "WHERE job_id = ?",
+                        (json.dumps(result, default=str), json.dumps(retry_payload), str(error),
+                         time.time() + RETRY_BACKOFF * 2 ** (row[1] - 1), job_id)
+                    )
+            finally:
+                self.conn.execute("COMMIT")
+        if retry_payload is not None:
+            METRICS.inc('queue_job_failures_total', final='false')
+        return True
+
+    def fail(self, job_id, worker, error):
+        """Give a job back for a retry after backoff, or mark it failed once out of attempts
+
+        Returns the job's new state, or None if the lease was lost to another worker.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT attempts FROM jobs WHERE job_id = ? AND worker = ? AND state = 'leased'",
+                    (job_id, worker)
+                ).fetchone()
+                if row is None:
+                    return None
+                state = 'failed' if row[0] >= self.max_attempts else 'pending'
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, available_at = ? WHERE job_id = ?",
+                    (state, str(error), time.time() + RETRY_BACKOFF * 2 ** (row[0] - 1), job_id)
+                )
+            finally:
+                self.conn.execute("COMMIT")
+        METRICS.inc('queue_job_failures_total', final=str(state == 'failed').lower())
+        return state
+
+    def progress(self, scan_id):
+        """Job counts by state for `scan_id`"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*), SUM(attempts) FROM jobs WHERE scan_id = ? GROUP BY state", (scan_id,)
+            ).fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0, 'attempts': 0}
+        for state, count, attempts in rows:
+            counts[state] = count
+            counts['attempts'] += attempts or 0
+        return counts
+
+    def results(self, scan_id):
+        """(result, worker) of every job of `scan_id` with a result, in queue order
+
+        That includes the parts finished of jobs that failed on their remainder.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT result, worker FROM jobs WHERE scan_id = ? AND result IS NOT NULL ORDER BY position",
+                (scan_id,)
+            ).fetchall()
+        return [(json.loads(result), worker) for result, worker in rows]
+
+    def purge(self, scan_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM jobs WHERE scan_id = ?", (scan_id,))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,142 @@
+from datetime import datetime, timezone
+from functools import cached_property
+from operator import itemgetter
+import numpy as np
+
+MAX_TOKEN_AGE = 30 * 24 * 60 * 60  # Only tokens listed in the last 30 days
+# Share of each CMC signal in the local pre-score
+PRE_SCORE_WEIGHTS = {'volume': 0.3, 'price_change': 0.2, 'volume_change': 0.2, 'market_cap': 0.15, 'age': 0.15}
+DUNE_WEIGHT = 0.7  # Share of the Dune score in the blended ranking score, the pre-score gets the rest
+
+class ListingsFrame:
+    """Columnar view of a CMC listings payload for vectorized filtering
+
+    The payload is parsed once into NumPy arrays (volume, 24h change, market
+    cap, epoch-second listing dates), so any number of threshold sets can be
+    evaluated against it with boolean masks instead of a Python loop. Listing
+    dates are only parsed for rows that pass the cheap numeric masks, and
+    are cached for later masks.
+    """
+
+    def __init__(self, coins):
+        self.coins = coins
+        self.quotes = [coin['quote']['USD'] for coin in coins]
+        self.volume = _fast_column(self.quotes, 'volume_24h')
+        self.price_change = _fast_column(self.quotes, 'percent_change_24h')
+        self._date_added = np.full(len(coins), np.nan)
+
+    def __len__(self):
+        return len(self.coins)
+
+    @cached_property
+    def ids(self):
+        return np.fromiter((coin['id'] for coin in self.coins), dtype=np.int64, count=len(self.coins))
+
+    @cached_property
+    def market_cap(self):
+        return _column(self.quotes, 'market_cap')
+
+    @cached_property
+    def volume_change(self):
+        return _column(self.quotes, 'volume_change_24h')
+
+    @property
+    def date_added(self):
+        return self.dates_for(np.arange(len(self.coins)))
+
+    def dates_for(self, indices):
+        """Epoch-second listing dates for `indices`, parsing only rows not seen before"""
+        missing = indices[np.isnan(self._date_added[indices])]
+        if len(missing):
+            self._date_added[missing] = _parse_dates([self.coins[index]['date_added'] for index in missing])
+        return self._date_added[indices]
+
+    def mask(self, volume_threshold, min_price_increase, max_price_increase, now=None, max_age=MAX_TOKEN_AGE):
+        """Boolean mask of rows passing the scanner's listings filter"""
+        now = (now or datetime.now(timezone.utc)).timestamp()
+        mask = (
+            (self.volume > volume_threshold) &
+            (self.price_change >= min_price_increase) &
+            (self.price_change <= max_price_increase)
+        )
+        indices = np.flatnonzero(mask)
+        mask[indices] = self.dates_for(indices) > now - max_age
+        return mask
+
+    def select(self, volume_threshold, min_price_increase, max_price_increase, now=None, max_age=MAX_TOKEN_AGE):
+        """Listings rows passing the filter, in payload order"""
+        indices = np.flatnonzero(self.mask(volume_threshold, min_price_increase, max_price_increase, now, max_age))
+        return [self.coins[index] for index in indices]
+
+def pre_scores(coins, now=None, max_age=MAX_TOKEN_AGE):
+    """Cheap 0-100 score per listings row from the CMC fields alone, in one vectorized pass
+
+    Each signal is squashed onto 0-1 against fixed ranges, so scores from
+    different scans compare: volume ($10k-$100M, log scale), 24h price
+    change and 24h volume change (0-1000%, log scale), market cap (smaller
+    is better, $100k-$10B) and listing age (newer is better, over `max_age`).
+    Missing values count as 0, except market cap which counts as neutral.
+    """
+    frame = ListingsFrame(coins)
+    now = (now or datetime.now(timezone.utc)).timestamp()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        signals = {
+            'volume': _squash(np.log10(frame.volume), 4, 8),
+            'price_change': _squash(np.log1p(np.maximum(frame.price_change, 0) / 100), 0, np.log1p(10)),
+            'volume_change': _squash(np.log1p(np.maximum(frame.volume_change, 0) / 100), 0, np.log1p(10)),
+            'market_cap': np.where(frame.market_cap > 0, 1 - _squash(np.log10(frame.market_cap), 5, 10), 0.5),
+            'age': 1 - _squash(now - frame.date_added, 0, max_age)
+        }
+    score = sum(weight * np.nan_to_num(signals[name], nan=0.5 if name == 'market_cap' else 0.0)
+                for name, weight in PRE_SCORE_WEIGHTS.items())
+    return np.round(100 * score, 1)
+
+def blended_scores(coins, dune_weight=DUNE_WEIGHT):
+    """Ranking score per result: Dune score and pre-score blended, whichever exists otherwise, -1 for neither"""
+    dune = np.fromiter(
+        (float(coin['dune_score']) if isinstance(coin['dune_score'], (int, float)) else np.nan for coin in coins),
+        dtype=np.float64, count=len(coins)
+    )
+    pre = np.fromiter(
+        (np.nan if coin.get('pre_score') is None else coin.get('pre_score') for coin in coins),
+        dtype=np.float64, count=len(coins)
+    )
+    blended = np.where(
+        np.isnan(dune), pre, np.where(np.isnan(pre), dune, dune_weight * dune + (1 - dune_weight) * pre)
+    )
+    return np.nan_to_num(blended, nan=-1)
+
+def rank_order(coins):
+    """Indices sorting results by blended score then 24h change, both descending
+
+    Results without a pre-score rank by Dune score alone, as they always
+    did. np.lexsort is stable, so ties keep their input order exactly like
+    list.sort(reverse=True) does.
+    """
+    scores = blended_scores(coins)
+    price_change = np.fromiter((coin['price_change_24h'] for coin in coins), dtype=np.float64, count=len(coins))
+    return np.lexsort((-price_change, -scores))
+
+def _squash(values, low, high):
+    return np.clip((values - low) / (high - low), 0, 1)
+
+def _fast_column(quotes, key):
+    try:
+        return np.fromiter(map(itemgetter(key), quotes), dtype=np.float64, count=len(quotes))
+    except (KeyError, TypeError):
+        return _column(quotes, key)
+
+def _column(quotes, key):
+    # Missing values become NaN, which fails every comparison
+    return np.array([quote.get(key) for quote in quotes], dtype=np.float64)
+
+def _parse_dates(values):
+    try:
+        # CMC dates are UTC with a trailing Z, which NumPy parses natively once stripped
+        parsed = np.array([value[:-1] if value.endswith('Z') else value for value in values], dtype='datetime64[us]')
+        return parsed.astype(np.int64) / 1e6
+    except ValueError:
+        return np.fromiter(
+            (datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() for value in values),
+            dtype=np.float64, count=len(values)
+        )
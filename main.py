@@ -1,99 +1,158 @@
-import requests
 import time
 import json
 import os
+import argparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tabulate import tabulate
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from termcolor import colored
+from budget import CreditLedger, CreditBudget, DEFAULT_MAX_INTERVAL
+from daemon import ScanDaemon, DEFAULT_INTERVAL
+from dune import DuneClient
+from listings_frame import ListingsFrame, rank_order, pre_scores, blended_scores, MAX_TOKEN_AGE
+from metrics import METRICS, timed, timed_iter
+from recorder import ScanRecorder
+from score_cache import ScoreCache, DEFAULT_TTL
+from service import ScanService, serve, DEFAULT_HOST, DEFAULT_PORT
+from sharding import Coordinator, load_key_sets
+from snapshot_store import SnapshotStore
+from token_index import TokenIndex
+from token_record import TokenRecord
+from transport import get_session
+from warm_start import LastScan, BackgroundRefresh, format_age
+from watchlist import Watchlist, DEFAULT_TICK, DEFAULT_SWEEP_INTERVAL
 
-class DuneClient:
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.base_url = "https://api.dune.com/api/v1"
-        self.headers = {
-            "X-Dune-API-Key": self.api_key,
-            "Content-Type": "application/json"
-        }
-
-    def execute_query(self, query_id, token_address):
-        url = f"{self.base_url}/query/{query_id}/execute"
-        parameters = {
-            "query_parameters": {
-                "token_address": token_address
-            }
-        }
-        try:
-            response = requests.post(url, headers=self.headers, json=parameters)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            if hasattr(e.response, 'text'):
-                print(f"Response content: {e.response.text}")
-            raise
-
-    def get_execution_status(self, execution_id):
-        url = f"{self.base_url}/execution/{execution_id}/status"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        return response.json()
-
-    def get_execution_result(self, execution_id):
-        url = f"{self.base_url}/execution/{execution_id}/results"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        return response.json()
-
-    def execute_query_and_wait(self, query_id, token_address, max_retries=50, sleep_time=5):
-        try:
-            execution = self.execute_query(query_id, token_address)
-            execution_id = execution['execution_id']
-
-            for _ in range(max_retries):
-                status = self.get_execution_status(execution_id)
-                state = status.get('state', 'UNKNOWN')
-                
-                if state == 'QUERY_STATE_COMPLETED':
-                    return self.get_execution_result(execution_id)
-                elif state == 'QUERY_STATE_FAILED':
-                    raise Exception("Query failed")
-                elif state == 'QUERY_STATE_CANCELLED':
-                    raise Exception("Query was cancelled")
-                
-                time.sleep(sleep_time)
-                
-            raise TimeoutError("Query execution timed out")
-            
-        except Exception as e:
-            raise
+CMC_INFO_BATCH_SIZE = 100  # /v2/cryptocurrency/info accepts comma-separated id lists
+PIPELINE_INFO_BATCH_SIZE = 20  # Smaller batches let Dune scoring start sooner
+DEFAULT_CONCURRENCY = {'cmc': 2, 'dune': 4}  # Worker threads per upstream in pipelined mode
+DEFAULT_PROFILE = {'name': 'default', 'volume_threshold': 50000, 'min_price_increase': 20, 'max_price_increase': 300}
+LISTINGS_PAGE_SIZE = 500  # Rows per listings page, CMC bills per 200 rows returned either way
+LISTINGS_MAX_ROWS = 5000  # Same depth the scanner always looked at
+DUNE_QUERY_ID = "4304509"  # Your Dune query ID
+DUNE_BATCH_QUERY_ID = os.getenv('DUNE_BATCH_QUERY_ID')  # Multi-token variant taking a comma-separated `token_addresses`
+DUNE_BATCH_SIZE = 50  # Tokens scored per batched execution
+TABLE_HEADERS = ['Symbol', 'Name', 'Price 24h', 'Volume', 'Vol Change', 'Market Cap', 'Pre-score', 'Dune Score', 'Score', 'Signal', 'Token Address']
 
 class MemeScanner:
-    def __init__(self, cmc_api_key, dune_api_key):
+    def __init__(self, cmc_api_key, dune_api_key, token_index=None, concurrency=None, score_cache=None,
+                 use_latest_results=True, dune_batch_query_id=DUNE_BATCH_QUERY_ID, dune_timeout=None,
+                 dune_deadline=None, snapshot_store=None, recorder=None, ledger=None, dune_top_k=None,
+                 last_scan=None):
         self.cmc_api_key = cmc_api_key
         self.dune_client = DuneClient(dune_api_key)
         self.cmc_headers = {
             'X-CMC_PRO_API_KEY': cmc_api_key,
         }
+        self.cmc_session = get_session('cmc', cmc_api_key)
+        self.request_counts = {'cmc_listings': 0, 'cmc_info': 0, 'cmc_info_failed': 0, 'cmc_quotes': 0}
+        self.listings_stats = {'pages': 0, 'bytes': 0}
+        self.token_index = token_index if token_index is not None else TokenIndex()
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.score_cache = score_cache
+        self.use_latest_results = use_latest_results
+        self.dune_batch_query_id = dune_batch_query_id
+        self.dune_deadline = dune_deadline
+        self.snapshot_store = snapshot_store
+        self.recorder = recorder
+        self.last_scan = last_scan
+        self.ledger = ledger
+        if ledger:
+            ledger.attach('cmc', self.cmc_session)
+            ledger.attach('dune', self.dune_client.session)
+        self.listings_max_rows = LISTINGS_MAX_ROWS
+        self.max_dune_scores = None  # Fresh Dune scores allowed per scan by the credit budget, None for no limit
+        self.dune_top_k = dune_top_k  # Fresh Dune scores per scan, given to the best pre-scored tokens
+        self.dune_budget = {'left': None, 'fresh': 0, 'skipped': 0, 'deadline': 0, 'reason': None}
+        self.dune_plan = None  # Token address -> cached or skipped score decided up front, None when unlimited
+        self.pre_scores = {}  # CMC id -> local pre-score of the current scan's candidates
+        self.priority = {}  # CMC id -> rank of the current scan's candidates, best pre-score first
+        self.dune_budget_lock = threading.Lock()
+        if dune_timeout:
+            self.dune_client.executions.execution_timeout = dune_timeout
         print("✅ Scanner initialized with API keys")
     
     def get_token_metadata(self, coin_id, symbol):
         """Fetch detailed metadata for a token"""
         print(f"📡 Fetching metadata for {symbol}...", end='', flush=True)
-        url = f'https://pro-api.coinmarketcap.com/v2/cryptocurrency/info'
-        params = {'id': coin_id}
+        metadata = self.get_tokens_metadata([coin_id]).get(coin_id)
+        print(f" ✅" if metadata else f" ❌")
+        return metadata
+
+    @timed('metadata')
+    def get_tokens_metadata(self, coin_ids, batch_size=CMC_INFO_BATCH_SIZE):
+        """Fetch metadata for many tokens with chunked multi-id info requests"""
+        url = '/v2/cryptocurrency/info'
+        results = {}
+
+        for start in range(0, len(coin_ids), batch_size):
+            chunk = coin_ids[start:start + batch_size]
+            params = {
+                'id': ','.join(str(coin_id) for coin_id in chunk),
+                'skip_invalid': 'true'
+            }
+
+            try:
+                self.request_counts['cmc_info'] += 1
+                response = self.cmc_session.get(url, params=params)
+                data = response.json().get('data') or {}
+            except Exception as e:
+                print(f"⚠️ Metadata batch failed: {str(e)}")
+                self.request_counts['cmc_info_failed'] += 1
+                data = {}
+
+            # Remember every platform answer, including the non-Solana ones
+            self.token_index.record_coins(data.values())
+            if self.recorder:
+                self.recorder.record_info(data)
+            for coin_id in chunk:
+                results[coin_id] = self._parse_metadata(data.get(str(coin_id)))
+
+        return results
+
+    @timed('quotes')
+    def get_quotes(self, coin_ids, batch_size=CMC_INFO_BATCH_SIZE):
+        """Latest USD quotes for specific ids, one multi-id quotes request per chunk"""
+        url = '/v2/cryptocurrency/quotes/latest'
+        quotes = {}
         
+        for start in range(0, len(coin_ids), batch_size):
+            chunk = coin_ids[start:start + batch_size]
+            params = {
+                'id': ','.join(str(coin_id) for coin_id in chunk),
+                'convert': 'USD',
+                'skip_invalid': 'true'
+            }
+            
+            try:
+                self.request_counts['cmc_quotes'] += 1
+                response = self.cmc_session.get(url, params=params)
+                data = response.json().get('data') or {}
+            except Exception as e:
+                print(f"⚠️ Quotes batch failed: {str(e)}")
+                continue
+            
+            for coin_id, entry in data.items():
+                # Symbol lookups return a list per key, id lookups a single object
+                entry = entry[0] if isinstance(entry, list) else entry
+                if entry and 'USD' in entry.get('quote', {}):
+                    quotes[int(coin_id)] = entry['quote']['USD']
+        
+        return quotes
+
+    def _parse_metadata(self, data):
+        """Extract the fields we display from an info payload, or None for non-Solana tokens"""
         try:
-            response = requests.get(url, headers=self.cmc_headers, params=params)
-            if str(coin_id) not in response.json().get('data', {}):
+            if not data:
                 raise Exception("Token metadata not found")
-            data = response.json()['data'][str(coin_id)]
-            
+
             platform = data.get('platform', {})
             is_solana = platform.get('name', '').lower() == 'solana'
-            
+
             if not is_solana:
                 raise Exception("Not a Solana token")
-                
-            print(f" ✅")
+
             return {
                 'website': data.get('urls', {}).get('website', [''])[0],
                 'twitter': data.get('urls', {}).get('twitter', [''])[0],
@@ -104,137 +163,638 @@ class MemeScanner:
                 'token_address': platform.get('token_address', 'N/A')
             }
         except Exception as e:
-            print(f" ❌")
             return None
 
+    @timed('dune')
     def analyze_with_dune(self, token_address):
-        """Get Dune analysis for a token"""
+        """Get Dune analysis for a token, reusing cached or stored results while they are fresh"""
+        planned = self._planned_score(token_address)
+        if planned:
+            return planned
+        
         try:
-            QUERY_ID = "4304509"  # Your Dune query ID
-            results = self.dune_client.execute_query_and_wait(QUERY_ID, token_address)
+            results, source, computed_at = None, 'fresh', None
+            if self.score_cache and self.use_latest_results:
+                results, computed_at = self._get_fresh_latest_result(token_address)
+                source = 'stored' if results else 'fresh'
+            if results is None:
+                if self._deadline_passed(1):
+                    return self._skipped_score('deadline')
+                self._count_fresh(1)
+                results = self.dune_client.execute_query_and_wait(DUNE_QUERY_ID, token_address)
             
             if 'result' in results and 'rows' in results['result'] and results['result']['rows']:
-                latest_row = results['result']['rows'][0]
-                return {
-                    'dune_score': latest_row.get('memecoin_score', 'N/A'),
-                    'dune_interpretation': latest_row.get('score_interpretation', 'N/A')
-                }
+                return self._store_score(token_address, results['result']['rows'][0], source, computed_at)
+            # The query ran fine, Dune just has nothing on this token
+            return self._empty_score()
         except Exception as e:
             print(f"⚠️ Dune analysis failed for {token_address}: {str(e)}")
         
         return {
             'dune_score': 'N/A',
-            'dune_interpretation': 'N/A'
+            'dune_interpretation': 'N/A',
+            'dune_source': 'failed'
+        }
+
+    @timed('dune')
+    def analyze_many_with_dune(self, token_addresses):
+        """Score many tokens with chunked executions of the multi-token Dune query"""
+        results = {}
+        pending = []
+        for token_address in dict.fromkeys(token_addresses):
+            planned = self._planned_score(token_address)
+            if planned:
+                results[token_address] = planned
+            else:
+                pending.append(token_address)
+        
+        if not self.dune_batch_query_id:
+            for token_address in pending:
+                results[token_address] = self.analyze_with_dune(token_address)
+            return results
+        
+        for start in range(0, len(pending), DUNE_BATCH_SIZE):
+            chunk = pending[start:start + DUNE_BATCH_SIZE]
+            if self._deadline_passed(len(chunk)):
+                for token_address in chunk:
+                    results[token_address] = self._skipped_score('deadline')
+                continue
+            self._count_fresh(len(chunk))
+            failed = False
+            try:
+                rows = self.dune_client.execute_batch_and_wait(self.dune_batch_query_id, chunk)
+            except Exception as e:
+                print(f"⚠️ Dune batch analysis failed for {len(chunk)} tokens: {str(e)}")
+                rows, failed = [], True
+            
+            # Same row the single-token query would put first for each address
+            first_rows = {}
+            for row in rows:
+                first_rows.setdefault(row.get('token_address'), row)
+            
+            for token_address in chunk:
+                if token_address in first_rows:
+                    results[token_address] = self._store_score(token_address, first_rows[token_address], 'fresh')
+                elif not failed:
+                    results[token_address] = self._empty_score()
+                else:
+                    results[token_address] = {
+                        'dune_score': 'N/A',
+                        'dune_interpretation': 'N/A',
+                        'dune_source': 'failed'
+                    }
+        
+        return results
+
+    def rescore_with_dune(self, records):
+        """Copies of already enriched records with a new Dune score, best pre-score first
+        
+        For tokens an earlier scan left unscored: their metadata is not
+        fetched again, and only what is left of the current scan's top-K or
+        credit budget is spent on them.
+        """
+        records = sorted(records, key=lambda record: -(record.pre_score or 0))
+        self._plan_dune_scores([(record, {'token_address': record.token_address}) for record in records])
+        # Falls back to one query per token without a batch query
+        scores = self.analyze_many_with_dune([record.token_address for record in records])
+        return [record.with_dune(scores[record.token_address]) for record in records]
+
+    def _plan_dune_scores(self, solana_coins):
+        """Give this scan's fresh Dune scores to the best pre-scored tokens, before any is submitted
+        
+        `solana_coins` are (coin, metadata) pairs in pre-score order. Cached
+        scores don't use up the top-K or credit budget; every token past it
+        is marked skipped up front, whatever order the work completes in.
+        """
+        self.dune_plan = None
+        left = self.dune_budget['left']
+        if left is None:
+            return
+        plan = {}
+        for coin, metadata in solana_coins:
+            token_address = metadata['token_address']
+            if token_address in plan:
+                continue
+            cached = self._get_cached_score(token_address)
+            if cached:
+                plan[token_address] = cached
+            elif left > 0:
+                plan[token_address] = None  # Granted a fresh score
+                left -= 1
+            else:
+                plan[token_address] = self._skipped_score()
+        skipped = sum(1 for score in plan.values() if score and score['dune_source'] == 'skipped')
+        self.dune_budget['left'] = left
+        self.dune_budget['skipped'] += skipped
+        if skipped:
+            METRICS.inc('dune_scores_skipped_total', skipped)
+        self.dune_plan = plan
+
+    def _planned_score(self, token_address):
+        """The cached or skipped score planned for this token, else a cache lookup when nothing was planned"""
+        if self.dune_plan is None:
+            return self._get_cached_score(token_address)
+        return self.dune_plan.get(token_address)
+
+    def _count_fresh(self, count):
+        with self.dune_budget_lock:
+            self.dune_budget['fresh'] += count
+
+    def _deadline_passed(self, count):
+        """True once this scan's Dune deadline has passed, counting the `count` tokens it leaves unscored"""
+        if not self.dune_client.deadline_passed():
+            return False
+        with self.dune_budget_lock:
+            self.dune_budget['deadline'] += count
+        METRICS.inc('dune_scores_skipped_total', count)
+        return True
+
+    def _skipped_score(self, reason=None):
+        return {
+            'dune_score': 'N/A',
+            'dune_interpretation': f"Not scored ({reason or self.dune_budget['reason'] or 'credit budget'})",
+            'dune_source': 'skipped'
+        }
+
+    def _empty_score(self):
+        return {
+            'dune_score': 'N/A',
+            'dune_interpretation': 'No Dune data',
+            'dune_source': 'empty'
+        }
+
+    def _get_cached_score(self, token_address):
+        if not self.score_cache:
+            return None
+        cached = self.score_cache.get(DUNE_QUERY_ID, token_address)
+        if not cached:
+            return None
+        if self.recorder:
+            self.recorder.record_dune(token_address, {'memecoin_score': cached['dune_score'],
+                                                      'score_interpretation': cached['dune_interpretation']})
+        return {
+            'dune_score': cached['dune_score'],
+            'dune_interpretation': cached['dune_interpretation'],
+            'dune_source': 'cached'
         }
 
-    def scan_memecoins(self, volume_threshold=50000, min_price_increase=20, max_price_increase=300):
-        """Scan for trending memecoins and analyze with Dune"""
+    def _store_score(self, token_address, row, source, computed_at=None):
+        if self.recorder:
+            self.recorder.record_dune(token_address, row)
+        dune_results = {
+            'dune_score': row.get('memecoin_score', 'N/A'),
+            'dune_interpretation': row.get('score_interpretation', 'N/A'),
+            'dune_source': source
+        }
+        if self.score_cache:
+            self.score_cache.put(DUNE_QUERY_ID, token_address, dune_results['dune_score'],
+                                 dune_results['dune_interpretation'], computed_at)
+        return dune_results
+
+    def _get_fresh_latest_result(self, token_address):
+        """Dune's stored results for this token if they are within the cache TTL"""
+        try:
+            results = self.dune_client.get_latest_result(DUNE_QUERY_ID, token_address)
+            ended_at = datetime.fromisoformat(results['execution_ended_at'].replace('Z', '+00:00')).timestamp()
+        except Exception as e:
+            return None, None
+        if self.score_cache.is_fresh(ended_at):
+            return results, ended_at
+        return None, None
+
+    def scan_memecoins(self, volume_threshold=50000, min_price_increase=20, max_price_increase=300, pipelined=False):
+        """Scan for trending memecoins and analyze with Dune, best pre-score first whatever order they completed in"""
+        return self.in_priority_order(self.iter_scan(volume_threshold, min_price_increase, max_price_increase, pipelined))
+
+    def iter_scan(self, volume_threshold=50000, min_price_increase=20, max_price_increase=300, pipelined=False):
+        """Scan like scan_memecoins, but yield each enriched coin as soon as it is ready
+        
+        Coins come best pre-score first (completion order when pipelined).
+        The scan's snapshot is recorded in priority order once the generator
+        is exhausted.
+        """
+        # Timed as the `scan` phase, minus the time the consumer holds each coin
+        return timed_iter('scan', self._iter_scan(volume_threshold, min_price_increase, max_price_increase, pipelined))
+
+    def _iter_scan(self, volume_threshold, min_price_increase, max_price_increase, pipelined):
         print(f"\n🔍 Scanning for Solana memecoins...")
         
-        url = 'https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest'
+        data = self.fetch_listings(volume_threshold, min_price_increase, max_price_increase)
+        if data is None:
+            return
+        
+        candidates = self.select_candidates(data, volume_threshold, min_price_increase, max_price_increase)
+        # Only the candidate rows are needed from here on, let the full payload go
+        del data
+        results = []
+        for coin_data in self.iter_enriched(candidates, pipelined):
+            results.append(coin_data)
+            yield coin_data
+        results = self.in_priority_order(results)
         params = {
-            'limit': 5000,
+            'volume_threshold': volume_threshold,
+            'min_price_increase': min_price_increase,
+            'max_price_increase': max_price_increase
+        }
+        self.record_snapshot(candidates, results, params)
+        self.save_last_scan(results, params)
+
+    @timed('scan')
+    def scan_profiles(self, profiles, pipelined=False):
+        """Evaluate several named threshold sets against a single listings download
+        
+        Listings are fetched once with the loosest bounds of all profiles and
+        the union of every profile's candidates is enriched exactly once, so
+        upstream calls grow with unique tokens rather than with profiles.
+        Returns {profile name: ranked coins}.
+        """
+        profiles = [{**DEFAULT_PROFILE, **profile} for profile in profiles]
+        names = ', '.join(profile['name'] for profile in profiles)
+        print(f"\n🔍 Scanning for Solana memecoins with {len(profiles)} profiles ({names})...")
+        
+        data = self.fetch_listings(
+            min(profile['volume_threshold'] for profile in profiles),
+            min(profile['min_price_increase'] for profile in profiles),
+            max(profile['max_price_increase'] for profile in profiles)
+        )
+        if data is None:
+            return {profile['name']: [] for profile in profiles}
+        
+        frame = ListingsFrame(data)
+        selected = {
+            profile['name']: self.select_candidates(
+                frame, profile['volume_threshold'], profile['min_price_increase'], profile['max_price_increase']
+            )
+            for profile in profiles
+        }
+        
+        selected_ids = {coin['id'] for candidates in selected.values() for coin in candidates}
+        union = [coin for coin in frame.coins if coin['id'] in selected_ids]
+        del data, frame
+        print(f"🧮 {sum(len(candidates) for candidates in selected.values())} profile matches, "
+              f"{len(union)} unique tokens to enrich")
+        enriched = {coin_data['id']: coin_data for coin_data in self.enrich_candidates(union, pipelined)}
+        self.record_snapshot(union, list(enriched.values()), {'profiles': profiles})
+        
+        results = {}
+        for name, candidates in selected.items():
+            coins = [enriched[coin['id']] for coin in candidates if coin['id'] in enriched]
+            results[name] = [coins[index] for index in rank_order(coins)]
+        return results
+
+    @timed('snapshot')
+    def save_last_scan(self, results, params):
+        """Keep a single scan's results for the next run's warm start
+        
+        Only plain scans save here: profile runs and daemon cycles have other
+        result sets, and would replace what the next plain run shows first.
+        """
+        if not self.last_scan:
+            return
+        try:
+            self.last_scan.save(results, params)
+        except Exception as e:
+            print(f"⚠️ Could not save the last scan: {str(e)}")
+
+    @timed('snapshot')
+    def record_snapshot(self, candidates, results, params=None):
+        """Append this scan to the snapshot store and save its recording"""
+        if self.recorder:
+            try:
+                path = self.recorder.save(params)
+                print(f"🎙️ Recorded raw responses to {path}")
+            except Exception as e:
+                print(f"⚠️ Could not save scan recording: {str(e)}")
+        if not self.snapshot_store:
+            return None
+        try:
+            scan_id = self.snapshot_store.record_scan(candidates, results, params)
+        except Exception as e:
+            print(f"⚠️ Could not save scan snapshot: {str(e)}")
+            return None
+        print(f"💾 Saved snapshot #{scan_id} ({len(candidates)} candidates, {len(results)} results)")
+        return scan_id
+
+    @timed('listings')
+    def fetch_listings(self, volume_threshold=None, min_price_increase=None, max_price_increase=None,
+                       page_size=LISTINGS_PAGE_SIZE):
+        """Download the latest listings, or None if CMC could not be reached
+        
+        The thresholds are pushed into the request so CMC only returns rows
+        that can pass the filter, and paging stops at the first short page.
+        """
+        if self.recorder:
+            # Recordings keep the unfiltered listing so replays can try looser thresholds
+            volume_threshold = min_price_increase = max_price_increase = None
+        
+        url = '/v1/cryptocurrency/listings/latest'
+        params = {
+            'limit': page_size,
             'convert': 'USD',
             'sort': 'percent_change_24h',
             'sort_dir': 'desc',
             'cryptocurrency_type': 'tokens'
         }
+        if volume_threshold is not None:
+            params['volume_24h_min'] = volume_threshold
+        if min_price_increase is not None:
+            params['percent_change_24h_min'] = min_price_increase
+        if max_price_increase is not None:
+            params['percent_change_24h_max'] = max_price_increase
+        
+        try:
+            self.token_index.refresh(self.cmc_session)
+        except Exception as e:
+            print(f"⚠️ Token index refresh failed: {str(e)}")
         
+        data = []
+        self.listings_stats = {'pages': 0, 'bytes': 0}
         try:
-            response = requests.get(url, headers=self.cmc_headers, params=params)
-            data = response.json()['data']
+            for start in range(1, self.listings_max_rows + 1, page_size):
+                self.request_counts['cmc_listings'] += 1
+                response = self.cmc_session.get(url, params={**params, 'start': start})
+                page = response.json()['data']
+                self.listings_stats['pages'] += 1
+                self.listings_stats['bytes'] += len(response.content)
+                data.extend(page)
+                
+                # No early stop on 24h change: with percent_change_24h_min sent no row is below it, and
+                # without it (recording) every row is wanted, so only a short page ends the listing
+                if len(page) < page_size:
+                    break
         except Exception as e:
             print(f"❌ Error fetching CMC data: {str(e)}")
-            return []
+            return None
         
-        trending_coins = []
-        current_time = datetime.now(timezone.utc)
+        print(f"📊 Listings: {len(data)} tokens in {self.listings_stats['pages']} page(s), "
+              f"{self.listings_stats['bytes'] / 1024:,.1f} KB downloaded")
+        self.token_index.record_coins(data)
+        if self.recorder:
+            self.recorder.record_listings(data)
+        return data
+
+    def enrich_candidates(self, candidates, pipelined=False):
+        """Attach metadata and Dune scores to candidates, keeping only Solana tokens, best pre-score first"""
+        return self.in_priority_order(self.iter_enriched(candidates, pipelined))
+
+    def in_priority_order(self, records):
+        """Sort records of the last enriched candidates into prioritize() order, whatever order they completed in"""
+        return sorted(records, key=lambda coin_data: self.priority[coin_data.id])
+
+    def iter_enriched(self, candidates, pipelined=False):
+        """Yield each Solana candidate's record as soon as its metadata and Dune score are in"""
+        # Anything still running on Dune when this scan's deadline passes gets cancelled
+        self.dune_client.executions.reset_deadline(self.dune_deadline)
+        self._start_dune_budget()
+        candidates = self.prioritize(candidates)
+        
+        if pipelined:
+            yield from timed_iter('enrich', self._iter_pipelined(candidates))
+        else:
+            yield from timed_iter('enrich', self._iter_sequential(candidates))
+        
+        self._print_dune_budget()
+        executions = self.dune_client.executions.summary()
+        if executions['submitted']:
+            print(f"\n⏱️ Dune executions: {executions['completed']} completed, {executions['failed']} failed, "
+                  f"{executions['timed_out']} timed out, avg {executions['avg_latency']:.1f}s, "
+                  f"{executions['status_calls']} status checks")
+        self._print_cache_stats()
+
+    def _start_dune_budget(self):
+        """Reset this scan's Dune budget to the tighter of the credit budget and the top-K limit"""
+        limits = {'credit budget': self.max_dune_scores, 'below top-K pre-score': self.dune_top_k}
+        limits = {reason: limit for reason, limit in limits.items() if limit is not None}
+        reason = min(limits, key=limits.get) if limits else None
+        self.dune_budget = {'left': limits.get(reason), 'fresh': 0, 'skipped': 0, 'deadline': 0, 'reason': reason}
+        self.dune_plan = None
+
+    def _print_dune_budget(self):
+        if self.dune_budget['skipped']:
+            print(f"\n💳 Dune scoring limited by {self.dune_budget['reason']}: {self.dune_budget['fresh']} fresh scores, "
+                  f"{self.dune_budget['skipped']} tokens left unscored")
+        if self.dune_budget['deadline']:
+            print(f"\n⏱️ Dune deadline passed: {self.dune_budget['deadline']} tokens left unscored")
+
+    def _print_cache_stats(self):
+        if self.score_cache:
+            stats = self.score_cache.stats
+            print(f"\n🗄️ Dune score cache: {stats['hits']}/{stats['hits'] + stats['misses']} hits "
+                  f"({self.score_cache.hit_rate():.0%})")
+
+    def prioritize(self, candidates, now=None):
+        """Pre-score candidates locally and order them best first
+        
+        Dune scoring follows this order, so a top-K limit, a credit budget or
+        a Dune deadline always cuts the least promising tokens.
+        """
+        scores = pre_scores(candidates, now)
+        self.pre_scores = {coin['id']: float(score) for coin, score in zip(candidates, scores)}
+        # Stable, so equal scores keep listings order
+        ordered = sorted(candidates, key=lambda coin: -self.pre_scores[coin['id']])
+        self.priority = {coin['id']: rank for rank, coin in enumerate(ordered)}
+        return ordered
+
+    def _iter_sequential(self, candidates):
+        """Fetch metadata in batches, then score each Solana token on Dune one at a time (or one batch at a time)"""
+        # One chunked info request per batch instead of one per candidate
+        print(f"📡 Fetching metadata for {len(candidates)} candidates...", end='', flush=True)
+        metadata_start = time.perf_counter()
+        info_requests = self.request_counts['cmc_info']
+        metadata_by_id = self.get_tokens_metadata([coin['id'] for coin in candidates])
+        print(f" ✅ ({self.request_counts['cmc_info'] - info_requests} requests, "
+              f"{time.perf_counter() - metadata_start:.2f}s, "
+              f"{self.token_index.stats['avoided_calls']} skipped by token index)")
         
-        for coin in data:
-            quote = coin['quote']['USD']
-            price_change = quote['percent_change_24h']
+        solana_coins = self._solana_coins(candidates, metadata_by_id)
+        self._plan_dune_scores(solana_coins)
+        step = DUNE_BATCH_SIZE if self.dune_batch_query_id else 1
+        for start in range(0, len(solana_coins), step):
+            chunk = solana_coins[start:start + step]
+            # Get Dune analysis, a few batched executions instead of one per token when a batch query is set
+            if self.dune_batch_query_id:
+                scores = self.analyze_many_with_dune([metadata['token_address'] for coin, metadata in chunk])
+            else:
+                scores = {chunk[0][1]['token_address']: self.analyze_with_dune(chunk[0][1]['token_address'])}
+            for coin, metadata in chunk:
+                coin_data = self._build_coin_data(coin, metadata, scores[metadata['token_address']])
+                self._print_found(coin_data)
+                yield coin_data
+
+    @timed('filter')
+    def select_candidates(self, data, volume_threshold, min_price_increase, max_price_increase, now=None,
+                          max_age=MAX_TOKEN_AGE):
+        """Apply the listings filter and drop ids the token index knows are not on Solana
+        
+        `data` may be a raw listings payload or an already parsed ListingsFrame.
+        `now` is the evaluation clock for the listing-age window (defaults to
+        the current time).
+        """
+        frame = data if isinstance(data, ListingsFrame) else ListingsFrame(data)
+        candidates = frame.select(volume_threshold, min_price_increase, max_price_increase, now, max_age)
+        
+        # Non-Solana ids never reach the info endpoint
+        return self.token_index.filter_candidates(candidates)
+
+    def _iter_pipelined(self, candidates):
+        """Overlap metadata batches with Dune scoring using one bounded pool per upstream, yielding in completion order"""
+        print(f"📡 Pipelining {len(candidates)} candidates "
+              f"(cmc workers: {self.concurrency['cmc']}, dune workers: {self.concurrency['dune']})")
+        
+        chunks = [
+            candidates[start:start + PIPELINE_INFO_BATCH_SIZE]
+            for start in range(0, len(candidates), PIPELINE_INFO_BATCH_SIZE)
+        ]
+        cmc_pool = ThreadPoolExecutor(max_workers=self.concurrency['cmc'])
+        dune_pool = ThreadPoolExecutor(max_workers=self.concurrency['dune'])
+        finished = False
+        try:
+            metadata_futures = {
+                cmc_pool.submit(self.get_tokens_metadata, [coin['id'] for coin in chunk]): chunk
+                for chunk in chunks
+            }
             
-            if (quote['volume_24h'] > volume_threshold and
-                min_price_increase <= price_change <= max_price_increase and
-                datetime.fromisoformat(coin['date_added'].replace('Z', '+00:00')) > current_time - timedelta(days=30)):
-                
-                metadata = self.get_token_metadata(coin['id'], coin['symbol'])
-                if metadata:
-                    # Get Dune analysis
-                    dune_results = self.analyze_with_dune(metadata['token_address'])
-                    
-                    coin_data = {
-                        'symbol': coin['symbol'],
-                        'name': coin['name'],
-                        'price_change_24h': price_change,
-                        'volume_24h': quote['volume_24h'],
-                        'volume_change_24h': quote.get('volume_change_24h', 0),
-                        'market_cap': quote.get('market_cap', 0),
-                        'price': quote['price'],
-                        'date_added': coin['date_added'],
-                        **metadata,
-                        **dune_results
-                    }
-                    
-                    trending_coins.append(coin_data)
-                    print(f"\n💫 Found: {coin['symbol']}")
-                    print(f"   Price Change: {price_change:.2f}%")
-                    print(f"   Volume Change: {coin_data['volume_change_24h']:.2f}%")
-                    print(f"   Market Cap: ${coin_data['market_cap']:,.2f}")  # Added market cap display
-                    print(f"   Dune Score: {dune_results['dune_score']}")
-                    print(f"   Signal: {dune_results['dune_interpretation']}")
-                
-                time.sleep(0.2)  # Rate limiting
+            dune_futures = {}
+            if self.dune_budget['left'] is None:
+                # Each metadata batch feeds the Dune stage as soon as it lands
+                for future in as_completed(metadata_futures):
+                    solana_coins = self._solana_coins(metadata_futures[future], future.result())
+                    self._submit_dune(dune_pool, dune_futures, solana_coins)
+            else:
+                # A top-K or credit limit is handed out over every candidate's metadata before anything
+                # goes to Dune, so it reaches the best pre-scored tokens rather than the first to land
+                batches = [self._solana_coins(chunk, future.result()) for future, chunk in metadata_futures.items()]
+                self._plan_dune_scores([pair for batch in batches for pair in batch])
+                for solana_coins in batches:
+                    self._submit_dune(dune_pool, dune_futures, solana_coins)
+            
+            for future in as_completed(dune_futures):
+                scores = future.result()
+                for coin, metadata in dune_futures[future]:
+                    dune_results = scores[metadata['token_address']] if self.dune_batch_query_id else scores
+                    coin_data = self._build_coin_data(coin, metadata, dune_results)
+                    self._print_found(coin_data)
+                    yield coin_data
+            finished = True
+        finally:
+            # A consumer that stops early shouldn't wait for, or pay for, Dune work nobody will read:
+            # drop queued work, cancel running executions (which releases their waiting workers) and move on
+            cmc_pool.shutdown(wait=False, cancel_futures=True)
+            dune_pool.shutdown(wait=False, cancel_futures=True)
+            if not finished:
+                self.dune_client.executions.close()
+
+    def _solana_coins(self, chunk, metadata_by_id):
+        return [(coin, metadata_by_id[coin['id']]) for coin in chunk if metadata_by_id.get(coin['id'])]
+
+    def _submit_dune(self, dune_pool, dune_futures, solana_coins):
+        if self.dune_batch_query_id and solana_coins:
+            # The whole metadata batch is scored by one Dune execution
+            addresses = [metadata['token_address'] for coin, metadata in solana_coins]
+            dune_futures[dune_pool.submit(self.analyze_many_with_dune, addresses)] = solana_coins
+        else:
+            for coin, metadata in solana_coins:
+                dune_future = dune_pool.submit(self.analyze_with_dune, metadata['token_address'])
+                dune_futures[dune_future] = [(coin, metadata)]
+
+    def _build_coin_data(self, coin, metadata, dune_results):
+        record = TokenRecord.from_listing(coin, metadata, dune_results)
+        record.pre_score = self.pre_scores.get(coin['id'])
+        return record
+
+    def _print_found(self, coin_data):
+        print(f"\n💫 Found: {coin_data.symbol}")
+        print(f"   Price Change: {coin_data.price_change_24h:.2f}%")
+        print(f"   Volume Change: {coin_data.volume_change_24h:.2f}%")
+        print(f"   Market Cap: ${coin_data.market_cap:,.2f}")  # Added market cap display
+        print(f"   Pre-score: {coin_data.pre_score}")
+        print(f"   Dune Score: {coin_data.dune_score}")
+        print(f"   Signal: {coin_data.dune_interpretation}")
+
+    def format_changes(self, previous, coins):
+        """Print only the rows of `coins` that render differently from `previous`, plus the ones that left"""
+        coins[:] = [coins[index] for index in rank_order(coins)]
+        before = {coin.id: self._table_row(coin, score, mark_source=False)
+                  for coin, score in zip(previous, blended_scores(previous))}
+        changed_rows, unchanged = [], 0
+        for rank, (coin, score) in enumerate(zip(coins, blended_scores(coins)), 1):
+            row = self._table_row(coin, score, mark_source=False)
+            if coin.id not in before:
+                changed_rows.append([rank, '🟢 new'] + self._table_row(coin, score))
+            elif row != before[coin.id]:
+                changed_rows.append([rank, '🔄'] + self._table_row(coin, score))
+            else:
+                unchanged += 1
+        current_ids = {coin.id for coin in coins}
+        exited = [coin.symbol for coin in previous if coin.id not in current_ids]
         
-        return trending_coins
+        print("\n" + "="*80)
+        print(colored("🔁 REFRESHED: CHANGES SINCE THE LAST SCAN", 'yellow', attrs=['bold']))
+        print("="*80)
+        print(f"{len(changed_rows)} changed or new, {unchanged} unchanged, {len(exited)} gone\n")
+        if changed_rows:
+            print(tabulate(changed_rows, headers=['Rank', ''] + TABLE_HEADERS, tablefmt='simple'))
+        if exited:
+            print(f"\n🔴 Gone: {', '.join(exited)}")
+        if not coins:
+            print("\n❌ No trending tokens found")
 
-    def format_results(self, coins):
-        """Format results with both CMC and Dune data, including full address and volume change"""
+    def _table_row(self, coin, score, mark_source=True):
+        # Format price change
+        price_change = f"{coin.price_change_24h:+.2f}%"
+        
+        # Format volume and volume change
+        volume = "${:,.2f}M".format(coin.volume_24h / 1e6)
+        volume_change = f"{coin.volume_change_24h:+.2f}%" if coin.volume_change_24h else "N/A"
+        
+        # Format market cap
+        market_cap = "${:,.2f}M".format(coin.market_cap / 1e6)
+        
+        # Format Dune score, flagging ones that were not recomputed this run
+        dune_score = coin.dune_score
+        if coin.dune_source in ('cached', 'stored') and mark_source:
+            dune_score = f"{dune_score} (cached)"
+        elif coin.dune_source == 'skipped':
+            dune_score = "Not scored"
+        
+        return [
+            coin.symbol,
+            coin.name[:15] + '...',
+            colored(price_change, 'green' if coin.price_change_24h > 0 else 'red'),
+            volume,
+            colored(volume_change, 'green' if coin.volume_change_24h > 0 else 'red'),
+            market_cap,  # Added market cap column
+            'N/A' if coin.pre_score is None else f"{coin.pre_score:.1f}",
+            str(dune_score),
+            f"{score:.1f}" if score >= 0 else 'N/A',
+            coin.dune_interpretation,
+            coin.token_address
+        ]
+
+    def format_results(self, coins, stale_age=None):
+        """Format results with both CMC and Dune data, including full address and volume change
+        
+        `stale_age` marks the table as a previous scan that old (in seconds)
+        while a fresh one is still running.
+        """
         if not coins:
             print("\n❌ No trending tokens found")
             return
             
-        # Sort by Dune score and price change
-        coins.sort(key=lambda x: (
-            float(x['dune_score']) if isinstance(x['dune_score'], (int, float)) else -1,
-            x['price_change_24h']
-        ), reverse=True)
+        # Sort by blended Dune/pre-score and price change
+        coins[:] = [coins[index] for index in rank_order(coins)]
+        blended = blended_scores(coins)
         
         # Prepare table data
-        table_data = []
-        for coin in coins:
-            # Format price change
-            price_change = f"{coin['price_change_24h']:+.2f}%"
-            
-            # Format volume and volume change
-            volume = "${:,.2f}M".format(coin['volume_24h'] / 1e6)
-            volume_change = f"{coin['volume_change_24h']:+.2f}%" if coin['volume_change_24h'] else "N/A"
-            
-            # Format market cap
-            market_cap = "${:,.2f}M".format(coin['market_cap'] / 1e6)
-            
-            # Format Dune score
-            dune_score = coin['dune_score']
-            
-            row = [
-                coin['symbol'],
-                coin['name'][:15] + '...',
-                colored(price_change, 'green' if coin['price_change_24h'] > 0 else 'red'),
-                volume,
-                colored(volume_change, 'green' if coin.get('volume_change_24h', 0) > 0 else 'red'),
-                market_cap,  # Added market cap column
-                str(dune_score),
-                coin['dune_interpretation'],
-                coin['token_address']
-            ]
-            table_data.append(row)
+        table_data = [self._table_row(coin, score) for coin, score in zip(coins, blended)]
         
         # Print results
-        headers = ['Symbol', 'Name', 'Price 24h', 'Volume', 'Vol Change', 'Market Cap', 'Dune Score', 'Signal', 'Token Address']  # Added Market Cap header
         print("\n" + "="*80)
         print(colored("🚀 TRENDING SOLANA MEMECOINS WITH DUNE ANALYSIS 🚀", 'yellow', attrs=['bold']))
+        if stale_age is not None:
+            print(colored(f"🕒 From the last scan, {format_age(stale_age)} ago; refreshing in the background...", 'magenta'))
         print("="*80 + "\n")
-        print(tabulate(table_data, headers=headers, tablefmt='simple'))
+        print(tabulate(table_data, headers=TABLE_HEADERS, tablefmt='simple'))
         
         # Print detailed info for top 5
         print("\n" + "="*40)
@@ -242,52 +802,204 @@ class MemeScanner:
         print("="*40)
         
         for i, coin in enumerate(coins[:5], 1):
-            price_change_color = 'green' if coin['price_change_24h'] > 0 else 'red'
-            volume_change_color = 'green' if coin.get('volume_change_24h', 0) > 0 else 'red'
+            price_change_color = 'green' if coin.price_change_24h > 0 else 'red'
+            volume_change_color = 'green' if coin.volume_change_24h > 0 else 'red'
             
-            print(f"\n{colored(f'#{i}', 'cyan', attrs=['bold'])} {colored(coin['symbol'], 'yellow', attrs=['bold'])} - {coin['name']}")
+            print(f"\n{colored(f'#{i}', 'cyan', attrs=['bold'])} {colored(coin.symbol, 'yellow', attrs=['bold'])} - {coin.name}")
             print("="*50)
             
-            price_change_str = f"{coin['price_change_24h']:+.2f}%"
-            volume_change_str = f"{coin['volume_change_24h']:+.2f}%"
+            price_change_str = f"{coin.price_change_24h:+.2f}%"
+            volume_change_str = f"{coin.volume_change_24h:+.2f}%"
             
             print(f"Price Change: {colored(price_change_str, price_change_color)}")
-            print(f"Volume: ${coin['volume_24h']:,.2f}")
+            print(f"Volume: ${coin.volume_24h:,.2f}")
             print(f"Volume Change: {colored(volume_change_str, volume_change_color)}")
-            print(f"Market Cap: ${coin['market_cap']:,.2f}")  # Added market cap display
-            print(f"Dune Score: {colored(str(coin['dune_score']), 'cyan')}")
-            print(f"Signal: {colored(coin['dune_interpretation'], 'yellow')}")
-            print(f"\nToken Address: {colored(coin['token_address'], 'blue')}")
+            print(f"Market Cap: ${coin.market_cap:,.2f}")  # Added market cap display
+            print(f"Pre-score: {colored(str(coin.pre_score), 'cyan')}")
+            print(f"Dune Score: {colored(str(coin.dune_score), 'cyan')}")
+            print(f"Signal: {colored(coin.dune_interpretation, 'yellow')}")
+            print(f"\nToken Address: {colored(coin.token_address, 'blue')}")
             
-            if coin['twitter']:
-                print(f"Twitter: {coin['twitter']}")
-            if coin['telegram']:
-                print(f"Telegram: {coin['telegram']}")
-            print(f"Explorer: {coin['explorer']}")
+            if coin.twitter:
+                print(f"Twitter: {coin.twitter}")
+            if coin.telegram:
+                print(f"Telegram: {coin.telegram}")
+            print(f"Explorer: {coin.explorer}")
             print("="*50)
 
 def main():
+    parser = argparse.ArgumentParser(description="Scan CoinMarketCap for trending Solana memecoins and score them on Dune")
+    parser.add_argument('--pipelined', action='store_true', help="overlap metadata fetching with Dune scoring")
+    parser.add_argument('--cmc-workers', type=int, default=DEFAULT_CONCURRENCY['cmc'], help="concurrent CMC requests in pipelined mode")
+    parser.add_argument('--dune-workers', type=int, default=DEFAULT_CONCURRENCY['dune'], help="concurrent Dune executions in pipelined mode")
+    parser.add_argument('--score-ttl', type=int, default=DEFAULT_TTL, help="seconds a cached Dune score stays fresh")
+    parser.add_argument('--no-score-cache', action='store_true', help="always run a fresh Dune execution")
+    parser.add_argument('--dune-batch-query', default=DUNE_BATCH_QUERY_ID, help="multi-token Dune query id used to score many tokens per execution")
+    parser.add_argument('--dune-top-k', type=int, default=None, help="only score the K best pre-scored tokens on Dune each scan")
+    parser.add_argument('--dune-timeout', type=int, default=None, help="seconds before a single Dune execution is cancelled")
+    parser.add_argument('--dune-deadline', type=int, default=None, help="seconds all Dune scoring in a scan may take")
+    parser.add_argument('--no-history', action='store_true', help="don't save scan snapshots to the local history store")
+    parser.add_argument('--ndjson', action='store_true', help="stream each enriched coin to stdout as one JSON object per line as soon as it is ready (progress goes to stderr)")
+    parser.add_argument('--no-warm-start', action='store_true', help="don't show the previous scan's results while the new scan runs")
+    parser.add_argument('--record', action='store_true', help="save raw listings, info and Dune responses for offline replay")
+    parser.add_argument('--profiles', help="JSON file with a list of named threshold profiles to scan in one pass")
+    parser.add_argument('--profile', action='store_true', help="print per-phase timings, latencies and counters after the scan")
+    parser.add_argument('--metrics-file', help="write metrics after every scan (Prometheus text for .prom/.txt, JSON otherwise)")
+    parser.add_argument('--daemon', action='store_true', help="keep scanning on an interval, only enriching new or changed coins")
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help="seconds between scans in daemon and serve mode")
+    parser.add_argument('--watch', action='store_true', help="re-price found tokens every --tick seconds, sweeping listings every --sweep-interval")
+    parser.add_argument('--tick', type=int, default=DEFAULT_TICK, help="seconds between quote refreshes in watch mode")
+    parser.add_argument('--sweep-interval', type=int, default=DEFAULT_SWEEP_INTERVAL, help="seconds between full listings sweeps in watch mode")
+    parser.add_argument('--cmc-daily-budget', type=float, help="CMC credits per UTC day; daemon and serve mode pace scans to stay within it")
+    parser.add_argument('--cmc-hourly-budget', type=float, help="CMC credits per UTC hour")
+    parser.add_argument('--dune-daily-budget', type=float, help="Dune credits per UTC day")
+    parser.add_argument('--dune-hourly-budget', type=float, help="Dune credits per UTC hour")
+    parser.add_argument('--max-interval', type=int, default=DEFAULT_MAX_INTERVAL, help="longest a credit budget may stretch the scan interval, in seconds")
+    parser.add_argument('--workers', type=int, help="enrich candidates in this many worker processes, spreading them over the keys in CMC_TOKENS / DUNE_TOKENS")
+    parser.add_argument('--serve', action='store_true', help="scan on an interval and serve the latest results over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on in serve mode")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on in serve mode")
+    args = parser.parse_args()
+    modes = {'--serve': args.serve, '--watch': args.watch, '--daemon': args.daemon, '--workers': args.workers,
+             '--profiles': args.profiles}
+    if args.ndjson and any(modes.values()):
+        parser.error(f"--ndjson streams a single scan, it can't be combined with "
+                     f"{', '.join(flag for flag, enabled in modes.items() if enabled)}")
+    
+    records_out = sys.stdout
+    if args.ndjson:
+        # stdout only carries records, everything meant for humans goes to stderr
+        sys.stdout = sys.stderr
+    
     print("🚀 Starting Combined Memecoin Scanner...")
     
     # Check for API keys
-    cmc_api_key = os.getenv('CMC_TOKEN')
-    dune_api_key = os.getenv('DUNE_TOKEN')
-    
-    if not cmc_api_key or not dune_api_key:
+    key_sets = load_key_sets()
+    if not key_sets:
         print("❌ Error: Please set both CMC_TOKEN and DUNE_TOKEN environment variables")
         return
+    cmc_api_key, dune_api_key = key_sets[0]
+    
+    budgets = {
+        upstream: {
+            window: limit for window, limit in
+            (('daily', getattr(args, f'{upstream}_daily_budget')), ('hourly', getattr(args, f'{upstream}_hourly_budget')))
+            if limit is not None
+        }
+        for upstream in ('cmc', 'dune')
+    }
     
+    scanner = None
+    last_scan = LastScan()
     try:
-        scanner = MemeScanner(cmc_api_key, dune_api_key)
-        trending = scanner.scan_memecoins(
-            volume_threshold=50000,
-            min_price_increase=20,
-            max_price_increase=300
+        ledger = CreditLedger()
+        budget = CreditBudget(ledger, budgets, min_interval=args.interval, max_interval=args.max_interval,
+                              page_size=LISTINGS_PAGE_SIZE) if any(budgets.values()) else None
+        scanner = MemeScanner(
+            cmc_api_key, dune_api_key,
+            concurrency={'cmc': args.cmc_workers, 'dune': args.dune_workers},
+            score_cache=None if args.no_score_cache else ScoreCache(ttl=args.score_ttl),
+            dune_batch_query_id=args.dune_batch_query,
+            dune_timeout=args.dune_timeout,
+            dune_deadline=args.dune_deadline,
+            snapshot_store=None if args.no_history else SnapshotStore(),
+            recorder=ScanRecorder() if args.record else None,
+            ledger=ledger,
+            dune_top_k=args.dune_top_k,
+            last_scan=last_scan
         )
-        scanner.format_results(trending)
+        def report_metrics():
+            if args.profile:
+                METRICS.print_summary()
+            if args.metrics_file:
+                METRICS.export(args.metrics_file)
+        
+        if args.serve:
+            serve(ScanService(scanner, interval=args.interval, pipelined=args.pipelined, budget=budget),
+                  args.host, args.port)
+            return
+        
+        if args.watch:
+            def on_tick(trending, events):
+                scanner.format_results(trending)
+                report_metrics()
+            Watchlist(scanner, tick=args.tick, sweep_interval=args.sweep_interval, pipelined=args.pipelined,
+                      on_tick=on_tick).run()
+            return
+        
+        if args.daemon:
+            def on_cycle(trending, events, calls):
+                scanner.format_results(trending)
+                report_metrics()
+            ScanDaemon(scanner, interval=args.interval, pipelined=args.pipelined, on_cycle=on_cycle,
+                       budget=budget).run()
+            return
+        
+        if args.workers:
+            coordinator = Coordinator(scanner, key_sets, workers=args.workers, worker_options={
+                'dune_batch_query_id': args.dune_batch_query,
+                'dune_timeout': args.dune_timeout,
+                'dune_deadline': args.dune_deadline,
+                'score_ttl': None if args.no_score_cache else args.score_ttl
+            })
+            trending = coordinator.scan()
+            scanner.format_results(trending)
+            report_metrics()
+            print("\n✨ Scan completed successfully!")
+            return
+        
+        if args.profiles:
+            with open(args.profiles) as f:
+                results = scanner.scan_profiles(json.load(f), pipelined=args.pipelined)
+            for name, coins in results.items():
+                print("\n" + colored(f"📋 PROFILE: {name}", 'magenta', attrs=['bold']))
+                scanner.format_results(coins)
+            report_metrics()
+            print("\n✨ Scan completed successfully!")
+            return
+        
+        params = {'volume_threshold': 50000, 'min_price_increase': 20, 'max_price_increase': 300}
+        if args.ndjson:
+            scan = scanner.iter_scan(**params, pipelined=args.pipelined)
+            try:
+                for coin_data in scan:
+                    records_out.write(json.dumps(coin_data.as_dict(), default=str) + '\n')
+                    records_out.flush()
+            except BrokenPipeError:
+                # The consumer has seen enough, stop enriching and don't fail flushing stdout at exit
+                scan.close()
+                os.dup2(os.open(os.devnull, os.O_WRONLY), records_out.fileno())
+                return
+            report_metrics()
+            return
+        
+        warm = None if args.no_warm_start else last_scan.load(params)
+        previous = None
+        if warm:
+            # Show the last scan right away, then only what the fresh one changed
+            results, age = warm
+            try:
+                previous = [TokenRecord(**result) for result in results]
+            except TypeError:
+                pass  # Saved by an incompatible version
+            if previous:
+                scanner.format_results(list(previous), stale_age=age)
+        refresh = BackgroundRefresh(lambda: scanner.scan_memecoins(**params, pipelined=args.pipelined))
+        trending = refresh.result()
+        if previous:
+            scanner.format_changes(previous, trending)
+        else:
+            scanner.format_results(trending)
+        print(f"\n💳 Credits spent: CMC {ledger.totals['cmc']:.0f}, Dune {ledger.totals['dune']:.0f} (estimated)")
+        report_metrics()
         print("\n✨ Scan completed successfully!")
+    except KeyboardInterrupt:
+        print("\n👋 Scanner stopped")
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
+    finally:
+        if scanner:
+            scanner.dune_client.executions.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,214 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from tabulate import tabulate
+
+PREFIX = 'memescanner_'
+# Upper bounds in seconds; wide enough for both HTTP calls and multi-minute Dune executions
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside the bucket that contains it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms
+
+    Counters and histograms are keyed by (name, sorted labels). The registry
+    can print a human summary or export Prometheus text / JSON.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, phase):
+        """Time a scan phase into the phase_seconds histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('phase_seconds', time.perf_counter() - started, phase=phase)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'started_at': self.started_at,
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'histograms': [
+                    {
+                        'name': name, 'labels': dict(labels), 'count': histogram.count,
+                        'sum': histogram.sum, 'max': histogram.max,
+                        'p50': histogram.quantile(0.5), 'p99': histogram.quantile(0.99),
+                        'buckets': dict(zip([str(bound) for bound in histogram.buckets] + ['+Inf'], _cumulative(histogram.counts)))
+                    }
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ]
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    bounds = [repr(bound) for bound in histogram.buckets] + ['+Inf']
+                    for bound, count in zip(bounds, _cumulative(histogram.counts)):
+                        lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', bound),))} {count}")
+                    lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {histogram.sum}")
+                    lines.append(f"{PREFIX}{name}_count{_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """Write Prometheus text (.prom/.txt) or JSON (anything else), replacing the file atomically"""
+        content = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def print_summary(self):
+        data = self.to_dict()
+        phases = [
+            [h['labels']['phase'], h['count'], f"{h['sum']:.2f}s", f"{h['sum'] / h['count']:.3f}s", f"{h['max']:.3f}s"]
+            for h in sorted(data['histograms'], key=lambda h: -h['sum']) if h['name'] == 'phase_seconds'
+        ]
+        print("\n⏱️ Phase timings")
+        print(tabulate(phases, headers=['Phase', 'Calls', 'Total', 'Avg', 'Max'], tablefmt='simple'))
+
+        latencies = [
+            [_series(h), h['count'], f"{h['p50'] * 1000:.0f}ms", f"{h['p99'] * 1000:.0f}ms", f"{h['max'] * 1000:.0f}ms"]
+            for h in data['histograms'] if h['name'] != 'phase_seconds'
+        ]
+        print("\n📡 Latencies")
+        print(tabulate(latencies, headers=['Series', 'Count', 'p50', 'p99', 'Max'], tablefmt='simple'))
+
+        counters = [
+            [counter['name'], ', '.join(f"{key}={value}" for key, value in counter['labels'].items()),
+             round(counter['value'], 3) if isinstance(counter['value'], float) else counter['value']]
+            for counter in data['counters']
+        ]
+        print("\n🔢 Counters")
+        print(tabulate(counters, headers=['Counter', 'Labels', 'Value'], tablefmt='simple'))
+
+def timed(phase):
+    """Decorator that times every call of a function as `phase` on the shared registry"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.timer(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timed_iter(phase, iterable):
+    """Yield from `iterable`, timing it as `phase` without the time the consumer spends on each item"""
+    iterator = iter(iterable)
+    started = time.perf_counter()
+    suspended = 0.0
+    try:
+        for item in iterator:
+            paused = time.perf_counter()
+            yield item
+            suspended += time.perf_counter() - paused
+    finally:
+        # Pass an early close on, like `yield from` would
+        if hasattr(iterator, 'close'):
+            iterator.close()
+        METRICS.observe('phase_seconds', time.perf_counter() - started - suspended, phase=phase)
+
+def endpoint_name(path):
+    """Collapse execution and query ids so each API route is one metrics series"""
+    parts = path.split('?')[0].split('/')
+    for index in range(1, len(parts)):
+        if parts[index - 1] in ('execution', 'query'):
+            parts[index] = '{id}'
+    return '/'.join(parts)
+
+def _series(histogram):
+    labels = histogram['labels']
+    if 'endpoint' in labels:
+        return f"{labels['upstream']} {labels['endpoint']}"
+    return ' '.join([histogram['name']] + [f"{key}={value}" for key, value in labels.items()])
+
+def _cumulative(counts):
+    total = 0
+    cumulative = []
+    for count in counts:
+        total += count
+        cumulative.append(total)
+    return cumulative
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+METRICS = Metrics()  # Process-wide registry shared by the scanners, transport and Dune client
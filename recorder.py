@@ -0,0 +1,70 @@
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from token_index import DATA_DIR
+
+DEFAULT_RECORDINGS_DIR = os.path.join(DATA_DIR, 'recordings')
+
+class ScanRecorder:
+    """Collects the raw CMC and Dune responses of one scan and saves them for replay
+
+    A recording holds the full listings payload, the info payload of every
+    looked-up id and the Dune result row of every scored token address, plus
+    the time the listings were fetched, which replays use as their clock.
+    """
+
+    def __init__(self, directory=DEFAULT_RECORDINGS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.timestamp = None
+        self.listings = []
+        self.info = {}
+        self.dune = {}
+
+    def record_listings(self, listings):
+        with self.lock:
+            self.timestamp = time.time()
+            self.listings = listings
+
+    def record_info(self, data):
+        with self.lock:
+            self.info.update(data)
+
+    def record_dune(self, token_address, row):
+        with self.lock:
+            self.dune[token_address] = row
+
+    def save(self, params=None):
+        """Write the current scan to a gzipped JSON file and start a new one"""
+        with self.lock:
+            timestamp = self.timestamp or time.time()
+            recording = {
+                'timestamp': timestamp,
+                'params': params or {},
+                'listings': self.listings,
+                'info': self.info,
+                'dune': self.dune
+            }
+            self._reset()
+
+        name = datetime.fromtimestamp(timestamp).strftime('%Y%m%d-%H%M%S-%f') + '.json.gz'
+        path = os.path.join(self.directory, name)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(recording, f)
+        return path
+
+def list_recordings(directory=DEFAULT_RECORDINGS_DIR):
+    """Recording paths in chronological order"""
+    return sorted(glob.glob(os.path.join(directory, '*.json.gz')))
+
+def load_recording(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,173 @@
+import argparse
+import functools
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from tabulate import tabulate
+from listings_frame import ListingsFrame, rank_order, MAX_TOKEN_AGE
+from main import MemeScanner
+from recorder import DEFAULT_RECORDINGS_DIR, list_recordings, load_recording
+from token_index import TokenIndex
+
+DAY = 24 * 60 * 60
+MISSING = object()  # Info for an id that was never looked up while recording
+
+class ReplayScanner(MemeScanner):
+    """MemeScanner that answers from a recording instead of the live APIs
+
+    Filtering, metadata parsing, score extraction and ranking are the
+    scanner's own; the listing-age window is evaluated at the recording's
+    timestamp, so a replay gives the same answer every time.
+    """
+
+    def __init__(self, recording):
+        # No API clients on purpose: a replay must never reach the network
+        self.token_index = TokenIndex(':memory:')
+        # Listings rows carry their platform, so non-Solana ids are skipped exactly like the live scan did
+        self.token_index.record_coins(recording['listings'])
+        self.score_cache = None
+        self.snapshot_store = None
+        self.recorder = None
+        self.timestamp = recording['timestamp']
+        self.now = datetime.fromtimestamp(recording['timestamp'], timezone.utc)
+        self.frame = ListingsFrame(recording['listings'])
+        self.info = recording['info']
+        self.dune = recording['dune']
+        self.metadata = {}  # Parsed info per id, shared by every parameter set
+
+    def replay(self, volume_threshold, min_price_increase, max_price_increase, max_age=MAX_TOKEN_AGE):
+        """Ranked results for one parameter set, plus how many candidates the recording could not cover"""
+        candidates = self.select_candidates(self.frame, volume_threshold, min_price_increase, max_price_increase,
+                                            now=self.now, max_age=max_age)
+        # Pre-scored against the recording's clock, so the blended ranking matches the live one
+        candidates = self.prioritize(candidates, self.now)
+        results = []
+        coverage = {'candidates': len(candidates), 'missing_info': 0, 'unscored': 0}
+        for coin in candidates:
+            metadata = self._metadata_for(coin['id'])
+            if metadata is MISSING:
+                # Not looked up while recording, so we can't tell whether it is a Solana token
+                coverage['missing_info'] += 1
+                continue
+            if not metadata:
+                continue
+            row = self.dune.get(metadata['token_address'])
+            if row is None:
+                coverage['unscored'] += 1
+                dune_results = {'dune_score': 'N/A', 'dune_interpretation': 'N/A', 'dune_source': 'failed'}
+            else:
+                dune_results = self._store_score(metadata['token_address'], row, 'replay')
+            results.append(self._build_coin_data(coin, metadata, dune_results))
+        return [results[index] for index in rank_order(results)], coverage
+
+    def _metadata_for(self, coin_id):
+        if coin_id not in self.metadata:
+            info = self.info.get(str(coin_id))
+            self.metadata[coin_id] = MISSING if info is None else self._parse_metadata(info)
+        return self.metadata[coin_id]
+
+def parameter_grid(volume_thresholds, min_price_increases, max_price_increases, max_ages):
+    return [
+        {'volume_threshold': volume, 'min_price_increase': low, 'max_price_increase': high, 'max_age': age}
+        for volume, low, high, age in itertools.product(volume_thresholds, min_price_increases,
+                                                        max_price_increases, max_ages)
+    ]
+
+def backtest(paths, grid, workers=None):
+    """Replay every recording under every parameter set and aggregate per parameter set
+
+    Recordings are spread over a process pool; each worker parses a
+    recording once and evaluates the whole grid against it. The forward
+    return of a result is its price move until the next recording.
+    Returns an empty summary when there are no recordings.
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+    next_paths = paths[1:] + [None]
+    totals = [
+        {'scans': 0, 'candidates': 0, 'results': 0, 'missing_info': 0, 'unscored': 0,
+         'score_sum': 0.0, 'scores': 0, 'return_sum': 0.0, 'returns': 0}
+        for _ in grid
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for scan_stats in pool.map(functools.partial(_replay_file, grid=grid), paths, next_paths, chunksize=4):
+            for total, stats in zip(totals, scan_stats):
+                total['scans'] += 1
+                for key, value in stats.items():
+                    total[key] += value
+
+    summary = []
+    for params, total in zip(grid, totals):
+        summary.append({
+            **params,
+            'avg_results': total['results'] / total['scans'] if total['scans'] else 0.0,
+            'avg_score': total['score_sum'] / total['scores'] if total['scores'] else None,
+            'avg_forward_return': total['return_sum'] / total['returns'] if total['returns'] else None,
+            'missing_info': total['missing_info'],
+            'unscored': total['unscored']
+        })
+    return summary
+
+def _replay_file(path, next_path, grid):
+    scanner = ReplayScanner(load_recording(path))
+    next_prices = {}
+    if next_path:
+        next_prices = {coin['id']: coin['quote']['USD']['price'] for coin in load_recording(next_path)['listings']}
+
+    scan_stats = []
+    for params in grid:
+        results, coverage = scanner.replay(**params)
+        scores = [coin['dune_score'] for coin in results if isinstance(coin['dune_score'], (int, float))]
+        returns = [
+            (next_prices[coin['id']] / coin['price'] - 1) * 100
+            for coin in results
+            if next_prices.get(coin['id']) and coin['price']
+        ]
+        scan_stats.append({
+            'candidates': coverage['candidates'],
+            'results': len(results),
+            'missing_info': coverage['missing_info'],
+            'unscored': coverage['unscored'],
+            'score_sum': float(sum(scores)),
+            'scores': len(scores),
+            'return_sum': sum(returns),
+            'returns': len(returns)
+        })
+    return scan_stats
+
+def _floats(value):
+    return [float(item) for item in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest scanner thresholds offline against recorded scans")
+    parser.add_argument('--dir', default=DEFAULT_RECORDINGS_DIR, help="directory with recordings made by main.py --record")
+    parser.add_argument('--volume', type=_floats, default=[50000], help="comma-separated volume_threshold values")
+    parser.add_argument('--min-change', type=_floats, default=[20], help="comma-separated min_price_increase values")
+    parser.add_argument('--max-change', type=_floats, default=[300], help="comma-separated max_price_increase values")
+    parser.add_argument('--max-age-days', type=_floats, default=[MAX_TOKEN_AGE / DAY], help="comma-separated listing-age windows in days")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="replay processes")
+    parser.add_argument('--sort', default='avg_forward_return', help="summary column to sort by (descending)")
+    args = parser.parse_args()
+
+    paths = list_recordings(args.dir)
+    if not paths:
+        print(f"❌ No recordings in {args.dir}, run main.py --record first")
+        return
+
+    grid = parameter_grid(args.volume, args.min_change, args.max_change, [days * DAY for days in args.max_age_days])
+    print(f"⏪ Replaying {len(paths)} recordings x {len(grid)} parameter sets on {args.workers} processes...")
+    started = time.monotonic()
+    summary = backtest(paths, grid, workers=args.workers)
+    elapsed = time.monotonic() - started
+
+    summary.sort(key=lambda row: row[args.sort] if row[args.sort] is not None else float('-inf'), reverse=True)
+    for row in summary:
+        row['max_age'] = f"{row['max_age'] / DAY:g}d"
+    print(tabulate(summary, headers='keys', floatfmt='.2f'))
+    print(f"\n✨ Backtest finished in {elapsed:.2f}s")
+
+if __name__ == '__main__':
+    main()
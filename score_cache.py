@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import threading
+import time
+from metrics import METRICS
+from token_index import DATA_DIR
+
+DEFAULT_CACHE_PATH = os.path.join(DATA_DIR, 'dune_scores.sqlite3')
+DEFAULT_TTL = 60 * 60  # Seconds a Dune score stays fresh
+DEFAULT_MAX_ENTRIES = 10000
+
+class ScoreCache:
+    """Persistent TTL + LRU cache of Dune scores keyed by (query_id, token_address)"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scores (
+                query_id TEXT,
+                token_address TEXT,
+                dune_score TEXT,
+                dune_interpretation TEXT,
+                computed_at REAL,
+                accessed_at REAL,
+                PRIMARY KEY (query_id, token_address)
+            );
+            CREATE INDEX IF NOT EXISTS scores_accessed_at ON scores (accessed_at);
+        """)
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+
+    def get(self, query_id, token_address):
+        """Return the cached score dict (with `computed_at`) or None if missing or expired"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT dune_score, dune_interpretation, computed_at FROM scores "
+                "WHERE query_id = ? AND token_address = ?",
+                (str(query_id), token_address)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                METRICS.inc('score_cache_lookups_total', result='miss')
+                return None
+            if now - row[2] > self.ttl:
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                METRICS.inc('score_cache_lookups_total', result='expired')
+                return None
+            self.conn.execute(
+                "UPDATE scores SET accessed_at = ? WHERE query_id = ? AND token_address = ?",
+                (now, str(query_id), token_address)
+            )
+            self.conn.commit()
+            self.stats['hits'] += 1
+            METRICS.inc('score_cache_lookups_total', result='hit')
+        return {
+            'dune_score': _decode_score(row[0]),
+            'dune_interpretation': row[1],
+            'computed_at': row[2]
+        }
+
+    def put(self, query_id, token_address, dune_score, dune_interpretation, computed_at=None):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?)",
+                (str(query_id), token_address, _encode_score(dune_score), dune_interpretation,
+                 computed_at or now, now)
+            )
+            self.stats['stores'] += 1
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop the least recently used rows once the cache is over its size bound
+        count = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+            self.stats['evictions'] += excess
+
+    def is_fresh(self, computed_at):
+        return time.time() - computed_at <= self.ttl
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM scores")
+            self.conn.commit()
+
+def _encode_score(score):
+    return repr(score) if isinstance(score, (int, float)) else str(score)
+
+def _decode_score(value):
+    # Scores are numeric from Dune but 'N/A'-style strings must round-trip too
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            pass
+    return value
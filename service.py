@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from daemon import ScanDaemon, DEFAULT_INTERVAL
+from listings_frame import rank_order
+from metrics import METRICS
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+MIN_REFRESH_INTERVAL = 60  # Seconds between client-requested rescans, however many clients ask
+
+class ScanService:
+    """Runs scans on a schedule and shares the latest results with any number of clients
+
+    Scans go through a ScanDaemon, so each cycle only enriches coins that are
+    new or moved. At most one scan runs at a time: callers that ask for a
+    refresh while one is in flight wait for it instead of starting another,
+    and client-requested refreshes are rate limited by `min_refresh_interval`
+    since the last attempt, successful or not, so upstream load stays the
+    same however many clients ask, even while there are no results yet.
+    """
+
+    def __init__(self, scanner, interval=DEFAULT_INTERVAL, pipelined=False,
+                 min_refresh_interval=MIN_REFRESH_INTERVAL, budget=None, **scan_params):
+        self.daemon = ScanDaemon(scanner, interval=interval, pipelined=pipelined,
+                                 on_cycle=lambda trending, events, calls: None, budget=budget, **scan_params)
+        self.min_refresh_interval = min_refresh_interval
+        self.latest = None
+        self.lock = threading.Lock()
+        self.in_flight = None  # Event set when the running scan finishes
+        self.last_attempt_at = None  # When the last scan started, whether or not it succeeded
+        self.stop_event = threading.Event()
+        self.stats = {'scans': 0, 'coalesced': 0, 'throttled': 0, 'failed': 0}
+
+    def refresh(self, min_interval=0):
+        """Run a scan, or wait for the one already running; returns the latest snapshot
+
+        No scan is started within `min_interval` seconds of the last attempt,
+        the latest snapshot (possibly None) is returned as is instead.
+        """
+        with self.lock:
+            if self.in_flight is not None:
+                done, leader = self.in_flight, False
+                self.stats['coalesced'] += 1
+            elif self.last_attempt_at is not None and time.time() - self.last_attempt_at < min_interval:
+                self.stats['throttled'] += 1
+                return self.latest
+            else:
+                done = self.in_flight = threading.Event()
+                self.last_attempt_at = time.time()
+                leader = True
+
+        if not leader:
+            done.wait()
+            return self.latest
+
+        try:
+            self.stats['scans'] += 1
+            trending, events, calls = self.daemon.run_cycle()
+            if trending is None:
+                self.stats['failed'] += 1
+            else:
+                self._publish(trending, events, calls)
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"❌ Scheduled scan failed: {str(e)}")
+        finally:
+            with self.lock:
+                self.in_flight = None
+            done.set()
+        return self.latest
+
+    def get(self, max_age=None):
+        """Latest snapshot, rescanning first if it is older than `max_age` seconds
+
+        `max_age` is clamped to `min_refresh_interval` so clients can't drive
+        the upstream harder than that.
+        """
+        if max_age is not None:
+            max_age = max(max_age, self.min_refresh_interval)
+        if self.latest is None or (max_age is not None and self.age() > max_age):
+            return self.refresh(self.min_refresh_interval)
+        return self.latest
+
+    @property
+    def interval(self):
+        # A credit budget may stretch the daemon's interval between cycles
+        return self.daemon.interval
+
+    def age(self):
+        return time.time() - self.latest['scanned_at'] if self.latest else None
+
+    def run_scheduler(self):
+        """Scan every `interval` seconds until stop() is called"""
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            if self.latest is None or self.age() >= self.interval * 0.5:
+                self.refresh()
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        threading.Thread(target=self.run_scheduler, name='scan-scheduler', daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _publish(self, trending, events, calls):
+        results = [trending[index].as_dict() for index in rank_order(trending)]
+        scanned_at = time.time()
+        # The ETag only depends on the results, so an unchanged scan keeps serving 304s
+        results_body = json.dumps(results, sort_keys=True, default=str).encode()
+        etag = '"' + hashlib.sha1(results_body).hexdigest() + '"'
+        body = json.dumps({
+            'scanned_at': datetime.fromtimestamp(scanned_at, timezone.utc).isoformat(),
+            'cycle': self.daemon.cycles,
+            'count': len(results),
+            'events': events,
+            'upstream_calls': calls,
+            'results': results
+        }, default=str).encode()
+        self.latest = {'scanned_at': scanned_at, 'etag': etag, 'body': body, 'count': len(results)}
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        METRICS.inc('service_requests_total', path=url.path)
+
+        if url.path == '/results':
+            try:
+                max_age = float(params['max_age'][0]) if 'max_age' in params else None
+                if max_age is not None and not (math.isfinite(max_age) and max_age >= 0):
+                    raise ValueError(max_age)
+            except ValueError:
+                return self._send_json({'error': 'max_age must be a non-negative number of seconds'}, 400)
+            latest = service.get(max_age)
+            if latest is None:
+                return self._send_json({'error': 'no successful scan yet'}, 503)
+            headers = [
+                ('ETag', latest['etag']),
+                ('Cache-Control', f"max-age={max(0, int(service.interval - service.age()))}"),
+                ('Age', str(int(service.age())))
+            ]
+            if self.headers.get('If-None-Match') == latest['etag']:
+                METRICS.inc('service_not_modified_total')
+                return self._send(b'', 304, headers=headers)
+            return self._send(latest['body'], headers=headers)
+
+        if url.path == '/health':
+            return self._send_json({
+                'status': 'ok' if service.latest else 'starting',
+                'age': service.age(),
+                'scanning': service.in_flight is not None,
+                **service.stats
+            })
+
+        if url.path == '/metrics':
+            return self._send(METRICS.to_prometheus().encode(), content_type='text/plain; version=0.0.4')
+
+        self._send_json({'error': f'unknown path {url.path}'}, 404)
+
+    def _send_json(self, body, status=200):
+        self._send(json.dumps(body).encode(), status)
+
+    def _send(self, payload, status=200, headers=(), content_type='application/json'):
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Start the scan scheduler and serve results until interrupted"""
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    service.start()
+    print(f"🌐 Serving scan results on http://{host}:{port}/results (also /health and /metrics)")
+    try:
+        server.serve_forever()
+    finally:
+        service.stop()
+        server.server_close()
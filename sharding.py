@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from budget import CreditLedger
+from job_queue import JobQueue
+from listings_frame import rank_order
+from score_cache import ScoreCache
+from token_index import TokenIndex
+from token_record import TokenRecord
+from transport import get_session
+
+JOB_SIZE = 20  # Candidates per job: one info request and one batched Dune execution at most
+POLL_INTERVAL = 0.5  # Seconds an idle worker waits before asking the queue again
+
+def load_key_sets():
+    """(cmc_key, dune_key) pairs from CMC_TOKENS / DUNE_TOKENS (comma-separated), or CMC_TOKEN / DUNE_TOKEN
+
+    The shorter list is cycled, so three CMC keys and one Dune key make
+    three key sets sharing the Dune key.
+    """
+    cmc_keys = [key for key in os.getenv('CMC_TOKENS', os.getenv('CMC_TOKEN', '')).split(',') if key]
+    dune_keys = [key for key in os.getenv('DUNE_TOKENS', os.getenv('DUNE_TOKEN', '')).split(',') if key]
+    if not cmc_keys or not dune_keys:
+        return []
+    count = max(len(cmc_keys), len(dune_keys))
+    return [(cmc_keys[index % len(cmc_keys)], dune_keys[index % len(dune_keys)]) for index in range(count)]
+
+class Coordinator:
+    """Fans a scan's enrichment out to worker processes through a durable job queue
+
+    The coordinator's own scanner downloads listings once, filters and
+    pre-scores them, and queues the candidates in jobs of JOB_SIZE. Each
+    worker process builds its own scanner with one key set and works through
+    the queue under that key's rate limit, so throughput grows with workers
+    and keys. Jobs are leased: one whose worker crashes is picked up again
+    once the lease runs out, and anything still left when all workers exit is
+    finished by the coordinator itself. Results are merged into one ranking.
+    """
+
+    def __init__(self, scanner, key_sets, workers=None, queue_path=None, worker_options=None):
+        self.scanner = scanner
+        self.key_sets = key_sets
+        self.workers = workers or len(key_sets)
+        self.queue = JobQueue(queue_path) if queue_path else JobQueue()
+        self.worker_options = worker_options or {}  # Extra MemeScanner arguments for the workers
+
+    def scan(self, volume_threshold=50000, min_price_increase=20, max_price_increase=300):
+        """One sharded scan; returns the merged, ranked results"""
+        print(f"\n🔍 Scanning for Solana memecoins with {self.workers} workers on {len(self.key_sets)} key set(s)...")
+        params = {
+            'volume_threshold': volume_threshold,
+            'min_price_increase': min_price_increase,
+            'max_price_increase': max_price_increase
+        }
+        data = self.scanner.fetch_listings(**params)
+        if data is None:
+            return []
+        candidates = self.scanner.prioritize(self.scanner.select_candidates(data, **params))
+        del data
+
+        scan_id = uuid.uuid4().hex
+        jobs = [candidates[start:start + JOB_SIZE] for start in range(0, len(candidates), JOB_SIZE)]
+        self.queue.put_many(scan_id, [{'coins': chunk} for chunk in jobs])
+        print(f"🧩 Queued {len(jobs)} jobs for {len(candidates)} candidates")
+
+        started = time.perf_counter()
+        # Spawned, not forked, so workers don't inherit the coordinator's sessions and rate limiters
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(self.queue.path, scan_id, f"worker-{index + 1}", self._keys_for(index),
+                      self._shares(index), self.worker_options),
+                name=f"scan-worker-{index + 1}"
+            )
+            for index in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        self._wait(scan_id, processes)
+
+        progress = self.queue.progress(scan_id)
+        if progress['pending'] or progress['leased']:
+            print(f"⚠️ Workers exited with {progress['pending'] + progress['leased']} jobs left, finishing them here")
+            Worker(self.queue, scan_id, 'coordinator', self.scanner).run()
+            progress = self.queue.progress(scan_id)
+
+        results, done_by = [], Counter()
+        for records, worker in self.queue.results(scan_id):
+            results.extend(TokenRecord(**record) for record in records)
+            done_by[worker] += 1
+        self.queue.purge(scan_id)
+
+        elapsed = time.perf_counter() - started
+        retries = progress['attempts'] - progress['done'] - progress['failed']
+        print(f"\n🧩 Sharded enrichment: {progress['done']}/{len(jobs)} jobs in {elapsed:.1f}s "
+              f"({retries} retries, {progress['failed']} failed); "
+              + ', '.join(f"{worker}: {count}" for worker, count in sorted(done_by.items())))
+
+        results = [results[index] for index in rank_order(results)]
+        self.scanner.record_snapshot(candidates, results, params)
+        return results
+
+    def _keys_for(self, index):
+        return self.key_sets[index % len(self.key_sets)]
+
+    def _shares(self, index):
+        """How many workers split each of this worker's keys, per upstream"""
+        cmc_key, dune_key = self._keys_for(index)
+        keys = [self._keys_for(other) for other in range(self.workers)]
+        return {
+            'cmc': sum(1 for other in keys if other[0] == cmc_key),
+            'dune': sum(1 for other in keys if other[1] == dune_key)
+        }
+
+    def _wait(self, scan_id, processes):
+        reported = None
+        while any(process.is_alive() for process in processes):
+            progress = self.queue.progress(scan_id)
+            if progress['done'] != reported:
+                reported = progress['done']
+                total = sum(progress[state] for state in ('pending', 'leased', 'done', 'failed'))
+                print(f"🧩 {progress['done']}/{total} jobs done")
+            time.sleep(POLL_INTERVAL)
+        for process in processes:
+            process.join()
+
+class Worker:
+    """Works through one scan's jobs with a single scanner until none are left"""
+
+    def __init__(self, queue, scan_id, name, scanner):
+        self.queue = queue
+        self.scan_id = scan_id
+        self.name = name
+        self.scanner = scanner
+        self.stats = {'done': 0, 'failed': 0, 'lost': 0}
+
+    def run(self):
+        while True:
+            job = self.queue.lease_next(self.scan_id, self.name)
+            if job is None:
+                progress = self.queue.progress(self.scan_id)
+                if not progress['pending'] and not progress['leased']:
+                    return self.stats
+                # Jobs in backoff or leased by others may still come back
+                time.sleep(POLL_INTERVAL)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        # A job of per-token Dune executions can outlast the lease, keep renewing it so no one else re-runs it
+        done = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(job['job_id'], done),
+                                   name=f"{self.name}-lease", daemon=True)
+        renewer.start()
+        try:
+            self._run_job(job)
+        finally:
+            done.set()
+            renewer.join()
+
+    def _renew_lease(self, job_id, done):
+        while not done.wait(self.queue.lease / 3):
+            try:
+                if not self.queue.renew(job_id, self.name):
+                    return
+            except Exception as e:
+                print(f"⚠️ {self.name}: could not renew the lease on job {job_id}: {str(e)}")
+
+    def _run_job(self, job):
+        metadata_failures = self.scanner.request_counts['cmc_info_failed']
+        records = None
+        try:
+            records = self.scanner.enrich_candidates(job['payload']['coins'])
+            # The scanner degrades failed lookups to missing data, retry the job while it has attempts left
+            if self.scanner.request_counts['cmc_info_failed'] > metadata_failures:
+                raise RuntimeError("metadata request failed")
+        except Exception as e:
+            print(f"⚠️ {self.name}: job {job['job_id']} failed (attempt {job['attempts']}): {str(e)}")
+            if records is None or job['attempts'] < self.queue.max_attempts:
+                if self.queue.fail(job['job_id'], self.name, e) is None:
+                    self.stats['lost'] += 1
+                else:
+                    self.stats['failed'] += 1
+                return
+            # Out of attempts: keep what the last one got rather than nothing
+
+        # Tokens whose Dune score failed go back on their own, the rest of the job is done
+        failed_ids = {record.id for record in records if record.dune_source == 'failed'}
+        retry_payload = error = None
+        if failed_ids and job['attempts'] < self.queue.max_attempts:
+            error = f"Dune scoring failed for {len(failed_ids)} token(s)"
+            print(f"⚠️ {self.name}: job {job['job_id']} (attempt {job['attempts']}): {error}, retrying only those")
+            retry_payload = {'coins': [coin for coin in job['payload']['coins'] if coin['id'] in failed_ids]}
+            records = [record for record in records if record.id not in failed_ids]
+            self.stats['failed'] += 1
+        if self.queue.complete(job['job_id'], self.name, [record.as_dict() for record in records],
+                               retry_payload, error):
+            if retry_payload is None:
+                self.stats['done'] += 1
+        else:
+            # The lease ran out and another worker owns the job now
+            self.stats['lost'] += 1
+
+def run_worker(queue_path, scan_id, name, keys, shares, options):
+    """Worker process entry point: a scanner on its own key set, draining the queue"""
+    from main import MemeScanner
+
+    cmc_key, dune_key = keys
+    # Create the key's sessions first so they get this process's share of the rate limit
+    get_session('cmc', cmc_key, share=shares['cmc'])
+    get_session('dune', dune_key, share=shares['dune'])
+    options = dict(options)
+    score_ttl = options.pop('score_ttl', None)
+    scanner = MemeScanner(
+        cmc_key, dune_key,
+        token_index=TokenIndex(),
+        score_cache=ScoreCache(ttl=score_ttl) if score_ttl else None,
+        ledger=CreditLedger(),
+        **options
+    )
+    try:
+        stats = Worker(JobQueue(queue_path), scan_id, name, scanner).run()
+    finally:
+        scanner.dune_client.executions.close()
+    print(f"🧩 {name} finished: {stats['done']} jobs done, {stats['failed']} failed attempts, {stats['lost']} lost leases")
@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from tabulate import tabulate
+from token_index import DATA_DIR
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(DATA_DIR, 'snapshots.sqlite3')
+MOVER_METRICS = ('dune_score', 'price', 'price_change_24h', 'volume_24h', 'volume_change_24h', 'market_cap')
+
+class SnapshotStore:
+    """Append-only SQLite history of every scan's candidates and enriched results
+
+    Each scan is one row in `scans` plus one bulk insert into `listings` (the
+    rows that passed the filters) and `results` (the enriched coins), all in
+    a single transaction so ingest stays a few milliseconds per scan.
+    """
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS scans (
+                scan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL,
+                params TEXT,
+                listings_count INTEGER,
+                results_count INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS listings (
+                scan_id INTEGER,
+                timestamp REAL,
+                cmc_id INTEGER,
+                symbol TEXT,
+                price REAL,
+                price_change_24h REAL,
+                volume_24h REAL,
+                volume_change_24h REAL,
+                market_cap REAL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                scan_id INTEGER,
+                timestamp REAL,
+                cmc_id INTEGER,
+                token_address TEXT,
+                symbol TEXT,
+                name TEXT,
+                price REAL,
+                price_change_24h REAL,
+                volume_24h REAL,
+                volume_change_24h REAL,
+                market_cap REAL,
+                dune_score REAL,
+                dune_interpretation TEXT,
+                dune_source TEXT
+            );
+            CREATE INDEX IF NOT EXISTS listings_scan ON listings (scan_id);
+            CREATE INDEX IF NOT EXISTS listings_token_time ON listings (cmc_id, timestamp);
+            CREATE INDEX IF NOT EXISTS results_scan ON results (scan_id);
+            CREATE INDEX IF NOT EXISTS results_token_time ON results (token_address, timestamp);
+        """)
+        self.lock = threading.Lock()
+        self.stats = {'scans': 0, 'rows': 0, 'ingest_seconds': 0.0}
+
+    def record_scan(self, candidates, results, params=None, timestamp=None):
+        """Persist one scan and return its scan_id"""
+        started = time.perf_counter()
+        timestamp = timestamp or time.time()
+        listing_rows = []
+        for coin in candidates:
+            quote = coin['quote']['USD']
+            listing_rows.append((
+                timestamp, coin['id'], coin['symbol'], quote.get('price'), quote.get('percent_change_24h'),
+                quote.get('volume_24h'), quote.get('volume_change_24h'), quote.get('market_cap')
+            ))
+        result_rows = [
+            (
+                timestamp, coin.get('id'), coin.get('token_address'), coin['symbol'], coin.get('name'),
+                coin.get('price'), coin.get('price_change_24h'), coin.get('volume_24h'),
+                coin.get('volume_change_24h'), coin.get('market_cap'), _numeric(coin.get('dune_score')),
+                coin.get('dune_interpretation'), coin.get('dune_source')
+            )
+            for coin in results
+        ]
+
+        with self.lock, self.conn:
+            scan_id = self.conn.execute(
+                "INSERT INTO scans (timestamp, params, listings_count, results_count) VALUES (?, ?, ?, ?)",
+                (timestamp, json.dumps(params or {}), len(listing_rows), len(result_rows))
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO listings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(scan_id, *row) for row in listing_rows]
+            )
+            self.conn.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(scan_id, *row) for row in result_rows]
+            )
+            self.stats['scans'] += 1
+            self.stats['rows'] += len(listing_rows) + len(result_rows)
+            self.stats['ingest_seconds'] += time.perf_counter() - started
+        return scan_id
+
+    def scans(self, limit=50):
+        """Most recent scans, newest first"""
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM scans ORDER BY scan_id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def token_history(self, token_address, limit=50):
+        """The token's enriched results across its last `limit` scans, newest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM results WHERE token_address = ? ORDER BY timestamp DESC LIMIT ?",
+                (token_address, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def top_movers(self, from_scan=None, to_scan=None, metric='dune_score', limit=10):
+        """Tokens present in both scans ranked by the absolute change in `metric`
+
+        Defaults to the two most recent scans.
+        """
+        if metric not in MOVER_METRICS:
+            raise ValueError(f"metric must be one of {', '.join(MOVER_METRICS)}")
+        if from_scan is None or to_scan is None:
+            latest = [scan['scan_id'] for scan in self.scans(2)]
+            if len(latest) < 2:
+                return []
+            to_scan, from_scan = latest
+
+        with self.lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT b.token_address, b.symbol, a.{metric} AS before, b.{metric} AS after,
+                       b.{metric} - a.{metric} AS change
+                FROM results a JOIN results b ON a.token_address = b.token_address
+                WHERE a.scan_id = ? AND b.scan_id = ? AND a.{metric} IS NOT NULL AND b.{metric} IS NOT NULL
+                ORDER BY ABS(b.{metric} - a.{metric}) DESC
+                LIMIT ?
+                """,
+                (from_scan, to_scan, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+def _numeric(value):
+    # 'N/A' scores are stored as NULL so they never count as movers
+    return value if isinstance(value, (int, float)) else None
+
+if __name__ == '__main__':
+    store = SnapshotStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'scans'
+    if command == 'history' and len(sys.argv) > 2:
+        rows = [
+            [datetime.fromtimestamp(row['timestamp']).strftime('%Y-%m-%d %H:%M'), row['scan_id'], row['symbol'],
+             row['price_change_24h'], row['volume_24h'], row['dune_score']]
+            for row in store.token_history(sys.argv[2])
+        ]
+        print(tabulate(rows, headers=['Time', 'Scan', 'Symbol', '24h %', 'Volume 24h', 'Dune Score']))
+    elif command == 'movers':
+        scan_ids = [int(value) for value in sys.argv[2:4]]
+        movers = store.top_movers(*(scan_ids if len(scan_ids) == 2 else []))
+        print(tabulate(movers, headers='keys'))
+    else:
+        rows = [
+            [scan['scan_id'], datetime.fromtimestamp(scan['timestamp']).strftime('%Y-%m-%d %H:%M'),
+             scan['listings_count'], scan['results_count']]
+            for scan in store.scans()
+        ]
+        print(tabulate(rows, headers=['Scan', 'Time', 'Candidates', 'Results']))
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import threading
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from stub_server import make_server
+
+# transport reads the base URLs and plans at import time, so the stub has to be up before anything imports it
+STUB = make_server({'listings': 600, 'latency_ms': 0, 'jitter_ms': 0, 'dune_duration': 0.05})
+threading.Thread(target=STUB.serve_forever, name='stub-server', daemon=True).start()
+STUB_URL = f"http://127.0.0.1:{STUB.server_address[1]}"
+os.environ['CMC_BASE_URL'] = f"{STUB_URL}/cmc"
+os.environ['DUNE_BASE_URL'] = f"{STUB_URL}/dune"
+os.environ['CMC_PLAN'] = 'enterprise'
+os.environ['DUNE_PLAN'] = 'premium'
+os.environ['MEMESCANNER_HOME'] = tempfile.mkdtemp(prefix='memescanner-tests-')
+
+@pytest.fixture
+def stub():
+    """The stub server's state, with its config restored after the test"""
+    config = dict(STUB.state.config)
+    yield STUB.state
+    STUB.state.config.update(config)
+
+@pytest.fixture
+def make_scanner(tmp_path):
+    """Build MemeScanners on the stub with their own token index and no caches"""
+    from main import MemeScanner
+    from token_index import TokenIndex
+
+    scanners = []
+    def factory(**options):
+        scanner = MemeScanner('test-cmc-key', 'test-dune-key', token_index=TokenIndex(str(tmp_path / 'index.sqlite3')),
+                              **{'dune_batch_query_id': None, **options})
+        scanners.append(scanner)
+        return scanner
+    yield factory
+    for scanner in scanners:
+        scanner.dune_client.executions.close()
+
+@pytest.fixture
+def candidates(make_scanner):
+    """This listing's candidates for the default thresholds"""
+    scanner = make_scanner()
+    params = {'volume_threshold': 50000, 'min_price_increase': 20, 'max_price_increase': 300}
+    return scanner.select_candidates(scanner.fetch_listings(**params), **params)
@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from async_scanner import AsyncMemeScanner
+from score_cache import ScoreCache
+from token_index import TokenIndex
+from test_pipeline import summary
+
+def async_scan(tmp_path, **options):
+    async def scan():
+        async with AsyncMemeScanner('test-cmc-key', 'test-dune-key',
+                                    token_index=TokenIndex(str(tmp_path / 'async-index.sqlite3')), **options) as scanner:
+            return scanner, await scanner.scan_memecoins()
+    return asyncio.run(scan())
+
+def test_async_results_match_sync(stub, make_scanner, tmp_path):
+    stub.config['dune_duration'] = 0.3
+    sequential = make_scanner().scan_memecoins()
+    scanner, results = async_scan(tmp_path)
+    assert summary(results) == summary(sequential)
+
+def test_async_top_k_goes_to_best_pre_scores(tmp_path):
+    scanner, results = async_scan(tmp_path, dune_top_k=3)
+    assert [record.dune_source for record in results[:3]] == ['fresh'] * 3
+    assert all(record.dune_source == 'skipped' for record in results[3:])
+    assert scanner.dune_client.stats['submitted'] == 3
+
+def test_async_uses_the_score_cache(tmp_path):
+    cache = ScoreCache(str(tmp_path / 'scores.sqlite3'))
+    first_scanner, first = async_scan(tmp_path, score_cache=cache, use_latest_results=False)
+    second_scanner, second = async_scan(tmp_path, score_cache=cache, use_latest_results=False)
+    assert {record.dune_source for record in second} == {'cached'}
+    assert second_scanner.dune_client.stats['submitted'] == 0
+    assert [record.dune_score for record in second] == [record.dune_score for record in first]
+
+def test_sync_entry_points_are_blocked(tmp_path):
+    scanner = AsyncMemeScanner('test-cmc-key', 'test-dune-key', token_index=TokenIndex(str(tmp_path / 'index.sqlite3')))
+    with pytest.raises(NotImplementedError):
+        scanner.enrich_candidates([])
@@ -0,0 +1,24 @@
+BATCH_QUERY_ID = '4242'
+
+def scores(records):
+    return {record.id: (record.token_address, record.dune_score, record.dune_interpretation) for record in records}
+
+def test_batched_scores_match_single_queries(make_scanner, candidates):
+    single = make_scanner().enrich_candidates(candidates)
+    batched = make_scanner(dune_batch_query_id=BATCH_QUERY_ID).enrich_candidates(candidates)
+
+    assert len(single) > 1
+    assert all(record.dune_source == 'fresh' for record in single + batched)
+    assert scores(batched) == scores(single)
+
+def test_pipelined_batches_match_single_queries(make_scanner, candidates):
+    single = make_scanner().enrich_candidates(candidates)
+    batched = make_scanner(dune_batch_query_id=BATCH_QUERY_ID).enrich_candidates(candidates, pipelined=True)
+    assert scores(batched) == scores(single)
+
+def test_batch_uses_fewer_executions(make_scanner, candidates):
+    single = make_scanner()
+    batched = make_scanner(dune_batch_query_id=BATCH_QUERY_ID)
+    single.enrich_candidates(candidates)
+    batched.enrich_candidates(candidates)
+    assert batched.dune_client.executions.stats['submitted'] < single.dune_client.executions.stats['submitted']
@@ -0,0 +1,48 @@
+from daemon import ScanDaemon
+
+def make_daemon(scanner):
+    return ScanDaemon(scanner, on_cycle=lambda trending, events, calls: None)
+
+def sources(trending):
+    return sorted(coin_data.dune_source for coin_data in trending)
+
+def test_skipped_coins_are_rescored_on_dune_only_when_budget_allows(make_scanner):
+    scanner = make_scanner()
+    daemon = make_daemon(scanner)
+
+    scanner.max_dune_scores = 2
+    trending, events, calls = daemon.run_cycle()
+    assert len(trending) > 2
+    assert sources(trending).count('fresh') == 2
+    skipped = len(trending) - 2
+
+    # Budget exhausted: nothing is refetched and nothing is reported as changed
+    scanner.max_dune_scores = 0
+    trending, events, calls = daemon.run_cycle()
+    assert events == []
+    assert scanner.request_counts['cmc_info'] == 1
+    assert calls['dune_executions'] == 0
+    assert sources(trending).count('skipped') == skipped
+
+    # Budget back: the skipped coins go to Dune alone, still without events or metadata calls
+    scanner.max_dune_scores = None
+    trending, events, calls = daemon.run_cycle()
+    assert events == []
+    assert scanner.request_counts['cmc_info'] == 1
+    assert calls['dune_executions'] == skipped
+    assert set(sources(trending)) == {'fresh'}
+
+def test_failed_cycle_does_not_stop_the_daemon(make_scanner, monkeypatch):
+    daemon = make_daemon(make_scanner())
+    daemon.interval = 0
+    outcomes = iter([RuntimeError("database is locked"), None])
+
+    def run_cycle():
+        daemon.cycles += 1
+        outcome = next(outcomes)
+        if outcome:
+            raise outcome
+
+    monkeypatch.setattr(daemon, 'run_cycle', run_cycle)
+    daemon.run(max_cycles=2)
+    assert daemon.cycles == 2
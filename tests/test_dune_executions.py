@@ -0,0 +1,45 @@
+import threading
+import time
+import pytest
+from dune_executions import ExecutionManager
+
+class StalledClient:
+    """Status calls hang until released, like a request stuck on a dead connection"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.cancelled = []
+
+    def get_execution_status(self, execution_id, timeout=None):
+        self.release.wait()
+        return {'state': 'QUERY_STATE_EXECUTING'}
+
+    def cancel_execution(self, execution_id, timeout=None):
+        self.cancelled.append(execution_id)
+        return {'success': True}
+
+def test_wait_times_out_while_the_poller_is_stuck():
+    client = StalledClient()
+    executions = ExecutionManager(client)
+    try:
+        execution = executions.track('stuck', timeout=0.8)
+        time.sleep(0.6)  # The poller is now blocked in its first status call
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            executions.wait(execution)
+        assert time.monotonic() - started < 0.5
+        assert client.cancelled == ['stuck']
+        assert executions.stats['timed_out'] == 1
+    finally:
+        client.release.set()
+
+def test_wait_honours_the_global_deadline():
+    client = StalledClient()
+    executions = ExecutionManager(client, global_timeout=0.3)
+    try:
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            executions.wait(executions.track('slow'))
+        assert time.monotonic() - started < 1
+    finally:
+        client.release.set()
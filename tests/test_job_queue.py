@@ -0,0 +1,99 @@
+import threading
+import time
+from job_queue import JobQueue
+from sharding import Worker
+
+def test_expired_lease_is_re_leased_and_stale_complete_rejected(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease=0.1)
+    queue.put_many('scan', [{'coins': [1]}, {'coins': [2]}])
+
+    first = queue.lease_next('scan', 'w1')
+    assert first['attempts'] == 1
+    time.sleep(0.2)
+    taken_over = queue.lease_next('scan', 'w2')
+    assert taken_over['job_id'] == first['job_id']
+    assert taken_over['attempts'] == 2
+
+    assert queue.complete(first['job_id'], 'w1', [{'id': 1, 'by': 'w1'}]) is False
+    assert queue.complete(taken_over['job_id'], 'w2', [{'id': 1, 'by': 'w2'}]) is True
+    assert queue.results('scan') == [([{'id': 1, 'by': 'w2'}], 'w2')]
+    assert queue.progress('scan')['done'] == 1
+
+def test_fail_after_losing_the_lease_is_ignored(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease=0.1)
+    queue.put_many('scan', [{'coins': [1]}])
+    first = queue.lease_next('scan', 'w1')
+    time.sleep(0.2)
+    queue.lease_next('scan', 'w2')
+
+    assert queue.fail(first['job_id'], 'w1', 'boom') is None
+    assert queue.fail(12345, 'w1', 'boom') is None
+    assert queue.progress('scan')['leased'] == 1
+    assert queue.fail(first['job_id'], 'w2', 'boom') == 'pending'
+
+def test_live_lease_is_not_handed_out_twice(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease=60)
+    queue.put_many('scan', [{'coins': [1]}])
+    assert queue.lease_next('scan', 'w1') is not None
+    assert queue.lease_next('scan', 'w2') is None
+
+class FakeRecord:
+    def __init__(self, coin_id, dune_source):
+        self.id = coin_id
+        self.dune_source = dune_source
+
+    def as_dict(self):
+        return {'id': self.id, 'dune_source': self.dune_source}
+
+class FlakyDuneScanner:
+    """Fails the Dune score of the coins in `failing` once each"""
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.request_counts = {'cmc_info_failed': 0}
+        self.enriched = []
+
+    def enrich_candidates(self, coins):
+        self.enriched.append([coin['id'] for coin in coins])
+        records = [FakeRecord(coin['id'], 'failed' if coin['id'] in self.failing else 'fresh') for coin in coins]
+        self.failing.clear()
+        return records
+
+def test_worker_retries_only_failed_tokens(tmp_path, monkeypatch):
+    monkeypatch.setattr('job_queue.RETRY_BACKOFF', 0)
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    queue.put_many('scan', [{'coins': [{'id': 1}, {'id': 2}, {'id': 3}]}])
+    scanner = FlakyDuneScanner(failing=[2])
+
+    stats = Worker(queue, 'scan', 'w1', scanner).run()
+
+    assert scanner.enriched == [[1, 2, 3], [2]]
+    assert stats == {'done': 1, 'failed': 1, 'lost': 0}
+    [(result, worker)] = queue.results('scan')
+    assert sorted(record['id'] for record in result) == [1, 2, 3]
+    assert all(record['dune_source'] == 'fresh' for record in result)
+    assert queue.progress('scan')['attempts'] == 2
+
+class SlowScanner(FlakyDuneScanner):
+    def __init__(self, seconds):
+        super().__init__(failing=[])
+        self.seconds = seconds
+
+    def enrich_candidates(self, coins):
+        time.sleep(self.seconds)
+        return super().enrich_candidates(coins)
+
+def test_worker_renews_its_lease_while_the_job_runs(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease=0.2)
+    queue.put_many('scan', [{'coins': [{'id': 1}]}])
+    worker = Worker(queue, 'scan', 'w1', SlowScanner(0.8))
+    job = queue.lease_next('scan', 'w1')
+
+    runner = threading.Thread(target=worker.run_job, args=(job,))
+    runner.start()
+    time.sleep(0.5)
+    assert queue.lease_next('scan', 'w2') is None
+    runner.join()
+
+    assert worker.stats == {'done': 1, 'failed': 0, 'lost': 0}
+    assert queue.progress('scan')['done'] == 1
@@ -0,0 +1,39 @@
+def summary(records):
+    return [(record.id, record.token_address, record.dune_score, record.dune_interpretation, record.dune_source)
+            for record in records]
+
+def test_pipelined_results_match_sequential(stub, make_scanner, candidates):
+    # Wide spread of execution times so Dune results come back out of order
+    stub.config['dune_duration'] = 0.4
+    sequential = make_scanner().enrich_candidates(candidates, pipelined=False)
+    pipelined = make_scanner(concurrency={'cmc': 2, 'dune': 8}).enrich_candidates(candidates, pipelined=True)
+
+    assert sequential
+    assert all(record.dune_source == 'fresh' for record in sequential)
+    assert summary(pipelined) == summary(sequential)
+
+def test_pipelined_results_are_deterministic(make_scanner, candidates):
+    first = make_scanner(concurrency={'dune': 8}).enrich_candidates(candidates, pipelined=True)
+    second = make_scanner(concurrency={'dune': 3}).enrich_candidates(candidates, pipelined=True)
+    assert summary(first) == summary(second)
+
+def test_pipelined_top_k_goes_to_best_pre_scores(stub, make_scanner):
+    # Jittery latency so metadata batches and Dune scores come back in a different order every run
+    stub.config.update({'latency_ms': 60, 'jitter_ms': 55, 'dune_duration': 0.3})
+    scanner = make_scanner(dune_top_k=5, concurrency={'cmc': 4, 'dune': 4})
+    params = {'volume_threshold': 0, 'min_price_increase': 0, 'max_price_increase': 10000}
+    candidates = scanner.select_candidates(scanner.fetch_listings(**params), **params)
+    assert len(candidates) > 20  # More than one metadata batch
+    records = scanner.enrich_candidates(candidates, pipelined=True)
+
+    fresh = [record.id for record in records if record.dune_source == 'fresh']
+    assert fresh == [record.id for record in records][:5]
+    assert all(record.dune_source == 'skipped' for record in records[5:])
+    assert scanner.dune_budget['fresh'] == 5
+    assert scanner.dune_client.executions.stats['submitted'] == 5
+
+def test_pipelined_scan_keeps_priority_order(stub, make_scanner):
+    stub.config.update({'latency_ms': 20, 'jitter_ms': 18, 'dune_duration': 0.3})
+    sequential = make_scanner().scan_memecoins()
+    pipelined = make_scanner(concurrency={'cmc': 2, 'dune': 8}).scan_memecoins(pipelined=True)
+    assert summary(pipelined) == summary(sequential)
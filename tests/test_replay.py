@@ -0,0 +1,4 @@
+from replay import backtest, parameter_grid
+
+def test_backtest_without_recordings_returns_nothing():
+    assert backtest([], parameter_grid([50000], [20], [300], [86400]), workers=1) == []
@@ -0,0 +1,34 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from http.server import ThreadingHTTPServer
+from service import ScanService, ServiceHandler
+
+@pytest.fixture
+def service_url(make_scanner):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ServiceHandler)
+    server.service = ScanService(make_scanner())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+@pytest.mark.parametrize('max_age', ['abc', 'nan', 'inf', '-5'])
+def test_bad_max_age_is_rejected(service_url, max_age):
+    status, body = get(f"{service_url}/results?max_age={max_age}")
+    assert status == 400
+    assert 'max_age' in body['error']
+
+def test_results_are_served(service_url):
+    status, body = get(f"{service_url}/results?max_age=0")
+    assert status == 200
+    assert body['count'] == len(body['results']) > 0
@@ -0,0 +1,54 @@
+import socket
+import threading
+import pytest
+import requests
+from transport import RateLimitedSession, TokenBucket
+
+@pytest.fixture
+def dropping_server():
+    """Accepts connections, reads the request and hangs up without answering; counts the requests"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+    received = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            conn.recv(65536)
+            received.append(1)
+            conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}", received
+    server.close()
+
+def make_session(base_url):
+    return RateLimitedSession(base_url, TokenBucket(6000), max_retries=2, backoff_base=0.01)
+
+def test_dropped_get_is_retried(dropping_server):
+    base_url, received = dropping_server
+    with pytest.raises(requests.exceptions.ConnectionError):
+        make_session(base_url).get('/execution/1/status')
+    assert len(received) == 3
+
+def test_dropped_post_is_not_resent(dropping_server):
+    base_url, received = dropping_server
+    with pytest.raises(requests.exceptions.ConnectionError):
+        make_session(base_url).post('/query/1/execute', json={})
+    assert len(received) == 1
+
+def test_stalled_request_times_out():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()  # Connections are accepted by the kernel and never answered
+    session = RateLimitedSession(f"http://127.0.0.1:{server.getsockname()[1]}", TokenBucket(6000),
+                                 max_retries=0, timeout=(1, 0.2))
+    try:
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            session.get('/execution/1/status')
+    finally:
+        server.close()
@@ -0,0 +1,17 @@
+from daemon import ScanDaemon
+from warm_start import LastScan
+
+PARAMS = {'volume_threshold': 50000, 'min_price_increase': 20, 'max_price_increase': 300}
+
+def test_only_single_scans_save_the_last_scan(make_scanner, tmp_path):
+    last_scan = LastScan(directory=str(tmp_path))
+    scanner = make_scanner(last_scan=last_scan)
+
+    trending = scanner.scan_memecoins()
+    results, age = last_scan.load(PARAMS)
+    assert [result['id'] for result in results] == [coin_data.id for coin_data in trending]
+
+    scanner.scan_profiles([{'name': 'wide', 'min_price_increase': 5}])
+    ScanDaemon(scanner, on_cycle=lambda trending, events, calls: None).run_cycle()
+    results_after, age_after = last_scan.load(PARAMS)
+    assert results_after == results
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+from metrics import METRICS, timed
+
+DATA_DIR = os.path.expanduser(os.getenv('MEMESCANNER_HOME', '~/.memescanner'))
+DEFAULT_INDEX_PATH = os.path.join(DATA_DIR, 'token_index.sqlite3')
+
+CMC_MAP_PATH = '/v1/cryptocurrency/map'
+CMC_MAP_PAGE_SIZE = 5000
+REFRESH_INTERVAL = 24 * 60 * 60  # Seconds between incremental id-map refreshes
+
+class TokenIndex:
+    """Persistent CMC id -> (platform, token_address) index backed by SQLite"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tokens (
+                id INTEGER PRIMARY KEY,
+                symbol TEXT,
+                platform TEXT,
+                token_address TEXT,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        # Whole index lives in memory so lookups are plain dict hits
+        self.tokens = {
+            row[0]: (row[1], row[2])
+            for row in self.conn.execute("SELECT id, platform, token_address FROM tokens")
+        }
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'avoided_calls': 0}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, coin_id):
+        return int(coin_id) in self.tokens
+
+    def lookup(self, coin_id):
+        """Return (platform, token_address) for a CMC id, or None if unknown"""
+        self.stats['lookups'] += 1
+        entry = self.tokens.get(int(coin_id))
+        self.stats['hits' if entry else 'misses'] += 1
+        return entry
+
+    def is_solana(self, coin_id):
+        """True/False when the platform is known, None when the id is not indexed yet"""
+        entry = self.lookup(coin_id)
+        if entry is None:
+            return None
+        return (entry[0] or '').lower() == 'solana'
+
+    def filter_candidates(self, coins):
+        """Drop coins the index knows are not on Solana, counting the avoided metadata lookups"""
+        kept = []
+        for coin in coins:
+            if self.is_solana(coin['id']) is False:
+                self.stats['avoided_calls'] += 1
+                METRICS.inc('token_index_skipped_total')
+            else:
+                kept.append(coin)
+        return kept
+
+    def record(self, coin_id, symbol, platform, token_address):
+        """Store one id -> platform mapping (empty platform means a native coin)"""
+        self.record_many([(coin_id, symbol, platform, token_address)])
+
+    def record_many(self, entries):
+        """Bulk upsert of (id, symbol, platform, token_address) tuples"""
+        now = time.time()
+        rows = []
+        for coin_id, symbol, platform, token_address in entries:
+            coin_id = int(coin_id)
+            self.tokens[coin_id] = (platform or '', token_address or '')
+            rows.append((coin_id, symbol, platform or '', token_address or '', now))
+        if rows:
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO tokens (id, symbol, platform, token_address, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.commit()
+
+    def record_coins(self, coins):
+        """Index coins from any CMC payload that carries a `platform` object (map, listings, info)"""
+        self.record_many(
+            (coin['id'], coin.get('symbol'), (coin.get('platform') or {}).get('name'),
+             (coin.get('platform') or {}).get('token_address'))
+            for coin in coins
+            if 'platform' in coin
+        )
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+            self.conn.commit()
+
+    def needs_refresh(self, max_age=REFRESH_INTERVAL):
+        return time.time() - float(self.get_meta('refreshed_at', 0)) > max_age
+
+    @timed('index_refresh')
+    def refresh(self, session, max_age=REFRESH_INTERVAL, force=False):
+        """Build or incrementally extend the index from CMC's id-map
+
+        The map is paged in id order, so new listings land after the highest
+        id we have seen. Delistings shift later ids to lower positions, so the
+        refresh first backs up until the row before its start is one we
+        already know, then downloads the tail and keeps only the new ids.
+        """
+        if not force and not self.needs_refresh(max_age):
+            return 0
+
+        max_id = int(self.get_meta('map_max_id', 0))
+        start = int(self.get_meta('map_offset', 0)) + 1
+        while start > 1:
+            previous = self._map_page(session, start - 1, 1)
+            if previous and previous[0]['id'] <= max_id:
+                break
+            start = max(1, start - CMC_MAP_PAGE_SIZE)
+
+        added = 0
+        while True:
+            page = self._map_page(session, start, CMC_MAP_PAGE_SIZE)
+            new = [coin for coin in page if coin['id'] > max_id]
+            for coin in new:
+                coin.setdefault('platform', None)
+            self.record_coins(new)
+            added += len(new)
+            start += len(page)
+            if new:
+                max_id = max(coin['id'] for coin in new)
+                self.set_meta('map_max_id', max_id)
+            self.set_meta('map_offset', start - 1)
+            if len(page) < CMC_MAP_PAGE_SIZE:
+                break
+
+        self.set_meta('refreshed_at', time.time())
+        return added
+
+    def _map_page(self, session, start, limit):
+        params = {
+            'listing_status': 'active,untracked',
+            'sort': 'id',
+            'start': start,
+            'limit': limit,
+            'aux': 'platform'
+        }
+        response = session.get(CMC_MAP_PATH, params=params)
+        response.raise_for_status()
+        return response.json().get('data') or []
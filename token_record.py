@@ -0,0 +1,90 @@
+import sys
+from dataclasses import dataclass, fields, replace
+
+@dataclass(slots=True)
+class TokenRecord:
+    """One enriched token: listing quote fields, Solana metadata, Dune score and local pre-score
+
+    Slotted, so a record costs a fraction of the merged per-coin dict it
+    replaces. Symbols, platforms and Dune signals repeat across tokens and
+    scans and are interned. `record['field']` and `record.get('field')`
+    still work for callers written against the old dicts.
+    """
+
+    id: int
+    symbol: str
+    name: str
+    price: float
+    price_change_24h: float
+    volume_24h: float
+    volume_change_24h: float
+    market_cap: float
+    date_added: str
+    platform: str = None
+    token_address: str = None
+    website: str = ''
+    twitter: str = ''
+    telegram: str = ''
+    explorer: str = ''
+    description: str = 'N/A'
+    dune_score: object = 'N/A'
+    dune_interpretation: str = 'N/A'
+    dune_source: str = None
+    pre_score: float = None
+
+    def __post_init__(self):
+        self.symbol = _intern(self.symbol)
+        self.platform = _intern(self.platform)
+        self.dune_interpretation = _intern(self.dune_interpretation)
+        self.dune_source = _intern(self.dune_source)
+
+    @classmethod
+    def from_listing(cls, coin, metadata=None, dune_results=None):
+        """Build a record from a listings row plus the metadata and Dune dicts the scanner produces"""
+        return cls(**_listing_fields(coin), **(metadata or {}), **(dune_results or {}))
+
+    def with_listing(self, coin):
+        """Copy with fresh price/volume fields, keeping metadata and Dune score"""
+        return replace(self, **_listing_fields(coin))
+
+    def with_dune(self, dune_results):
+        """Copy with a new Dune score, keeping listing fields and metadata"""
+        return replace(self, **dune_results)
+
+    def update_quote(self, quote):
+        """Overwrite the price/volume fields in place from a CMC USD quote"""
+        for name, value in _quote_fields(quote).items():
+            setattr(self, name, value)
+
+    def as_dict(self):
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+def _listing_fields(coin):
+    return {
+        'id': coin['id'],
+        'symbol': coin['symbol'],
+        'name': coin['name'],
+        'date_added': coin['date_added'],
+        **_quote_fields(coin['quote']['USD'])
+    }
+
+def _quote_fields(quote):
+    return {
+        'price': quote['price'],
+        'price_change_24h': quote['percent_change_24h'],
+        'volume_24h': quote['volume_24h'],
+        'volume_change_24h': quote.get('volume_change_24h', 0),
+        'market_cap': quote.get('market_cap', 0)
+    }
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
@@ -0,0 +1,210 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import METRICS, endpoint_name
+
+CMC_BASE_URL = os.getenv('CMC_BASE_URL', 'https://pro-api.coinmarketcap.com')
+DUNE_BASE_URL = os.getenv('DUNE_BASE_URL', 'https://api.dune.com/api/v1')
+
+# Requests per minute allowed by each plan
+CMC_PLAN_LIMITS = {'basic': 30, 'hobbyist': 30, 'startup': 30, 'standard': 60, 'professional': 90, 'enterprise': 120}
+DUNE_PLAN_LIMITS = {'free': 40, 'plus': 200, 'premium': 1000}
+
+UPSTREAMS = {
+    'cmc': {
+        'base_url': CMC_BASE_URL,
+        'auth_header': 'X-CMC_PRO_API_KEY',
+        'headers': {'Accept': 'application/json'},
+        'plans': CMC_PLAN_LIMITS,
+        'plan': os.getenv('CMC_PLAN', 'basic')
+    },
+    'dune': {
+        'base_url': DUNE_BASE_URL,
+        'auth_header': 'X-Dune-API-Key',
+        'headers': {'Content-Type': 'application/json'},
+        'plans': DUNE_PLAN_LIMITS,
+        'plan': os.getenv('DUNE_PLAN', 'free')
+    }
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'DELETE'}
+DEFAULT_TIMEOUT = (10, 60)  # Seconds to connect and between bytes read, so a stalled call can't hang its caller
+
+class TokenBucket:
+    """Thread-safe token bucket that backs off on 429s and slowly recovers
+
+    Callers reserve a token up front and sleep outside the lock, so waiting
+    threads are served in arrival order without busy-polling.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.max_rate = rate_per_minute / 60.0
+        self.min_rate = self.max_rate / 10
+        self.rate = self.max_rate
+        self.capacity = burst or max(1.0, rate_per_minute / 6)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self):
+        """Take one token without sleeping; returns the seconds the caller must wait before using it"""
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def acquire(self):
+        """Take one token, sleeping until it is available; returns the seconds waited"""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self):
+        """Halve the rate after the upstream said we are going too fast"""
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def reward(self):
+        """Creep back towards the plan rate after a successful call"""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+class RateLimitedSession(requests.Session):
+    """Keep-alive session that rate limits and retries 429/5xx with jittered backoff
+
+    Relative URLs are resolved against `base_url`, so callers can pass API
+    paths and the upstream can be pointed somewhere else (e.g. a stub server).
+    Every request gets `timeout` unless the caller passes its own.
+    """
+
+    def __init__(self, base_url, limiter, headers=None, max_retries=5, backoff_base=0.5,
+                 backoff_cap=30.0, pool_size=16, name=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.name = name or base_url
+        self.base_url = base_url.rstrip('/')
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'throttle_seconds': 0.0}
+        self.stats_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = endpoint_name(url if url.startswith('/') else urlparse(url).path)
+        if url.startswith('/'):
+            url = self.base_url + url
+        kwargs.setdefault('timeout', self.timeout)
+        # A 5xx or a dropped connection on a POST may already have started work upstream, so only
+        # 429s and failures to connect (the request never went out) are safe to resend
+        if method.upper() in IDEMPOTENT_METHODS:
+            retry_statuses = RETRY_STATUSES
+            retry_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        else:
+            retry_statuses = {429}
+            retry_errors = (requests.exceptions.ConnectTimeout,)
+
+        for attempt in range(self.max_retries + 1):
+            waited = self.limiter.acquire()
+            self._count('throttle_seconds', waited)
+            self._count('requests')
+            METRICS.inc('throttle_sleep_seconds_total', waited, upstream=self.name)
+            started = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                METRICS.inc('http_requests_total', upstream=self.name, endpoint=endpoint, status=type(e).__name__)
+                if attempt == self.max_retries or not isinstance(e, retry_errors):
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                METRICS.observe('http_request_seconds', time.perf_counter() - started,
+                                upstream=self.name, endpoint=endpoint)
+                METRICS.inc('http_requests_total', upstream=self.name, endpoint=endpoint, status=response.status_code)
+                if response.status_code == 429:
+                    self._count('rate_limited')
+                    self.limiter.penalize()
+                if response.status_code not in retry_statuses or attempt == self.max_retries:
+                    if response.status_code < 400:
+                        self.limiter.reward()
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                response.close()
+
+            self._count('retries')
+            METRICS.inc('http_retries_total', upstream=self.name, endpoint=endpoint)
+            METRICS.inc('retry_sleep_seconds_total', delay, upstream=self.name)
+            time.sleep(delay)
+
+    def _backoff(self, attempt):
+        return backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+
+    def _retry_after(self, response):
+        return retry_after_delay(response.headers, self.backoff_cap)
+
+def backoff_delay(attempt, base, cap):
+    # Full jitter keeps retrying workers from synchronizing
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def retry_after_delay(headers, cap):
+    """Seconds to wait from a Retry-After header (seconds or HTTP date), or None without one"""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return min(cap, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return min(cap, max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds()))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(upstream, api_key, plan=None, share=1):
+    """Shared pooled session for an upstream ('cmc' or 'dune') and API key
+
+    `share` is the number of processes using the same key; each gets that
+    fraction of the plan's rate limit. It only applies when this process
+    creates the key's session, later calls get the existing one.
+    """
+    config = UPSTREAMS[upstream]
+    plan = plan or config['plan']
+    key = (upstream, api_key, plan)
+
+    with _sessions_lock:
+        if key not in _sessions:
+            limiter = TokenBucket(config['plans'].get(plan, min(config['plans'].values())) / share)
+            headers = {**config['headers'], config['auth_header']: api_key}
+            _sessions[key] = RateLimitedSession(config['base_url'], limiter, headers=headers, name=upstream)
+        return _sessions[key]
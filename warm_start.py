@@ -0,0 +1,80 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+from token_index import DATA_DIR
+
+class LastScan:
+    """The last completed scan's results on disk, for instant output on the next start
+
+    Results are stored as plain dicts in a pickle, which loads in a few
+    milliseconds, together with the scan parameters so a run with different
+    thresholds never shows results that don't match them.
+    """
+
+    def __init__(self, name='main', directory=DATA_DIR):
+        self.path = os.path.join(directory, f'last_scan_{name}.pickle')
+
+    def save(self, results, params=None):
+        """Atomically replace the stored scan with `results` (records or dicts)"""
+        payload = {
+            'saved_at': time.time(),
+            'params': params,
+            'results': [result.as_dict() if hasattr(result, 'as_dict') else dict(result) for result in results]
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, params=None):
+        """(results, age in seconds) of the stored scan, or None if there is none for `params`"""
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if params is not None and payload.get('params') != params:
+            return None
+        return payload['results'], time.time() - payload['saved_at']
+
+class BackgroundRefresh:
+    """Runs `refresh()` on a daemon thread so stale results can be shown meanwhile
+
+    Waiting on result() stays interruptible with Ctrl-C, and the thread
+    doesn't keep the process alive after an interrupt.
+    """
+
+    def __init__(self, refresh):
+        self.value = None
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(refresh,), name='scan-refresh', daemon=True)
+        self.thread.start()
+
+    def _run(self, refresh):
+        try:
+            self.value = refresh()
+        except BaseException as e:
+            self.error = e
+
+    def result(self):
+        while self.thread.is_alive():
+            self.thread.join(0.2)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+def format_age(seconds):
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 36 * 60 * 60:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f} days"
@@ -0,0 +1,88 @@
+import time
+from datetime import datetime
+from daemon import ScanDaemon
+
+DEFAULT_TICK = 30  # Seconds between quote refreshes of the watched tokens
+DEFAULT_SWEEP_INTERVAL = 15 * 60  # Seconds between full listings sweeps
+
+class Watchlist:
+    """Re-prices the tokens found by the last sweep on a fast tick, sweeping listings rarely
+
+    A sweep is a ScanDaemon cycle: download listings, enrich new or moved
+    coins. Between sweeps every watched token is re-priced with batched
+    quotes/latest requests (one per 100 ids), its record is updated in
+    place and the volume / price-change conditions are checked again, so
+    tokens can drop out of or come back into the results between sweeps.
+    """
+
+    def __init__(self, scanner, tick=DEFAULT_TICK, sweep_interval=DEFAULT_SWEEP_INTERVAL, pipelined=False,
+                 on_tick=None, **scan_params):
+        self.scanner = scanner
+        self.daemon = ScanDaemon(scanner, interval=sweep_interval, pipelined=pipelined,
+                                 on_cycle=lambda trending, events, calls: None, **scan_params)
+        self.scan_params = self.daemon.scan_params
+        self.tick = tick
+        self.sweep_interval = sweep_interval
+        self.on_tick = on_tick or (lambda trending, events: self.scanner.format_results(trending))
+        self.passing = set()
+        self.last_sweep_at = None
+        self.ticks = 0
+
+    def run(self, max_ticks=None):
+        while max_ticks is None or self.ticks < max_ticks:
+            started = time.monotonic()
+            self.run_tick()
+            if max_ticks is not None and self.ticks >= max_ticks:
+                break
+            time.sleep(max(0.0, self.tick - (time.monotonic() - started)))
+
+    def run_tick(self):
+        """One tick: a full sweep when one is due, a quotes refresh otherwise; returns (trending, events)"""
+        self.ticks += 1
+        if self.last_sweep_at is None or time.monotonic() - self.last_sweep_at >= self.sweep_interval:
+            trending, events, calls = self.daemon.run_cycle()
+            if trending is not None:
+                self.last_sweep_at = time.monotonic()
+                self.passing = {record.id for record in trending}
+                self.on_tick(trending, events)
+                return trending, events
+            # Listings are unavailable, keep the watched tokens fresh from quotes instead
+
+        return self.refresh_quotes()
+
+    def refresh_quotes(self):
+        records = [entry['coin_data'] for entry in self.daemon.state.values()]
+        if not records:
+            return [], []
+
+        requests_before = self.scanner.request_counts['cmc_quotes']
+        quotes = self.scanner.get_quotes([record.id for record in records])
+        events = []
+        for record in records:
+            if record.id in quotes:
+                record.update_quote(quotes[record.id])
+            if self._passes(record):
+                if record.id not in self.passing:
+                    self.passing.add(record.id)
+                    events.append({'event': 'entered', 'id': record.id, 'symbol': record.symbol})
+            elif record.id in self.passing:
+                self.passing.discard(record.id)
+                events.append({'event': 'exited', 'id': record.id, 'symbol': record.symbol})
+
+        trending = [record for record in records if record.id in self.passing]
+        print(f"\n📈 Tick {self.ticks} at {datetime.now().strftime('%H:%M:%S')}: re-priced {len(quotes)}/{len(records)} "
+              f"watched tokens in {self.scanner.request_counts['cmc_quotes'] - requests_before} request(s), "
+              f"{len(trending)} passing")
+        for event in events:
+            print(f"{'🟢 Entered' if event['event'] == 'entered' else '🔴 Exited'}: {event['symbol']}")
+        self.on_tick(trending, events)
+        return trending, events
+
+    def _passes(self, record):
+        # A quote with a missing field fails the filter, like NaN does in ListingsFrame
+        if record.volume_24h is None or record.price_change_24h is None:
+            return False
+        return (
+            record.volume_24h > self.scan_params['volume_threshold'] and
+            self.scan_params['min_price_increase'] <= record.price_change_24h <= self.scan_params['max_price_increase']
+        )